@@ -1,5 +1,5 @@
 from flask import Flask
-from .extensions import db, jwt, migrate
+from .extensions import db, jwt
 from .routes.auth import bp as auth_bp
 from .routes.properties import bp as properties_bp
 from .routes.units import bp as units_bp
@@ -7,28 +7,57 @@ from .routes.tenants import bp as tenants_bp
 from .routes.leases import bp as leases_bp
 from .routes.payments import bp as payments_bp
 from .routes.invoices import bp as invoices_bp
-from .models import RevokedToken
+from .routes.dashboard import bp as dashboard_bp
+from .routes.search import bp as search_bp
+from .routes.admin import bp as admin_bp
+from .routes.webhooks import bp as webhooks_bp
+from .routes.water_readings import bp as water_readings_bp
 from flask_jwt_extended import get_jwt
 from .cli import register_cli
+from .utils.dashboard import init_dashboard_cache
+from .utils.vacancy import init_vacancy_cache
+from .utils.revocation import init_revocation_cache, is_token_revoked
+from .utils.scheduler import init_scheduler
+from .utils.db_pool import init_db_pool, init_pool_metrics
+from .utils.json_provider import init_json
+from .utils.metrics import init_metrics
+from .utils.query_budget import init_query_budget
+from .utils.replica import init_replica
+from .utils.sms_service import init_sms
+from .utils.token_purge import init_token_purge
+from .utils.webhooks import init_webhooks
 from config import Config
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    init_json(app)
 
+    init_db_pool(app)
+    init_replica(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        # the primary plus the read replica, if configured
+        engines = list(db.engines.values())
+        init_pool_metrics(app, *engines)
+        init_metrics(app, *engines)
+        init_query_budget(app, *engines)
     jwt.init_app(app)
     register_cli(app)
+    init_dashboard_cache(app)
+    init_vacancy_cache(app)
+    init_revocation_cache(app)
+    init_token_purge(app)
+    init_sms(app)
+    init_webhooks(app)
+    init_scheduler(app)
 
     @jwt.token_in_blocklist_loader
     def token_in_blocklist(jwt_header, jwt_payload):
         jti = jwt_payload.get("jti")
         if not jti:
             return True
-        return db.session.query(
-            db.session.query(RevokedToken.id).filter_by(jti=jti).exists()
-        ).scalar()
+        return is_token_revoked(jti)
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(properties_bp)
@@ -37,4 +66,9 @@ def create_app():
     app.register_blueprint(leases_bp)
     app.register_blueprint(payments_bp)
     app.register_blueprint(invoices_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(webhooks_bp)
+    app.register_blueprint(water_readings_bp)
     return app
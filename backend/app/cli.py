@@ -1,17 +1,150 @@
-from datetime import datetime
+import os
 import click
 from flask import current_app
 from .extensions import db
-from .models import RevokedToken
+from .utils.lease_notices import queue_expiry_notices
+from .utils.search import sqlite_fts_ddl
+from .utils.seed_data import SEED_PASSWORD, generate
+from .utils.sms_service import drain_from_config, sms_enabled
+from .utils.db_pool import max_connections_per_worker, pool_stats, server_connections
+from .utils.token_purge import partition_days_ahead, partition_revoked_tokens, purge_revoked_tokens
+from .utils.webhooks import dispatch_from_config, purge_delivered
+
+def init_migrate(app):
+    """Attach Flask-Migrate; needed before calling flask_migrate.upgrade() & co from code."""
+    from flask_migrate import Migrate
+
+    if "migrate" not in app.extensions:
+        Migrate(app, db)
+
+
+class LazyMigrateGroup(click.Group):
+    """
+    `flask db ...` from Flask-Migrate, which imports alembic: a good share of
+    the app's import time that web workers and the other commands never need.
+    Flask-Migrate is loaded and attached to the app on first use.
+    """
+
+    def _commands(self, ctx):
+        from flask.cli import ScriptInfo
+        from flask_migrate.cli import db as db_group
+
+        init_migrate(ctx.ensure_object(ScriptInfo).load_app())
+        return db_group
+
+    def list_commands(self, ctx):
+        return self._commands(ctx).list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands(ctx).get_command(ctx, name)
+
 
 def register_cli(app):
+    app.cli.add_command(LazyMigrateGroup("db", help="Perform database migrations."))
+
     @app.cli.command("cleanup-revoked-tokens")
-    def cleanup_revoked_tokens():
-        now = datetime.utcnow()
-        deleted = (
-            db.session.query(RevokedToken)
-            .filter(RevokedToken.expires_at < now)
-            .delete(synchronize_session=False)
+    @click.option("--batch-size", default=None, type=int, help="Rows per DELETE (default REVOKED_TOKEN_PURGE_BATCH).")
+    @click.option("--pause", default=None, type=float, help="Seconds between batches (default REVOKED_TOKEN_PURGE_PAUSE).")
+    def cleanup_revoked_tokens(batch_size, pause):
+        result = purge_revoked_tokens(
+            batch_size=batch_size or current_app.config["REVOKED_TOKEN_PURGE_BATCH"],
+            pause=current_app.config["REVOKED_TOKEN_PURGE_PAUSE"] if pause is None else pause,
+            days_ahead=partition_days_ahead(current_app.config),
         )
+        if result["skipped"]:
+            click.echo("skipped: another purge is running")
+            return
+        click.echo(f"deleted={result['deleted']} dropped_partitions={len(result['dropped_partitions'])}")
+
+    @app.cli.command("partition-revoked-tokens")
+    def partition_revoked_tokens_cmd():
+        # Postgres only; one-off, takes an exclusive lock on revoked_token while it copies
+        if partition_revoked_tokens(partition_days_ahead(current_app.config)):
+            click.echo("revoked_token is now partitioned by expires_at day")
+        else:
+            click.echo("already partitioned")
+
+    @app.cli.command("scan-lease-expiry")
+    @click.option("--days", default=30, show_default=True, type=int, help="Look-ahead window in days.")
+    def scan_lease_expiry(days):
+        result = queue_expiry_notices(days)
+        click.echo(f"scanned={result['scanned']} queued={result['queued']}")
+
+    @app.cli.command("sms-drain")
+    def sms_drain():
+        # the same run the sms-sender job does; for deployments with SCHEDULER_ENABLED=0
+        if not sms_enabled():
+            raise click.ClickException("SMS_PROVIDER is not set")
+        result = drain_from_config()
+        if result["skipped"]:
+            click.echo("skipped: another sender is running")
+            return
+        click.echo(f"sent={result['sent']} retry={result['retry']} failed={result['failed']}")
+
+    @app.cli.command("webhooks-dispatch")
+    def webhooks_dispatch():
+        # the same run the webhook-dispatch job does; for deployments with SCHEDULER_ENABLED=0
+        result = dispatch_from_config()
+        if result["skipped"]:
+            click.echo("skipped: another dispatcher is running")
+            return
+        click.echo(" ".join(f"{k}={v}" for k, v in result.items() if k != "skipped"))
+
+    @app.cli.command("webhooks-purge")
+    @click.option("--days", default=None, type=float, help="Keep this many days (default WEBHOOK_RETENTION_DAYS).")
+    def webhooks_purge(days):
+        result = purge_delivered(current_app.config["WEBHOOK_RETENTION_DAYS"] if days is None else days)
+        click.echo(" ".join(f"{k}={v}" for k, v in result.items()))
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        # Postgres searches the base tables through pg_trgm indexes; nothing to rebuild
+        if db.engine.dialect.name != "sqlite":
+            click.echo("nothing to do for " + db.engine.dialect.name)
+            return
+        for stmt in sqlite_fts_ddl():
+            db.session.execute(db.text(stmt))
         db.session.commit()
-        click.echo(f"deleted={deleted}")
+        click.echo("rebuilt")
+
+    @app.cli.command("db-pool-stats")
+    @click.option("--workers", default=None, type=int, help="Worker processes to size for (default WEB_CONCURRENCY).")
+    def db_pool_stats(workers):
+        # Live per-worker numbers come from GET /api/admin/db-pool; this sizes the whole deployment
+        workers = workers or int(os.getenv("WEB_CONCURRENCY", "1"))
+        per_worker = max_connections_per_worker(current_app.config)
+        options = {k: v for k, v in current_app.config["SQLALCHEMY_ENGINE_OPTIONS"].items() if k != "poolclass"}
+        click.echo(f"engine options: {options}")
+        click.echo(f"pool: {pool_stats(db.engine)['pool_class']}")
+        if per_worker is None:
+            click.echo("per-worker connections: unbounded (no worker-side pool)")
+        else:
+            click.echo(f"per-worker connections: {per_worker}; {workers} workers -> up to {workers * per_worker}")
+        server = server_connections(db.engine)
+        if server:
+            click.echo(
+                f"server: max_connections={server['max_connections']} "
+                f"connected_to_database={server['connections_to_database']}"
+            )
+            if per_worker is not None and workers * per_worker > server["max_connections"]:
+                click.echo("warning: pools can exceed max_connections; lower DB_POOL_SIZE/DB_MAX_OVERFLOW or use PgBouncer")
+
+    @app.cli.command("seed-data")
+    @click.option("--companies", default=1, show_default=True, type=int)
+    @click.option("--properties", default=5, show_default=True, type=int, help="Per company.")
+    @click.option("--units", default=20, show_default=True, type=int, help="Per property.")
+    @click.option("--years", default=1, show_default=True, type=int, help="Months of readings, invoices and payments.")
+    @click.option("--occupancy", default=0.9, show_default=True, type=float)
+    @click.option("--seed", default=1, show_default=True, type=int)
+    @click.option("--until", default=None, type=click.DateTime(formats=["%Y-%m"]), help="Last month (default: this month).")
+    def seed_data(companies, properties, units, years, occupancy, seed, until):
+        # Same arguments -> same data; pass --until as well to pin the dates
+        try:
+            totals = generate(
+                companies=companies, properties=properties, units=units, years=years,
+                occupancy=occupancy, seed=seed, until=until.date() if until else None, log=click.echo,
+            )
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(" ".join(f"{k}={v}" for k, v in totals.items()))
+        click.echo(f"logins: manager@seed{seed}-<n>.local / {SEED_PASSWORD}")
@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
 
-db = SQLAlchemy()
+from .utils.replica import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 jwt = JWTManager()
-migrate = Migrate()
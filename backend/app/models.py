@@ -1,6 +1,7 @@
 from .extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, Index, UniqueConstraint, DateTime, Boolean, Date
+from werkzeug.security import check_password_hash
+from .utils.passwords import hash_password
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, Index, UniqueConstraint, DateTime, Boolean, Date, Text
 from sqlalchemy.orm import relationship, declared_attr
 from datetime import datetime, date
 from decimal import Decimal
@@ -29,6 +30,9 @@ class SoftDeleteMixin:
 class Company(db.Model):
     id = Column(Integer, primary_key=True)
     name = Column(String(160), nullable=False, unique=True, index=True)
+    # Bumped after every commit that changes the company's dashboard figures;
+    # each worker compares it with the version its cached copy was built at
+    dashboard_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     users = relationship("User", backref="company", lazy=True)
     properties = relationship("Property", backref="company", lazy=True)
@@ -62,8 +66,35 @@ class Unit(db.Model, ScopeMixin, AuditMixin, SoftDeleteMixin):
     deposit = Column(Numeric(12, 2), nullable=False)
     status = Column(String(20), nullable=False, default="vacant")
 
+    # Denormalized pointers to the active lease, kept in step with status by
+    # utils/occupancy.refresh_unit_status. No FK on purpose: lease already
+    # references unit, and a cycle would make every unit/lease join ambiguous.
+    current_lease_id = Column(Integer, nullable=True, index=True)
+    current_tenant_id = Column(Integer, nullable=True, index=True)
+
     __table_args__ = (
         UniqueConstraint("property_id", "house_number", name="uq_unit_property_house_number"),
+        Index("ix_unit_company_status_rent", "company_id", "status", "rent"),
+    )
+
+
+class UnitRate(db.Model):
+    """Effective-dated copy of a unit's billable rates. See utils/rates.py."""
+    __tablename__ = "unit_rates"
+
+    id = Column(Integer, primary_key=True)
+    unit_id = Column(Integer, ForeignKey("unit.id"), nullable=False)
+    effective_from = Column(Date, nullable=False)
+
+    rent = Column(Numeric(12, 2), nullable=False)
+    garbage_fee = Column(Numeric(12, 2), nullable=False)
+    water_rate = Column(Numeric(12, 2), nullable=False)
+
+    created_by_id = Column(Integer, ForeignKey("user.id"), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("unit_id", "effective_from", name="uq_unit_rate_unit_effective_from"),
     )
 
 
@@ -74,7 +105,7 @@ class User(db.Model, ScopeMixin, AuditMixin, SoftDeleteMixin):
     role = Column(String(20), nullable=False, default="viewer")  # viewer, staff, admin
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -111,18 +142,145 @@ class Lease(db.Model, ScopeMixin, AuditMixin, SoftDeleteMixin):
 
     __table_args__ = (
         Index("ix_lease_is_active", "is_active"),
+        Index("ix_lease_company_end_date", "company_id", "end_date"),
+        Index("ix_lease_unit_dates", "unit_id", "start_date", "end_date"),
     )
 
     unit = relationship("Unit", backref=db.backref("leases", lazy=True, cascade="all, delete-orphan"))
 
 
+class LeaseNotice(db.Model):
+    __tablename__ = "lease_notices"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("company.id"), nullable=False, index=True)
+    lease_id = Column(Integer, ForeignKey("lease.id"), nullable=False, index=True)
+
+    kind = Column(String(20), nullable=False)  # lease_expiry
+    recipient = Column(String(20), nullable=False)  # tenant, landlord
+    lease_end_date = Column(Date, nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued, sent, failed
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    lease = relationship("Lease", backref=db.backref("notices", lazy=True))
+
+    __table_args__ = (
+        UniqueConstraint("lease_id", "kind", "recipient", "lease_end_date", name="uq_lease_notice"),
+        Index("ix_lease_notice_status", "status"),
+    )
+
+
+class SmsMessage(db.Model):
+    """
+    Outbox row for one text message. Added in the same transaction as the
+    event it reports, and sent later by utils/sms_service.drain_outbox.
+    """
+    __tablename__ = "sms_outbox"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("company.id"), nullable=False, index=True)
+
+    kind = Column(String(30), nullable=False)  # payment_received, invoice_issued
+    source_key = Column(String(60), nullable=False, unique=True)  # e.g. payment:42, one message per event
+    to_number = Column(String(20), nullable=False)  # E.164, e.g. +254712345678
+    body = Column(String(480), nullable=False)
+
+    status = Column(String(20), nullable=False, default="queued")  # queued, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # a "sending" row whose claim has lapsed (sender died mid-batch) is picked up again
+    claimed_until = Column(DateTime, nullable=True)
+
+    provider = Column(String(30), nullable=True)
+    provider_message_id = Column(String(100), nullable=True)
+    last_error = Column(String(255), nullable=True)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_sms_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+
+class WebhookSubscription(db.Model, ScopeMixin, AuditMixin):
+    """An integration's endpoint; receives the company's events in signed batches (utils/webhooks.py)."""
+    __tablename__ = "webhook_subscriptions"
+
+    id = Column(Integer, primary_key=True)
+    url = Column(String(500), nullable=False)
+    secret = Column(String(64), nullable=False)  # HMAC key for the X-Webhook-Signature header
+    event_types = Column(String(255), nullable=False, default="*")  # comma separated, or * for all
+    is_active = Column(Boolean, nullable=False, default=True)
+
+    # delivery state: consecutive failed POSTs, and when to try again (backoff)
+    failure_count = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_delivered_at = Column(DateTime, nullable=True)
+    paused_reason = Column(String(255), nullable=True)  # set when deactivated after too many failures
+
+
+class WebhookEvent(db.Model):
+    """Outbox row for one domain event, added in the transaction that caused it."""
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("company.id"), nullable=False, index=True)
+    event_type = Column(String(40), nullable=False)  # payment.created, invoice.issued, lease.*, water_reading.*
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # set once a webhook_deliveries row exists for every matching subscription
+    fanned_out_at = Column(DateTime, nullable=True, index=True)
+
+
+class WebhookDelivery(db.Model):
+    """One event owed to one subscription; delivered_at is set when a batch containing it gets a 2xx."""
+    __tablename__ = "webhook_deliveries"
+
+    id = Column(Integer, primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("webhook_subscriptions.id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("webhook_events.id"), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("subscription_id", "event_id", name="uq_webhook_delivery_subscription_event"),
+        Index("ix_webhook_delivery_pending", "subscription_id", "delivered_at", "event_id"),
+    )
+
+
+class WebhookAttempt(db.Model):
+    """Delivery log: one row per POST, successful or not."""
+    __tablename__ = "webhook_attempts"
+
+    id = Column(Integer, primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("webhook_subscriptions.id"), nullable=False)
+    event_count = Column(Integer, nullable=False)
+    first_event_id = Column(Integer, nullable=False)
+    last_event_id = Column(Integer, nullable=False)
+    status_code = Column(Integer, nullable=True)  # None when no response came back
+    error = Column(String(255), nullable=True)
+    duration_ms = Column(Integer, nullable=False)
+    attempted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_webhook_attempt_subscription_at", "subscription_id", "attempted_at"),
+    )
+
+
 class RevokedToken(db.Model):
+    # On Postgres, `flask partition-revoked-tokens` turns this into a table
+    # partitioned by expires_at, after which the real keys are (id, expires_at)
+    # and unique (jti, expires_at) rather than what is declared here. Code only
+    # looks rows up by jti, so the model is left as is and migrations/env.py
+    # keeps autogenerate away from the converted table.
     id = Column(Integer, primary_key=True)
     jti = Column(String(36), unique=True, nullable=False, index=True)
     token_type = Column(String(10), nullable=False)  # access or refresh
     user_id = Column(Integer, nullable=False)
     expires_at = Column(DateTime, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
 
 class Payment(db.Model):
     __tablename__ = "payments"
@@ -0,0 +1,24 @@
+from flask import Blueprint, jsonify, current_app
+from flask_jwt_extended import jwt_required
+
+from ..extensions import db
+from ..utils.authz import require_any_role
+from ..utils.db_pool import max_connections_per_worker, pool_stats, server_connections
+from ..utils.replica import REPLICA_BIND
+
+bp = Blueprint("admin", __name__, url_prefix="/api/admin")
+
+
+@bp.route("/db-pool", methods=["GET"])
+@jwt_required()
+@require_any_role("admin")
+def db_pool():
+    # Stats are per worker process: repeat the call to sample other workers (see "pid")
+    replica = db.engines.get(REPLICA_BIND)
+    return jsonify({
+        "pool": pool_stats(db.engine),
+        # the replica has its own pool of the same size
+        "replica_pool": pool_stats(replica) if replica is not None else None,
+        "max_connections_per_worker": max_connections_per_worker(current_app.config),
+        "server": server_connections(db.engine),
+    }), 200
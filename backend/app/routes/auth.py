@@ -9,6 +9,8 @@ from flask_jwt_extended import (
 from ..extensions import db
 from ..models import User, RevokedToken, Company
 from ..utils.validation import require_fields
+from ..utils.revocation import note_revoked
+from ..utils.passwords import VerifierBusy, needs_rehash, verify_password
 from datetime import datetime
 
 bp = Blueprint("auth", __name__, url_prefix="/api/auth")
@@ -78,7 +80,14 @@ def login():
     password = str(data["password"])
 
     u = User.query.filter_by(email=email).first()
-    if not u or not u.check_password(password):
+    stored_hash = u.password_hash if u else None
+    # hand the connection back to the pool while hashing, the slow part of a login
+    db.session.commit()
+    try:
+        ok = verify_password(stored_hash, password)
+    except VerifierBusy:
+        return jsonify({"error": "login_busy"}), 503
+    if not ok:
         return jsonify({"error": "invalid_credentials"}), 401
 
     if getattr(u, "deleted_at", None) is not None:
@@ -87,6 +96,11 @@ def login():
     if not getattr(u, "company_id", None):
         return jsonify({"error": "account_unscoped"}), 403
 
+    if needs_rehash(stored_hash):
+        # stored with an older method/cost; upgrade while we have the plaintext
+        u.set_password(password)
+        db.session.commit()
+
     claims = _claims_for_user(u)
     access_token = create_access_token(identity=str(u.id), additional_claims=claims)
     refresh_token = create_refresh_token(identity=str(u.id), additional_claims=claims)
@@ -129,6 +143,7 @@ def logout_access():
     )
     db.session.add(item)
     db.session.commit()
+    note_revoked(jti)
     return jsonify({"message": "logged out"}), 200
 
 
@@ -149,4 +164,5 @@ def logout_refresh():
     )
     db.session.add(item)
     db.session.commit()
+    note_revoked(jti)
     return jsonify({"message": "refresh logged out"}), 200
@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+
+from ..utils.dashboard import portfolio_for_company
+
+bp = Blueprint("dashboard", __name__, url_prefix="/api/dashboard")
+
+
+def _scope():
+    claims = get_jwt()
+    role = claims.get("role", "viewer")
+    company_id = claims.get("company_id")
+    is_admin = role == "admin"
+    return company_id, is_admin
+
+
+@bp.route("", methods=["GET"])
+@jwt_required()
+def portfolio_dashboard():
+    company_id, is_admin = _scope()
+
+    # admins may look at any company
+    if is_admin and request.args.get("company_id", type=int):
+        company_id = request.args.get("company_id", type=int)
+
+    if not company_id:
+        return jsonify({"error": "missing_company_scope"}), 401
+
+    return jsonify(portfolio_for_company(company_id)), 200
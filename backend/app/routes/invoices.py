@@ -7,12 +7,14 @@ import json
 from sqlalchemy import func
 import io
 from flask import send_file
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
 
 from ..extensions import db
 from ..models import Tenant, Lease, Unit, Property, Payment, WaterReading, Invoice
+from ..utils.rates import rate_timelines, rates_on, rate_segments
+from ..utils.query_budget import query_budget
+from ..utils.etag import make_etag, not_modified, with_etag
+from ..utils.sms_service import notify_invoice_issued
+from ..utils.webhooks import emit_event
 
 bp = Blueprint("invoices", __name__, url_prefix="/api/invoices")
 
@@ -91,8 +93,7 @@ def _prorated_monthly_fee_for_range(monthly_fee: Decimal, range_start: date, ran
     return total.quantize(Decimal("0.01"))
 
 
-def _rent_for_period(lease: Lease, unit: Unit, period_start: date, period_end: date) -> Decimal:
-    monthly_rent = _d(unit.rent)
+def _fee_for_period(lease: Lease, unit: Unit, period_start: date, period_end: date, field: str, timeline=None) -> Decimal:
     lease_start, lease_end = _lease_active_range(lease)
     overlap_days = _days_overlap(lease_start, lease_end, period_start, period_end)
     if overlap_days == 0:
@@ -100,19 +101,20 @@ def _rent_for_period(lease: Lease, unit: Unit, period_start: date, period_end: d
 
     active_start = max(period_start, lease_start)
     active_end = min(period_end, lease_end)
-    return _prorated_monthly_fee_for_range(monthly_rent, active_start, active_end)
 
+    # Each stretch between rate changes is prorated at the rate then in force
+    total = Decimal("0")
+    for seg_start, seg_end, rates in rate_segments(timeline, unit, active_start, active_end):
+        total += _prorated_monthly_fee_for_range(_d(rates[field]), seg_start, seg_end)
+    return total.quantize(Decimal("0.01"))
 
-def _garbage_for_period(lease: Lease, unit: Unit, period_start: date, period_end: date) -> Decimal:
-    monthly_garbage = _d(unit.garbage_fee)
-    lease_start, lease_end = _lease_active_range(lease)
-    overlap_days = _days_overlap(lease_start, lease_end, period_start, period_end)
-    if overlap_days == 0:
-        return Decimal("0")
 
-    active_start = max(period_start, lease_start)
-    active_end = min(period_end, lease_end)
-    return _prorated_monthly_fee_for_range(monthly_garbage, active_start, active_end)
+def _rent_for_period(lease: Lease, unit: Unit, period_start: date, period_end: date, timeline=None) -> Decimal:
+    return _fee_for_period(lease, unit, period_start, period_end, "rent", timeline)
+
+
+def _garbage_for_period(lease: Lease, unit: Unit, period_start: date, period_end: date, timeline=None) -> Decimal:
+    return _fee_for_period(lease, unit, period_start, period_end, "garbage_fee", timeline)
 
 
 def _deposit_amount(lease: Lease, unit: Unit) -> Decimal:
@@ -135,16 +137,17 @@ def _prev_period_key(d0: date) -> str:
     return f"{y:04d}-{m:02d}"
 
 
-def _resolve_water_rate(unit: Unit) -> Decimal:
-    if _d(unit.water_rate) > 0:
-        return _d(unit.water_rate)
+def _resolve_water_rate(unit: Unit, rates: dict | None = None) -> Decimal:
+    water_rate = _d((rates or {}).get("water_rate", unit.water_rate))
+    if water_rate > 0:
+        return water_rate
     prop = unit.property
     if prop is not None and _d(prop.water_rate_per_unit) > 0:
         return _d(prop.water_rate_per_unit)
     return Decimal("0")
 
 
-def _water_charge_for_month(company_id: int, unit: Unit, month_key: str) -> dict | None:
+def _water_charge_for_month(company_id: int, unit: Unit, month_key: str, timeline=None) -> dict | None:
     # Needs current and previous reading for usage
     prev_key = _prev_period_key(date(int(month_key[:4]), int(month_key[5:7]), 1))
 
@@ -177,7 +180,8 @@ def _water_charge_for_month(company_id: int, unit: Unit, month_key: str) -> dict
     if usage < 0:
         usage = Decimal("0")
 
-    rate = _resolve_water_rate(unit)
+    month_start = date(int(month_key[:4]), int(month_key[5:7]), 1)
+    rate = _resolve_water_rate(unit, rates_on(timeline, unit, month_start))
     amount = (usage * rate).quantize(Decimal("0.01"))
 
     return {
@@ -304,6 +308,7 @@ def _get_property_for_unit(company_id: int, unit: Unit) -> Property | None:
     )
 
 @bp.route("/preview", methods=["GET"])
+@query_budget(8)
 @jwt_required()
 def preview_invoice():
     claims = get_jwt()
@@ -362,8 +367,9 @@ def preview_invoice():
         )
 
     line_items = []
+    timeline = rate_timelines([unit.id], period_end).get(unit.id)
 
-    rent_amt = _rent_for_period(lease, unit, period_start, period_end)
+    rent_amt = _rent_for_period(lease, unit, period_start, period_end, timeline)
     if rent_amt > 0:
         line_items.append({
             "code": "RENT",
@@ -373,7 +379,7 @@ def preview_invoice():
             "amount": _money(rent_amt),
         })
 
-    garbage_amt = _garbage_for_period(lease, unit, period_start, period_end)
+    garbage_amt = _garbage_for_period(lease, unit, period_start, period_end, timeline)
     if garbage_amt > 0:
         line_items.append({
             "code": "GARBAGE",
@@ -384,7 +390,7 @@ def preview_invoice():
         })
 
     month_key = _period_key(period_start)
-    water_item = _water_charge_for_month(company_id, unit, month_key)
+    water_item = _water_charge_for_month(company_id, unit, month_key, timeline)
     if water_item is not None:
         if Decimal(water_item["amount"]) > 0:
             line_items.append(water_item)
@@ -528,17 +534,18 @@ def create_invoice():
 
     # Build line items using the same logic as preview
     line_items = []
+    timeline = rate_timelines([unit.id], period_end).get(unit.id)
 
-    rent_amt = _rent_for_period(lease, unit, period_start, period_end)
+    rent_amt = _rent_for_period(lease, unit, period_start, period_end, timeline)
     if rent_amt > 0:
         line_items.append({"code": "RENT", "name": "Rent", "qty": "1", "unit_price": _money(rent_amt), "amount": _money(rent_amt)})
 
-    garbage_amt = _garbage_for_period(lease, unit, period_start, period_end)
+    garbage_amt = _garbage_for_period(lease, unit, period_start, period_end, timeline)
     if garbage_amt > 0:
         line_items.append({"code": "GARBAGE", "name": "Garbage", "qty": "1", "unit_price": _money(garbage_amt), "amount": _money(garbage_amt)})
 
     month_key = _period_key(period_start)
-    water_item = _water_charge_for_month(company_id, unit, month_key)
+    water_item = _water_charge_for_month(company_id, unit, month_key, timeline)
     if water_item is not None and _d(water_item["amount"]) > 0:
         line_items.append(water_item)
 
@@ -569,9 +576,8 @@ def create_invoice():
     )
 
     db.session.add(inv)
-    db.session.commit()
-
-    return jsonify({
+    db.session.flush()
+    body = {
         "id": inv.id,
         "invoice_number": inv.invoice_number,
         "status": inv.status,
@@ -583,9 +589,16 @@ def create_invoice():
         "lease": _to_public_lease(lease),
         "line_items": line_items,
         "totals": {"subtotal": _money(inv.subtotal), "total": _money(inv.total), "currency": inv.currency},
-    }), 201
+    }
+    # outbox rows, committed with the invoice; sent in the background
+    notify_invoice_issued(inv, tenant, unit)
+    emit_event(company_id, "invoice.issued", body)
+    db.session.commit()
+
+    return jsonify(body), 201
 
 @bp.route("", methods=["GET"])
+@query_budget(2)
 @jwt_required()
 def list_invoices():
     claims = get_jwt()
@@ -631,6 +644,7 @@ def list_invoices():
     }), 200
 
 @bp.route("/<int:invoice_id>", methods=["GET"])
+@query_budget(6)
 @jwt_required()
 def get_invoice(invoice_id: int):
     claims = get_jwt()
@@ -638,6 +652,29 @@ def get_invoice(invoice_id: int):
     if not company_id:
         return jsonify({"error": "missing_company_scope"}), 401
 
+    # the body embeds the lease, tenant, unit and property, so any of them changing is a new version
+    versions = (
+        db.session.query(Invoice.updated_at, Lease.updated_at, Tenant.updated_at, Unit.updated_at, Property.updated_at)
+        .select_from(Invoice)
+        .outerjoin(Lease, Lease.id == Invoice.lease_id)
+        .outerjoin(Tenant, Tenant.id == Invoice.tenant_id)
+        .outerjoin(Unit, Unit.id == Invoice.unit_id)
+        .outerjoin(Property, (Property.id == Unit.property_id) & (Property.company_id == company_id)
+                   & Property.deleted_at.is_(None))
+        .filter(
+            Invoice.id == invoice_id,
+            Invoice.company_id == company_id,
+            Invoice.deleted_at.is_(None),
+        )
+        .first()
+    )
+    if versions is None:
+        return jsonify({"error": "invoice_not_found"}), 404
+    etag = make_etag(*versions)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     inv = (
         db.session.query(Invoice)
         .filter(
@@ -663,7 +700,7 @@ def get_invoice(invoice_id: int):
     except Exception:
         line_items = []
 
-    return jsonify({
+    return with_etag(jsonify({
         "id": inv.id,
         "invoice_number": inv.invoice_number,
         "status": inv.status,
@@ -680,11 +717,17 @@ def get_invoice(invoice_id: int):
         "lease": _to_public_lease(lease) if lease else None,
         "line_items": line_items,
         "totals": {"subtotal": _money(inv.subtotal), "total": _money(inv.total), "currency": inv.currency},
-    }), 200
+    }), etag), 200
 
 @bp.route("/<int:invoice_id>/pdf", methods=["GET"])
 @jwt_required()
 def download_invoice_pdf(invoice_id: int):
+    # ReportLab is only needed here; importing it at module load slowed every
+    # worker boot and CLI command (gunicorn preloads it, see PRELOAD_MODULES)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
     claims = get_jwt()
     company_id = claims.get("company_id")
     if not company_id:
@@ -1,14 +1,23 @@
+from bisect import bisect_right
 from datetime import date, datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from decimal import Decimal, InvalidOperation
+from sqlalchemy import insert
 from ..extensions import db
 from ..models import Lease, Tenant, Unit,  MoveOutSettlement
 from ..utils.validation import require_fields
 from ..utils.pagination import paginate
+from ..utils.scoped import get_in_scope
+from ..utils.occupancy import lock_unit, lock_units, active_lease_for_unit, find_overlapping_lease, refresh_unit_status
+from ..utils.query_budget import query_budget
+from ..utils.etag import collection_validator, make_etag, not_modified, with_etag
+from ..utils.webhooks import emit_event, emit_events
 
 bp = Blueprint("leases", __name__, url_prefix="/api/leases")
 
+MAX_BULK_ROWS = 2000
+
 
 def _scope():
     claims = get_jwt()
@@ -49,20 +58,12 @@ def _settle_deposit(deposit_held: Decimal, kplc: Decimal, damages: Decimal, othe
 
 def _tenant_in_scope(tenant_id: int):
     company_id, is_admin = _scope()
-    q = Tenant.query.filter(Tenant.id == tenant_id)
-    if not is_admin:
-        q = q.filter(Tenant.company_id == company_id)
-    q = q.filter(Tenant.deleted_at.is_(None))
-    return q.first()
+    return get_in_scope(Tenant, tenant_id, None if is_admin else company_id)
 
 
 def _unit_in_scope(unit_id: int):
     company_id, is_admin = _scope()
-    q = Unit.query.filter(Unit.id == unit_id)
-    if not is_admin:
-        q = q.filter(Unit.company_id == company_id)
-    q = q.filter(Unit.deleted_at.is_(None))
-    return q.first()
+    return get_in_scope(Unit, unit_id, None if is_admin else company_id)
 
 
 def _leases_base_query():
@@ -75,6 +76,23 @@ def _leases_base_query():
     return q
 
 
+def _lease_to_dict(l: Lease):
+    return {
+        "id": l.id,
+        "tenant_id": l.tenant_id,
+        "unit_id": l.unit_id,
+        "start_date": l.start_date.isoformat(),
+        "end_date": l.end_date.isoformat() if l.end_date else None,
+        "is_active": l.is_active,
+        "deleted_at": l.deleted_at.isoformat() if l.deleted_at else None,
+        "deposit_amount": float(l.deposit_amount or 0),
+        "deposit_held": float(l.deposit_held or 0),
+        "deposit_used": float(l.deposit_used or 0),
+        "deposit_refunded": float(l.deposit_refunded or 0),
+        "moved_out_at": l.moved_out_at.isoformat() if l.moved_out_at else None,
+    }
+
+
 def _overlaps(a_start, a_end, b_start, b_end):
     a_end_eff = a_end
     b_end_eff = b_end
@@ -101,13 +119,6 @@ def create_lease():
     if not t:
         return jsonify({"error": "tenant_not_found"}), 404
 
-    u = _unit_in_scope(unit_id)
-    if not u:
-        return jsonify({"error": "unit_not_found"}), 404
-
-    if u.status != "vacant":
-        return jsonify({"error": "unit_not_vacant"}), 409
-
     start = parse_date(data["start_date"], "start_date")
     if not start:
         return jsonify({"error": "invalid_date", "field": "start_date"}), 400
@@ -127,32 +138,26 @@ def create_lease():
     company_id, is_admin = _scope()
     user_id = int(get_jwt_identity())
 
-    existing = (
-        Lease.query
-        .filter(Lease.unit_id == unit_id)
-        .filter(Lease.deleted_at.is_(None))
-    )
-    if not is_admin:
-        existing = existing.filter(Lease.company_id == company_id)
-
-    existing = existing.order_by(Lease.id.desc()).all()
-
-    for e in existing:
-        if _overlaps(start, end, e.start_date, e.end_date):
-            return jsonify({"error": "overlapping_lease", "lease_id": e.id}), 409
+    # Everything below runs with the unit row locked until commit/rollback
+    u = lock_unit(unit_id, None if is_admin else company_id)
+    if not u:
+        db.session.rollback()
+        return jsonify({"error": "unit_not_found"}), 404
 
-    active_exists = (
-        Lease.query
-        .filter(Lease.unit_id == unit_id, Lease.is_active == True)
-        .filter(Lease.deleted_at.is_(None))
-    )
-    if not is_admin:
-        active_exists = active_exists.filter(Lease.company_id == company_id)
+    if u.status != "vacant":
+        db.session.rollback()
+        return jsonify({"error": "unit_not_vacant"}), 409
 
-    active_exists = active_exists.first()
+    active_exists = active_lease_for_unit(u.id)
     if active_exists:
+        db.session.rollback()
         return jsonify({"error": "unit_already_leased", "lease_id": active_exists.id}), 409
 
+    overlapping = find_overlapping_lease(u.id, start, end)
+    if overlapping:
+        db.session.rollback()
+        return jsonify({"error": "overlapping_lease", "lease_id": overlapping.id}), 409
+
     lease = Lease(
     tenant_id=tenant_id,
     unit_id=unit_id,
@@ -168,7 +173,9 @@ def create_lease():
     )
 
     db.session.add(lease)
-    u.status = "occupied"
+    refresh_unit_status(u)
+    db.session.flush()
+    emit_event(lease.company_id, "lease.created", _lease_to_dict(lease))
     db.session.commit()
     return jsonify({
     "id": lease.id,
@@ -178,7 +185,216 @@ def create_lease():
 
 
 
+def _overlapping_lease_id(starts, prefix_max_end, start, end):
+    # starts sorted asc; prefix_max_end[i] = (max end_date over 0..i, lease_id)
+    idx = bisect_right(starts, end or date.max)
+    if idx == 0:
+        return None
+    max_end, lease_id = prefix_max_end[idx - 1]
+    return lease_id if max_end >= start else None
+
+
+@bp.route("/bulk", methods=["POST"])
+@jwt_required()
+def create_leases_bulk():
+    data = request.get_json()
+    err = require_fields(data, ["rows"])
+    if err:
+        return err
+
+    rows = data["rows"]
+    if not isinstance(rows, list):
+        return jsonify({"error": "invalid_rows"}), 400
+    if len(rows) > MAX_BULK_ROWS:
+        return jsonify({"error": "too_many_rows", "max": MAX_BULK_ROWS}), 400
+
+    company_id, is_admin = _scope()
+    user_id = int(get_jwt_identity())
+    today = date.today()
+
+    errors = []
+    parsed = []
+
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"row": i, "error": "invalid_row"})
+            continue
+
+        missing = [f for f in ("tenant_id", "unit_id", "start_date", "deposit_amount") if row.get(f) in ("", None)]
+        if missing:
+            errors.append({"row": i, "error": "missing_fields", "fields": missing})
+            continue
+
+        try:
+            tenant_id = int(row["tenant_id"])
+            unit_id = int(row["unit_id"])
+        except (TypeError, ValueError):
+            errors.append({"row": i, "error": "invalid_id"})
+            continue
+
+        start = parse_date(row["start_date"], "start_date")
+        if not start:
+            errors.append({"row": i, "error": "invalid_date", "field": "start_date"})
+            continue
+
+        end = None
+        if row.get("end_date"):
+            end = parse_date(row["end_date"], "end_date")
+            if not end:
+                errors.append({"row": i, "error": "invalid_date", "field": "end_date"})
+                continue
+            if end < start:
+                errors.append({"row": i, "error": "end_before_start"})
+                continue
+
+        deposit_amount = _parse_money(row["deposit_amount"], "deposit_amount")
+        if deposit_amount is None or deposit_amount <= 0:
+            errors.append({"row": i, "error": "invalid_amount", "field": "deposit_amount"})
+            continue
+
+        deposit_held = deposit_amount
+        if row.get("deposit_held") not in ("", None):
+            deposit_held = _parse_money(row["deposit_held"], "deposit_held")
+            if deposit_held is None or deposit_held > deposit_amount:
+                errors.append({"row": i, "error": "invalid_amount", "field": "deposit_held"})
+                continue
+
+        parsed.append({
+            "row": i,
+            "tenant_id": tenant_id,
+            "unit_id": unit_id,
+            "start": start,
+            "end": end,
+            "deposit_amount": deposit_amount,
+            "deposit_held": deposit_held,
+            "is_active": end is None or end >= today,
+        })
+
+    # One query each for tenants, units (locked) and their existing leases
+    tenant_ids = {r["tenant_id"] for r in parsed}
+    t_query = Tenant.query.filter(Tenant.id.in_(tenant_ids), Tenant.deleted_at.is_(None))
+    if not is_admin:
+        t_query = t_query.filter(Tenant.company_id == company_id)
+    known_tenants = {tid for (tid,) in t_query.with_entities(Tenant.id).all()} if tenant_ids else set()
+
+    units = lock_units({r["unit_id"] for r in parsed}, None if is_admin else company_id)
+
+    existing_by_unit = {}
+    if units:
+        existing = (
+            db.session.query(Lease.id, Lease.unit_id, Lease.start_date, Lease.end_date)
+            .filter(Lease.unit_id.in_(list(units)), Lease.deleted_at.is_(None))
+            .all()
+        )
+        for l in existing:
+            existing_by_unit.setdefault(l.unit_id, []).append(l)
+
+    # Per unit: sorted starts + running max end, so each row is an O(log n) lookup
+    index_by_unit = {}
+    for unit_id, leases in existing_by_unit.items():
+        leases.sort(key=lambda l: l.start_date)
+        starts, prefix = [], []
+        best = (date.min, None)
+        for l in leases:
+            l_end = l.end_date or date.max
+            if l_end >= best[0]:
+                best = (l_end, l.id)
+            starts.append(l.start_date)
+            prefix.append(best)
+        index_by_unit[unit_id] = (starts, prefix)
+
+    candidates = {}
+    for r in parsed:
+        if r["tenant_id"] not in known_tenants:
+            errors.append({"row": r["row"], "error": "tenant_not_found"})
+            continue
+
+        u = units.get(r["unit_id"])
+        if not u:
+            errors.append({"row": r["row"], "error": "unit_not_found"})
+            continue
+
+        if r["unit_id"] in index_by_unit:
+            lease_id = _overlapping_lease_id(*index_by_unit[r["unit_id"]], r["start"], r["end"])
+            if lease_id:
+                errors.append({"row": r["row"], "error": "overlapping_lease", "lease_id": lease_id})
+                continue
+
+        if r["is_active"] and u.current_lease_id:
+            errors.append({"row": r["row"], "error": "unit_not_vacant", "lease_id": u.current_lease_id})
+            continue
+
+        candidates.setdefault(r["unit_id"], []).append(r)
+
+    # Rows in the same batch: sweep each unit's rows by start date
+    accepted = []
+    for unit_id, unit_rows in candidates.items():
+        unit_rows.sort(key=lambda r: (r["start"], r["row"]))
+        last = None
+        active_row = None
+        for r in unit_rows:
+            if last is not None and r["start"] <= (last["end"] or date.max):
+                errors.append({"row": r["row"], "error": "overlapping_row", "other_row": last["row"]})
+                continue
+            if r["is_active"] and active_row is not None:
+                errors.append({"row": r["row"], "error": "unit_already_leased", "other_row": active_row["row"]})
+                continue
+            if r["is_active"]:
+                active_row = r
+            last = r
+            accepted.append(r)
+
+    created = []
+    if accepted:
+        accepted.sort(key=lambda r: r["row"])
+        values_list = [{
+            "tenant_id": r["tenant_id"],
+            "unit_id": r["unit_id"],
+            "start_date": r["start"],
+            "end_date": r["end"],
+            "is_active": r["is_active"],
+            "company_id": units[r["unit_id"]].company_id,
+            "created_by_id": user_id,
+            "deposit_amount": r["deposit_amount"],
+            "deposit_held": r["deposit_held"],
+            "deposit_used": Decimal("0.00"),
+            "deposit_refunded": Decimal("0.00"),
+        } for r in accepted]
+        # RETURNING order isn't guaranteed for multi-row inserts; accepted rows
+        # never overlap, so (unit_id, start_date) identifies each one.
+        inserted = db.session.execute(
+            insert(Lease).returning(Lease.id, Lease.unit_id, Lease.start_date), values_list,
+        ).all()
+        id_by_key = {(x.unit_id, x.start_date): x.id for x in inserted}
+
+        events = []
+        for r, values in zip(accepted, values_list):
+            lease_id = id_by_key[(r["unit_id"], r["start"])]
+            created.append({"row": r["row"], "id": lease_id})
+            # transient copy, only to serialize the event like any other lease
+            events.append((values["company_id"], _lease_to_dict(Lease(id=lease_id, **values))))
+            if r["is_active"]:
+                u = units[r["unit_id"]]
+                u.status = "occupied"
+                u.current_lease_id = lease_id
+                u.current_tenant_id = r["tenant_id"]
+
+        emit_events("lease.created", events)
+        db.session.commit()
+    else:
+        db.session.rollback()
+
+    errors.sort(key=lambda e: e["row"])
+    return jsonify({
+        "created": created,
+        "errors": errors,
+        "created_count": len(created),
+        "error_count": len(errors),
+    }), 201 if created else 400
+
+
 @bp.route("", methods=["GET"])
+@query_budget(3)
 @jwt_required()
 def list_leases():
     active = request.args.get("active")
@@ -187,28 +403,47 @@ def list_leases():
     if active in ("true", "false"):
         query = query.filter(Lease.is_active == (active == "true"))
 
+    active_on_s = request.args.get("active_on")
+    if active_on_s:
+        active_on = parse_date(active_on_s, "active_on")
+        if not active_on:
+            return jsonify({"error": "invalid_date", "field": "active_on"}), 400
+        query = query.filter(
+            Lease.start_date <= active_on,
+            (Lease.end_date.is_(None)) | (Lease.end_date >= active_on),
+        )
+
+    ending_between_s = request.args.get("ending_between")
+    if ending_between_s:
+        # "YYYY-MM-DD,YYYY-MM-DD", both ends inclusive
+        parts = [x.strip() for x in ending_between_s.split(",")]
+        ending_from = parse_date(parts[0], "ending_between") if len(parts) == 2 else None
+        ending_to = parse_date(parts[1], "ending_between") if len(parts) == 2 else None
+        if not ending_from or not ending_to:
+            return jsonify({"error": "invalid_date", "field": "ending_between"}), 400
+        if ending_to < ending_from:
+            return jsonify({"error": "end_before_start", "field": "ending_between"}), 400
+        query = query.filter(Lease.end_date >= ending_from, Lease.end_date <= ending_to)
+
+    property_id = request.args.get("property_id", type=int)
+    if property_id:
+        unit_ids = db.session.query(Unit.id).filter(Unit.property_id == property_id)
+        query = query.filter(Lease.unit_id.in_(unit_ids))
+
+    validator = collection_validator(query, Lease)
+    etag = make_etag(*validator)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     query = query.order_by(Lease.id.desc())
-    items, meta, links = paginate(query)
+    items, meta, links = paginate(query, total_items=validator[0])
 
-    return jsonify({
-        "items": [{
-            "id": l.id,
-            "tenant_id": l.tenant_id,
-            "unit_id": l.unit_id,
-            "start_date": l.start_date.isoformat(),
-            "end_date": l.end_date.isoformat() if l.end_date else None,
-            "is_active": l.is_active,
-            "deleted_at": l.deleted_at.isoformat() if l.deleted_at else None,
-            "deposit_amount": float(l.deposit_amount or 0),
-            "deposit_held": float(l.deposit_held or 0),
-            "deposit_used": float(l.deposit_used or 0),
-            "deposit_refunded": float(l.deposit_refunded or 0),
-            "moved_out_at": l.moved_out_at.isoformat() if l.moved_out_at else None,
-
-        } for l in items],
+    return with_etag(jsonify({
+        "items": [_lease_to_dict(l) for l in items],
         "meta": meta,
         "links": links,
-    })
+    }), etag)
 
 
 @bp.route("/<int:lease_id>/end", methods=["POST"])
@@ -235,25 +470,20 @@ def end_lease(lease_id):
     if l.start_date and end_d < l.start_date:
         return jsonify({"error": "end_before_start"}), 400
 
+    # Re-check under the unit lock: a concurrent end or move-out may have got here first
+    was_active = l.is_active
+    u = lock_unit(l.unit_id)
+    db.session.refresh(l)
+    if was_active and not l.is_active:
+        db.session.rollback()
+        return jsonify({"error": "lease_not_active"}), 409
+    if (l.deposit_held or 0) > 0:
+        db.session.rollback()
+        return jsonify({"error": "use_move_out_endpoint"}), 409
+
     l.end_date = end_d
     l.is_active = False
 
-    u = _unit_in_scope(l.unit_id)
-    if u:
-        still_active = (
-            Lease.query
-            .filter(
-                Lease.unit_id == l.unit_id,
-                Lease.is_active == True,
-                Lease.deleted_at.is_(None),
-                Lease.id != l.id,
-            )
-            .first()
-        )
-    if not still_active:
-        u.status = "vacant"
-
-
     others = (
         Lease.query
         .filter(
@@ -272,6 +502,12 @@ def end_lease(lease_id):
         if o.end_date is None or o.end_date > end_d:
             o.end_date = end_d
 
+    if u:
+        refresh_unit_status(u)
+
+    emit_event(l.company_id, "lease.ended", _lease_to_dict(l))
+    for o in others:
+        emit_event(o.company_id, "lease.ended", _lease_to_dict(o))
     db.session.commit()
     return jsonify({"message": "lease ended"}), 200
 
@@ -306,6 +542,14 @@ def move_out(lease_id):
         return jsonify({"error": "invalid_amount", "field": "other_deductions"}), 400
 
     notes = data.get("notes")
+    end_d = data.get("end_date") and parse_date(data.get("end_date"), "end_date") or date.today()
+
+    # Re-check under the unit lock so two move-outs can't both settle the deposit
+    u = lock_unit(l.unit_id)
+    db.session.refresh(l)
+    if not l.is_active:
+        db.session.rollback()
+        return jsonify({"error": "lease_not_active"}), 409
 
     deposit_held = Decimal(str(l.deposit_held or 0))
     total, used, refund, remaining = _settle_deposit(deposit_held, kplc, damages, other)
@@ -326,26 +570,26 @@ def move_out(lease_id):
     l.deposit_held = Decimal("0.00")
 
     l.is_active = False
-    l.end_date = data.get("end_date") and parse_date(data.get("end_date"), "end_date") or date.today()
+    l.end_date = end_d
     l.moved_out_at = datetime.utcnow()
 
-    u = _unit_in_scope(l.unit_id)
     if u:
-        still_active = (
-            Lease.query
-            .filter(
-                Lease.unit_id == l.unit_id,
-                Lease.is_active == True,
-                Lease.deleted_at.is_(None),
-                Lease.id != l.id,
-            )
-            .first()
-        )
-    if not still_active:
-        u.status = "vacant"
-
+        refresh_unit_status(u)
 
     db.session.add(settlement)
+    emit_event(l.company_id, "lease.moved_out", {
+        **_lease_to_dict(l),
+        "settlement": {
+            "kplc_token_debt": float(kplc),
+            "damages_cost": float(damages),
+            "other_deductions": float(other),
+            "notes": notes,
+            "total_deductions": float(total),
+            "deposit_used": float(used),
+            "refund_amount": float(refund),
+            "remaining_debt": float(remaining),
+        },
+    })
     db.session.commit()
 
     return jsonify({
@@ -358,31 +602,18 @@ def move_out(lease_id):
 
 
 @bp.route("/unit/<int:unit_id>/current", methods=["GET"])
+@query_budget(3)
 @jwt_required()
 def current_lease_for_unit(unit_id):
     u = _unit_in_scope(unit_id)
     if not u:
         return jsonify({"error": "unit_not_found"}), 404
 
-    company_id, is_admin = _scope()
-
-    q = (
-        Lease.query
-        .filter(Lease.unit_id == unit_id, Lease.is_active == True)
-        .filter(Lease.deleted_at.is_(None))
-    )
-    if not is_admin:
-        q = q.filter(Lease.company_id == company_id)
-
-    l = q.order_by(Lease.id.desc()).first()
+    l = db.session.get(Lease, u.current_lease_id) if u.current_lease_id else None
     if not l:
         return jsonify({"unit_id": unit_id, "current_lease": None}), 200
 
-    t_q = Tenant.query.filter(Tenant.id == l.tenant_id)
-    if not is_admin:
-        t_q = t_q.filter(Tenant.company_id == company_id)
-    t_q = t_q.filter(Tenant.deleted_at.is_(None))
-    t = t_q.first()
+    t = _tenant_in_scope(u.current_tenant_id) if u.current_tenant_id else None
 
     return jsonify({
         "unit_id": unit_id,
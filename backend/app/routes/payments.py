@@ -1,12 +1,15 @@
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 from ..utils.billing import _allocate_monthly
+from ..utils.rates import rate_timelines, rates_on
+from ..utils.sms_service import notify_payment_received
+from ..utils.webhooks import emit_event
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 
 from ..extensions import db
-from ..models import Payment, Tenant, Unit, Lease
+from ..models import Payment, Tenant, Unit
 
 bp = Blueprint("payments", __name__, url_prefix="/api/payments")
 
@@ -103,27 +106,16 @@ def create_payment():
         return jsonify({"error": "unit_not_found"}), 404
 
     # require an active lease tying this tenant to this unit
-    lease_q = (
-        Lease.query
-        .filter(
-            Lease.tenant_id == tenant.id,
-            Lease.unit_id == unit.id,
-            Lease.is_active == True,
-            Lease.deleted_at.is_(None),
-        )
-    )
-    if not is_admin:
-        lease_q = lease_q.filter(Lease.company_id == company_id)
-
-    lease = lease_q.order_by(Lease.id.desc()).first()
-    if not lease:
+    if not unit.current_lease_id or unit.current_tenant_id != tenant.id:
         return jsonify({"error": "no_active_lease_for_tenant_unit"}), 409
 
-    rent_due = _parse_decimal(unit.rent) or Decimal("0.00")
-    water_due = _parse_decimal(unit.water_rate) or Decimal("0.00")
-    garbage_due = _parse_decimal(unit.garbage_fee) or Decimal("0.00")
+    # rates in force for the month being paid, not today's
+    rates = rates_on(rate_timelines([unit.id], paid_for_month).get(unit.id), unit, paid_for_month)
+    rent_due = _parse_decimal(rates["rent"]) or Decimal("0.00")
+    water_due = _parse_decimal(rates["water_rate"]) or Decimal("0.00")
+    garbage_due = _parse_decimal(rates["garbage_fee"]) or Decimal("0.00")
 
-    water_paid, garbage_paid, rent_paid, balance_after, credit_after = allocate_monthly(
+    water_paid, garbage_paid, rent_paid, balance_after, credit_after = _allocate_monthly(
     amount_paid=amount,
     rent_due=rent_due,
     water_due=water_due,
@@ -148,9 +140,14 @@ def create_payment():
     )
 
     db.session.add(p)
+    db.session.flush()
+    body = _payment_to_dict(p)
+    # outbox rows, committed with the payment; sent in the background
+    notify_payment_received(p, tenant, unit)
+    emit_event(tenant.company_id, "payment.created", body)
     db.session.commit()
 
-    return jsonify(_payment_to_dict(p)), 201
+    return jsonify(body), 201
 
 
 @bp.get("")
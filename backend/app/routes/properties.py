@@ -2,9 +2,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from datetime import datetime
 from ..extensions import db
-from ..models import Property, Unit, Lease, Tenant
-from ..utils.pagination import paginate
+from ..models import Property, Unit, Tenant
+from ..utils.pagination import paginate, paginate_cursor
 from ..utils.validation import require_fields
+from ..utils.query_budget import query_budget
 
 bp = Blueprint("properties", __name__, url_prefix="/api/properties")
 
@@ -56,6 +57,7 @@ def create_property():
 
 
 @bp.route("", methods=["GET"])
+@query_budget(3)
 @jwt_required()
 def list_properties():
     q = request.args.get("q", "").strip()
@@ -168,81 +170,89 @@ def delete_property(property_id):
 
 
 @bp.route("/<int:property_id>/units", methods=["GET"])
+@query_budget(2)
 @jwt_required()
 def property_units(property_id):
     company_id, is_admin = _scope()
 
-    p_query = Property.query.filter(Property.id == property_id)
+    # The property's own scope and soft-delete apply to its units too
+    property_join = Property.id == Unit.property_id
     if not is_admin:
-        p_query = p_query.filter(Property.company_id == company_id)
+        property_join = property_join & (Property.company_id == company_id)
     if not _include_deleted():
-        p_query = p_query.filter(Property.deleted_at.is_(None))
+        property_join = property_join & (Property.deleted_at.is_(None))
 
-    p = p_query.first()
-    if not p:
-        return jsonify({"error": "not_found"}), 404
-
-    u_query = Unit.query.filter(Unit.property_id == property_id)
+    # One statement: the unit page, joined to its property, with its current
+    # tenant through the denormalized Unit.current_tenant_id pointer
+    tenant_join = Tenant.id == Unit.current_tenant_id
     if not is_admin:
-        u_query = u_query.filter(Unit.company_id == company_id)
+        tenant_join = tenant_join & (Tenant.company_id == company_id)
     if not _include_deleted():
-        u_query = u_query.filter(Unit.deleted_at.is_(None))
-
-    units = u_query.order_by(Unit.id.asc()).all()
-    unit_ids = [u.id for u in units]
-
-    l_query = Lease.query
-    if unit_ids:
-        l_query = l_query.filter(Lease.unit_id.in_(unit_ids), Lease.is_active == True)
-    else:
-        l_query = l_query.filter(Lease.id == -1)
-
+        tenant_join = tenant_join & (Tenant.deleted_at.is_(None))
+
+    query = (
+        db.session.query(
+            Unit.id,
+            Unit.house_number,
+            Unit.status,
+            Unit.rent,
+            Unit.deposit,
+            Unit.garbage_fee,
+            Unit.water_rate,
+            Unit.current_lease_id,
+            Tenant.id.label("tenant_id"),
+            Tenant.full_name,
+            Tenant.email,
+            Tenant.phone,
+        )
+        .join(Property, property_join)
+        .outerjoin(Tenant, tenant_join)
+        .filter(Unit.property_id == property_id)
+    )
     if not is_admin:
-        l_query = l_query.filter(Lease.company_id == company_id)
+        query = query.filter(Unit.company_id == company_id)
     if not _include_deleted():
-        l_query = l_query.filter(Lease.deleted_at.is_(None))
-
-    active_leases = l_query.order_by(Lease.id.desc()).all()
+        query = query.filter(Unit.deleted_at.is_(None))
+
+    status = str(request.args.get("status", "")).strip().lower()
+    if status in ("vacant", "occupied"):
+        query = query.filter(Unit.status == status)
+
+    house_number = str(request.args.get("house_number", "")).strip()
+    if house_number:
+        # prefix match, served by uq_unit_property_house_number
+        escaped = house_number.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(Unit.house_number.like(f"{escaped}%", escape="\\"))
+
+    rows, meta, links = paginate_cursor(query, Unit.id)
+
+    if not rows:
+        # Only an empty page needs telling apart from a missing property
+        p_query = Property.query.filter(Property.id == property_id)
+        if not is_admin:
+            p_query = p_query.filter(Property.company_id == company_id)
+        if not _include_deleted():
+            p_query = p_query.filter(Property.deleted_at.is_(None))
+        if not db.session.query(p_query.exists()).scalar():
+            return jsonify({"error": "not_found"}), 404
 
-    lease_map = {}
-    for l in active_leases:
-        if l.unit_id not in lease_map:
-            lease_map[l.unit_id] = l
-
-    tenant_ids = [l.tenant_id for l in lease_map.values()]
-    t_query = Tenant.query
-    if tenant_ids:
-        t_query = t_query.filter(Tenant.id.in_(tenant_ids))
-    else:
-        t_query = t_query.filter(Tenant.id == -1)
-
-    if not is_admin:
-        t_query = t_query.filter(Tenant.company_id == company_id)
-    if not _include_deleted():
-        t_query = t_query.filter(Tenant.deleted_at.is_(None))
-
-    tenants = t_query.all()
-    tenant_map = {t.id: t for t in tenants}
-
-    payload = []
-    for u in units:
-        l = lease_map.get(u.id)
-        t = tenant_map.get(l.tenant_id) if l else None
-
-        payload.append({
-            "id": u.id,
-            "house_number": u.house_number,
-            "rent": float(u.rent),
-            "deposit": float(u.deposit),
-            "garbage_fee": float(u.garbage_fee),
-            "water_rate": float(u.water_rate),
-            "is_occupied": bool(l),
+    return jsonify({
+        "items": [{
+            "id": r.id,
+            "house_number": r.house_number,
+            "status": r.status,
+            "rent": float(r.rent),
+            "deposit": float(r.deposit),
+            "garbage_fee": float(r.garbage_fee),
+            "water_rate": float(r.water_rate),
+            "is_occupied": bool(r.current_lease_id),
             "current_tenant": {
-                "id": t.id,
-                "full_name": t.full_name,
-                "email": t.email,
-                "phone": t.phone
-            } if t else None
-        })
-
-    return jsonify(payload)
+                "id": r.tenant_id,
+                "full_name": r.full_name,
+                "email": r.email,
+                "phone": r.phone
+            } if r.tenant_id else None
+        } for r in rows],
+        "meta": meta,
+        "links": links,
+    })
@@ -0,0 +1,38 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+
+from ..utils.pagination import MAX_PER_PAGE, DEFAULT_PER_PAGE
+from ..utils.search import SEARCH_TYPES, search
+
+bp = Blueprint("search", __name__, url_prefix="/api/search")
+
+
+def _scope():
+    claims = get_jwt()
+    role = claims.get("role", "viewer")
+    company_id = claims.get("company_id")
+    is_admin = role == "admin"
+    return company_id, is_admin
+
+
+@bp.route("", methods=["GET"])
+@jwt_required()
+def search_all():
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"error": "missing_fields", "fields": ["q"]}), 400
+
+    types = [t.strip().lower() for t in request.args.get("types", "").split(",") if t.strip()]
+    if not types:
+        types = list(SEARCH_TYPES)
+    unknown = [t for t in types if t not in SEARCH_TYPES]
+    if unknown:
+        return jsonify({"error": "invalid_types", "types": unknown}), 400
+
+    limit = request.args.get("limit", type=int) or DEFAULT_PER_PAGE
+    limit = max(1, min(limit, MAX_PER_PAGE))
+
+    company_id, is_admin = _scope()
+    items = search(q, None if is_admin else company_id, types, limit)
+
+    return jsonify({"query": q, "items": items}), 200
@@ -7,6 +7,8 @@ from ..extensions import db
 from ..models import Tenant, Lease, Unit, Property
 from ..utils.pagination import paginate
 from ..utils.validation import require_fields
+from ..utils.query_budget import query_budget
+from ..utils.etag import collection_validator, make_etag, not_modified, with_etag
 
 bp = Blueprint("tenants", __name__, url_prefix="/api/tenants")
 
@@ -76,6 +78,7 @@ def create_tenant():
 
 
 @bp.route("", methods=["GET"])
+@query_budget(3)
 @jwt_required()
 def list_tenants():
     q = request.args.get("q", "").strip()
@@ -88,10 +91,16 @@ def list_tenants():
             (Tenant.phone.ilike(like))
         )
 
+    validator = collection_validator(query, Tenant)
+    etag = make_etag(*validator)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     query = query.order_by(Tenant.id.desc())
-    items, meta, links = paginate(query)
+    items, meta, links = paginate(query, total_items=validator[0])
 
-    return jsonify({
+    return with_etag(jsonify({
         "items": [{
             "id": t.id,
             "full_name": t.full_name,
@@ -101,7 +110,7 @@ def list_tenants():
         } for t in items],
         "meta": meta,
         "links": links,
-    })
+    }), etag)
 
 
 @bp.route("/<int:tenant_id>", methods=["GET"])
@@ -1,16 +1,26 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
+import re
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 
 from ..extensions import db
-from ..models import Unit, Property
-from ..utils.pagination import paginate
+from ..models import Unit, Property, UnitRate
+from ..utils.pagination import paginate, paginate_cursor
 from ..utils.validation import require_fields
 from ..utils.authz import require_any_role
+from ..utils.rates import BASELINE_DATE, RATE_FIELDS, record_unit_rates
+from ..utils.vacancy import cached_vacancy, vacancy_facets, vacant_units_query
+from ..utils.query_budget import query_budget
+from ..utils.etag import collection_validator, make_etag, not_modified, with_etag
 
 bp = Blueprint("units", __name__, url_prefix="/api/units")
 
+MAX_BULK_UNITS = 1000
+MONEY_FIELDS = ("rent", "garbage_fee", "water_rate", "deposit")
+
 
 def _scope():
     claims = get_jwt()
@@ -45,6 +55,17 @@ def _to_money(val, field):
     return d, None, None
 
 
+def _effective_from(data):
+    # Rate changes apply from this date (default today); earlier periods keep the old rates
+    raw = data.get("effective_from")
+    if raw in ("", None):
+        return None, None, None
+    try:
+        return date.fromisoformat(str(raw)), None, None
+    except ValueError:
+        return None, jsonify({"error": "invalid_date", "field": "effective_from"}), 400
+
+
 def _get_property_in_scope(property_id: int):
     company_id, is_admin = _scope()
     q = Property.query.filter(Property.id == property_id)
@@ -93,11 +114,134 @@ def create_unit():
         created_by_id=user_id,
     )
     db.session.add(item)
+    record_unit_rates(item, BASELINE_DATE, user_id)
     db.session.commit()
     return jsonify({"id": item.id}), 201
 
 
+def _expand_house_range(spec):
+    # "A-101..A-160" -> ["A-101", ..., "A-160"], keeping zero padding ("B-01..B-12")
+    m = re.fullmatch(r"\s*(.*?)(\d+)\s*\.\.\s*(.*?)(\d+)\s*", str(spec or ""))
+    if not m or m.group(1) != m.group(3):
+        return None
+    prefix, first, last = m.group(1), m.group(2), m.group(4)
+    lo, hi = int(first), int(last)
+    if hi < lo or hi - lo + 1 > MAX_BULK_UNITS:
+        return None
+    width = len(first) if first.startswith("0") else 0
+    return [f"{prefix}{n:0{width}d}" for n in range(lo, hi + 1)]
+
+
+@bp.route("/bulk", methods=["POST"])
+@jwt_required()
+@require_any_role("admin", "manager")
+def create_units_bulk():
+    data = request.get_json()
+    err = require_fields(data, ["property_id"])
+    if err:
+        return err
+
+    prop = _get_property_in_scope(int(data["property_id"]))
+    if not prop:
+        return jsonify({"error": "property_not_found"}), 404
+
+    # Shared rates apply to every row unless the row overrides them
+    shared = {k: data[k] for k in MONEY_FIELDS if data.get(k) not in ("", None)}
+
+    if data.get("house_range"):
+        house_numbers = _expand_house_range(data["house_range"])
+        if house_numbers is None:
+            return jsonify({"error": "invalid_house_range", "max": MAX_BULK_UNITS}), 400
+        rows = [{"house_number": hn} for hn in house_numbers]
+    else:
+        rows = data.get("units")
+        if not isinstance(rows, list) or not rows:
+            return jsonify({"error": "missing_fields", "fields": ["units"]}), 400
+
+    if len(rows) > MAX_BULK_UNITS:
+        return jsonify({"error": "too_many_units", "max": MAX_BULK_UNITS}), 400
+
+    user_id = int(get_jwt_identity())
+    errors = []
+    values = []
+    seen = {}
+
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"row": i, "error": "invalid_row"})
+            continue
+
+        merged = {**shared, **{k: v for k, v in row.items() if v not in ("", None)}}
+        missing = [f for f in ["house_number", *MONEY_FIELDS] if f not in merged]
+        if missing:
+            errors.append({"row": i, "error": "missing_fields", "fields": missing})
+            continue
+
+        house_number = str(merged["house_number"]).strip()
+        if not house_number or len(house_number) > 20:
+            errors.append({"row": i, "error": "invalid_house_number"})
+            continue
+        if house_number in seen:
+            errors.append({"row": i, "error": "duplicate_house_number", "other_row": seen[house_number]})
+            continue
+        seen[house_number] = i
+
+        item = {
+            "property_id": prop.id,
+            "company_id": prop.company_id,
+            "house_number": house_number,
+            "status": "vacant",
+            "created_by_id": user_id,
+        }
+        for key in MONEY_FIELDS:
+            val, e, st = _to_money(merged[key], key)
+            if e:
+                errors.append({"row": i, **e.get_json()})
+                break
+            item[key] = val
+        else:
+            values.append((i, item))
+
+    # One query for every clash with uq_unit_property_house_number
+    if seen:
+        taken = {
+            hn for (hn,) in (
+                db.session.query(Unit.house_number)
+                .filter(Unit.property_id == prop.id, Unit.house_number.in_(list(seen)))
+                .all()
+            )
+        }
+        for hn in taken:
+            errors.append({"row": seen[hn], "error": "house_number_exists", "house_number": hn})
+
+    if errors:
+        errors.sort(key=lambda e: e["row"])
+        return jsonify({"error": "validation_failed", "errors": errors}), 400
+
+    try:
+        inserted = db.session.execute(
+            insert(Unit).returning(Unit.id, Unit.house_number),
+            [item for _, item in values],
+        ).all()
+        by_house = {item["house_number"]: item for _, item in values}
+        db.session.execute(insert(UnitRate), [{
+            "unit_id": unit_id,
+            "effective_from": BASELINE_DATE,
+            "created_by_id": user_id,
+            **{k: by_house[house_number][k] for k in RATE_FIELDS},
+        } for unit_id, house_number in inserted])
+        ids = [unit_id for unit_id, _ in inserted]
+        db.session.commit()
+    except IntegrityError:
+        # Someone else created one of these house numbers in the meantime
+        db.session.rollback()
+        return jsonify({"error": "house_number_exists"}), 409
+
+    return jsonify({"created_count": len(ids), "ids": sorted(ids)}), 201
+
+
 @bp.route("", methods=["GET"])
+@query_budget(3)
 @jwt_required()
 def list_units():
     property_id = request.args.get("property_id")
@@ -113,10 +257,16 @@ def list_units():
     if status in ("vacant", "occupied"):
         query = query.filter(Unit.status == status)
 
+    validator = collection_validator(query, Unit)
+    etag = make_etag(*validator)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     query = query.order_by(Unit.id.desc())
-    items, meta, links = paginate(query)
+    items, meta, links = paginate(query, total_items=validator[0])
 
-    return jsonify({
+    return with_etag(jsonify({
         "items": [{
             "id": u.id,
             "property_id": u.property_id,
@@ -130,8 +280,60 @@ def list_units():
         } for u in items],
         "meta": meta,
         "links": links,
-    })
+    }), etag)
+
+@bp.route("/vacant", methods=["GET"])
+@query_budget(4)
+@jwt_required()
+def list_vacant_units():
+    company_id, is_admin = _scope()
 
+    filters = {}
+    for field in ("min_rent", "max_rent"):
+        raw = request.args.get(field)
+        if raw not in (None, ""):
+            val, e, s = _to_money(raw, field)
+            if e:
+                return e, s
+            filters[field] = val
+
+    property_id = request.args.get("property_id")
+    if property_id:
+        prop = _get_property_in_scope(int(property_id))
+        if not prop:
+            return jsonify({"error": "property_not_found"}), 404
+        filters["property_id"] = prop.id
+
+    location = str(request.args.get("location", "")).strip()
+    if location:
+        filters["location"] = location
+
+    scope = None if is_admin else company_id
+    filter_key = tuple(sorted((k, str(v)) for k, v in filters.items()))
+    key = ("vacant", scope, filter_key, request.args.get("cursor"), request.args.get("limit"))
+
+    def compute():
+        query = vacant_units_query(scope, **filters)
+        rows, meta, links = paginate_cursor(query, Unit.id)
+        return {
+            "items": [{
+                "id": r.id,
+                "property_id": r.property_id,
+                "property_name": r.property_name,
+                "location": r.location,
+                "house_number": r.house_number,
+                "rent": float(r.rent),
+                "garbage_fee": float(r.garbage_fee),
+                "water_rate": float(r.water_rate),
+                "deposit": float(r.deposit),
+            } for r in rows],
+            # facets don't depend on the page, so paging through reuses them
+            "facets": cached_vacancy(("vacant_facets", scope, filter_key), lambda: vacancy_facets(query)),
+            "meta": meta,
+            "links": links,
+        }
+
+    return jsonify(cached_vacancy(key, compute))
 
 
 @bp.route("/<int:unit_id>", methods=["GET"])
@@ -183,6 +385,12 @@ def update_unit(unit_id):
     if e:
         return e, s
 
+    effective_from, e, s = _effective_from(data)
+    if e:
+        return e, s
+
+    previous = {k: Decimal(str(getattr(u, k))) for k in RATE_FIELDS}
+
     u.property_id = prop.id
     u.company_id = prop.company_id
     u.house_number = str(data["house_number"]).strip()
@@ -191,6 +399,9 @@ def update_unit(unit_id):
     u.water_rate = water_rate
     u.deposit = deposit
 
+    if any(previous[k] != getattr(u, k) for k in RATE_FIELDS):
+        record_unit_rates(u, effective_from, int(get_jwt_identity()), previous)
+
     db.session.commit()
     return jsonify({"message": "unit updated"}), 200
 
@@ -217,6 +428,12 @@ def patch_unit(unit_id):
     if "house_number" in data and data["house_number"] not in ("", None):
         u.house_number = str(data["house_number"]).strip()
 
+    effective_from, e, s = _effective_from(data)
+    if e:
+        return e, s
+
+    previous = {k: Decimal(str(getattr(u, k))) for k in RATE_FIELDS}
+
     for key in ["rent", "garbage_fee", "water_rate", "deposit"]:
         if key in data and data[key] not in ("", None):
             val, e, s = _to_money(data[key], key)
@@ -224,6 +441,9 @@ def patch_unit(unit_id):
                 return e, s
             setattr(u, key, val)
 
+    if any(previous[k] != getattr(u, k) for k in RATE_FIELDS):
+        record_unit_rates(u, effective_from, int(get_jwt_identity()), previous)
+
     db.session.commit()
     return jsonify({"message": "unit updated"}), 200
 
@@ -2,10 +2,12 @@ from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 import re
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 
 from ..extensions import db
-from ..models import WaterReading, Unit, Tenant, Lease
+from ..models import WaterReading, Unit, Tenant
+from ..utils.scoped import get_in_scope
+from ..utils.webhooks import emit_event
 
 bp = Blueprint("water_readings", __name__, url_prefix="/api/water-readings")
 
@@ -72,10 +74,7 @@ def _reading_payload(unit, current, previous):
 
 
 def _get_unit_scoped(unit_id: int, company_id, is_admin):
-    q = Unit.query.filter(Unit.id == int(unit_id), Unit.deleted_at.is_(None))
-    if not is_admin:
-        q = q.filter(Unit.company_id == company_id)
-    return q.first()
+    return get_in_scope(Unit, unit_id, None if is_admin else company_id)
 
 
 def _get_reading_scoped(reading_id: int, company_id, is_admin):
@@ -168,7 +167,6 @@ def _water_to_dict(r: WaterReading):
     return {
         "id": r.id,
         "unit_id": r.unit_id,
-        "tenant_id": r.tenant_id,
         "company_id": r.company_id,
         "period": r.period,
         "reading_value": float(r.reading_value),
@@ -179,6 +177,18 @@ def _water_to_dict(r: WaterReading):
     }
 
 
+def _reading_event(r: WaterReading):
+    return {
+        "id": r.id,
+        "unit_id": r.unit_id,
+        "period": r.period,
+        "reading_value": float(r.reading_value),
+        "reading_at": r.reading_at.isoformat() + "Z",
+        "note": r.note,
+        "deleted_at": r.deleted_at.isoformat() + "Z" if r.deleted_at else None,
+    }
+
+
 @bp.post("")
 @jwt_required()
 def add_water_reading():
@@ -204,31 +214,18 @@ def add_water_reading():
 
     # Validate tenant belongs to an active lease in this unit (optional)
     if tenant_id:
-        tenant_q = Tenant.query.filter(Tenant.id == int(tenant_id), Tenant.deleted_at.is_(None))
-        if not is_admin:
-            tenant_q = tenant_q.filter(Tenant.company_id == company_id)
-        tenant = tenant_q.first()
+        tenant = get_in_scope(Tenant, tenant_id, None if is_admin else company_id)
         if not tenant:
             return jsonify({"error": "tenant_not_found"}), 404
 
-        lease_q = Lease.query.filter(
-            Lease.unit_id == unit.id,
-            Lease.tenant_id == tenant.id,
-            Lease.is_active == True,
-            Lease.deleted_at.is_(None),
-        )
-        if not is_admin:
-            lease_q = lease_q.filter(Lease.company_id == company_id)
-
-        lease = lease_q.order_by(Lease.id.desc()).first()
-        if not lease:
+        if not unit.current_lease_id or unit.current_tenant_id != tenant.id:
             return jsonify({"error": "no_active_lease_for_tenant_unit"}), 409
 
-    # Get existing row for the same unit + period (upsert)
+    # Get existing row for the same unit + period (upsert); a deleted one is
+    # brought back, uq_water_reading_unit_period allows only one per period
     existing = WaterReading.query.filter(
         WaterReading.unit_id == unit.id,
         WaterReading.period == period,
-        WaterReading.deleted_at.is_(None),
     )
     if not is_admin:
         existing = existing.filter(WaterReading.company_id == company_id)
@@ -251,14 +248,14 @@ def add_water_reading():
     if row:
         row.reading_value = reading_value
         row.reading_at = datetime.utcnow()
-        row.tenant_id = int(tenant_id) if tenant_id else None
         row.note = note
+        row.deleted_at = None
         db.session.add(row)
     else:
         row = WaterReading(
             unit_id=unit.id,
-            tenant_id=int(tenant_id) if tenant_id else None,
             company_id=unit.company_id,
+            created_by_id=int(get_jwt_identity()),
             period=period,
             reading_value=reading_value,
             reading_at=datetime.utcnow(),
@@ -267,6 +264,8 @@ def add_water_reading():
         )
         db.session.add(row)
 
+    db.session.flush()
+    emit_event(row.company_id, "water_reading.recorded", _reading_event(row))
     db.session.commit()
     return jsonify({
         "id": row.id,
@@ -282,14 +281,11 @@ def list_water_readings():
     company_id, is_admin = _scope()
 
     unit_id = request.args.get("unit_id", type=int)
-    tenant_id = request.args.get("tenant_id", type=int)
 
-    q = WaterReading.query
+    q = WaterReading.query.filter(WaterReading.deleted_at.is_(None))
 
     if unit_id:
         q = q.filter(WaterReading.unit_id == unit_id)
-    if tenant_id:
-        q = q.filter(WaterReading.tenant_id == tenant_id)
 
     if not is_admin:
         q = (
@@ -321,7 +317,7 @@ def update_water_reading(reading_id: int):
     company_id, is_admin = _scope()
 
     row = _get_reading_scoped(reading_id, company_id, is_admin)
-    if not row:
+    if not row or row.deleted_at:
         return jsonify({"error": "water_reading_not_found"}), 404
 
     data = request.get_json(silent=True) or {}
@@ -340,6 +336,7 @@ def update_water_reading(reading_id: int):
         row.note = data.get("note") or None
 
     db.session.add(row)
+    emit_event(row.company_id, "water_reading.updated", _reading_event(row))
     db.session.commit()
 
     return jsonify(_water_to_dict(row)), 200
@@ -352,11 +349,12 @@ def delete_water_reading(reading_id: int):
     company_id, is_admin = _scope()
 
     row = _get_reading_scoped(reading_id, company_id, is_admin)
-    if not row:
+    if not row or row.deleted_at:
         return jsonify({"error": "water_reading_not_found"}), 404
 
     row.deleted_at = datetime.utcnow()
     db.session.add(row)
+    emit_event(row.company_id, "water_reading.deleted", _reading_event(row))
     db.session.commit()
 
     return jsonify({"status": "deleted"}), 200
@@ -0,0 +1,201 @@
+from datetime import datetime
+from urllib.parse import urlparse
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+
+from ..extensions import db
+from ..models import WebhookAttempt, WebhookDelivery, WebhookSubscription
+from ..utils.authz import require_any_role
+from ..utils.validation import require_fields
+from ..utils.webhooks import EVENT_TYPES, allowed_hosts, new_secret, parse_event_types, url_block_reason
+
+bp = Blueprint("webhooks", __name__, url_prefix="/api/webhooks")
+
+
+def _scope():
+    claims = get_jwt()
+    role = claims.get("role", "viewer")
+    company_id = claims.get("company_id")
+    is_admin = role == "admin"
+    return company_id, is_admin
+
+
+def _subscription_in_scope(subscription_id: int):
+    company_id, is_admin = _scope()
+    q = WebhookSubscription.query.filter(WebhookSubscription.id == subscription_id)
+    if not is_admin:
+        q = q.filter(WebhookSubscription.company_id == company_id)
+    return q.first()
+
+
+def _valid_url(value) -> str | None:
+    url = str(value or "").strip()
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc or len(url) > 500:
+        return None
+    return url
+
+
+def _subscription_to_dict(s: WebhookSubscription, secret: bool = False):
+    out = {
+        "id": s.id,
+        "url": s.url,
+        "event_types": "*" if s.event_types == "*" else s.event_types.split(","),
+        "is_active": s.is_active,
+        "failure_count": s.failure_count,
+        "next_attempt_at": s.next_attempt_at.isoformat() + "Z",
+        "last_delivered_at": s.last_delivered_at.isoformat() + "Z" if s.last_delivered_at else None,
+        "paused_reason": s.paused_reason,
+        "created_at": s.created_at.isoformat() + "Z",
+    }
+    if secret:
+        # only shown when created or rotated
+        out["secret"] = s.secret
+    return out
+
+
+@bp.route("/event-types", methods=["GET"])
+@jwt_required()
+def list_event_types():
+    return jsonify(list(EVENT_TYPES)), 200
+
+
+@bp.route("", methods=["POST"])
+@jwt_required()
+@require_any_role("admin", "manager")
+def create_subscription():
+    data = request.get_json(silent=True)
+    err = require_fields(data, ["url"])
+    if err:
+        return err
+
+    url = _valid_url(data["url"])
+    if not url:
+        return jsonify({"error": "invalid_url"}), 400
+    reason = url_block_reason(url, allowed_hosts())
+    if reason:
+        return jsonify({"error": "url_not_allowed", "reason": reason}), 400
+    event_types = parse_event_types(data.get("event_types"))
+    if event_types is None:
+        return jsonify({"error": "invalid_event_types", "allowed": list(EVENT_TYPES)}), 400
+
+    company_id, _ = _scope()
+    if not company_id:
+        return jsonify({"error": "missing_company_scope"}), 401
+
+    s = WebhookSubscription(
+        company_id=company_id,
+        url=url,
+        secret=new_secret(),
+        event_types=event_types,
+        is_active=True,
+        created_by_id=int(get_jwt_identity()),
+    )
+    db.session.add(s)
+    db.session.commit()
+    return jsonify(_subscription_to_dict(s, secret=True)), 201
+
+
+@bp.route("", methods=["GET"])
+@jwt_required()
+@require_any_role("admin", "manager")
+def list_subscriptions():
+    company_id, is_admin = _scope()
+    q = WebhookSubscription.query
+    if not is_admin:
+        q = q.filter(WebhookSubscription.company_id == company_id)
+    items = q.order_by(WebhookSubscription.id.asc()).all()
+    return jsonify([_subscription_to_dict(s) for s in items]), 200
+
+
+@bp.route("/<int:subscription_id>", methods=["PATCH"])
+@jwt_required()
+@require_any_role("admin", "manager")
+def update_subscription(subscription_id):
+    s = _subscription_in_scope(subscription_id)
+    if not s:
+        return jsonify({"error": "not_found"}), 404
+
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({"error": "invalid_json"}), 400
+
+    if "url" in data:
+        url = _valid_url(data["url"])
+        if not url:
+            return jsonify({"error": "invalid_url"}), 400
+        reason = url_block_reason(url, allowed_hosts())
+        if reason:
+            return jsonify({"error": "url_not_allowed", "reason": reason}), 400
+        s.url = url
+    if "event_types" in data:
+        event_types = parse_event_types(data["event_types"])
+        if event_types is None:
+            return jsonify({"error": "invalid_event_types", "allowed": list(EVENT_TYPES)}), 400
+        s.event_types = event_types
+    if "is_active" in data:
+        s.is_active = bool(data["is_active"])
+        if s.is_active:
+            # resume now: whatever was pending when it was paused goes out first
+            s.failure_count = 0
+            s.next_attempt_at = datetime.utcnow()
+            s.paused_reason = None
+    rotated = bool(data.get("rotate_secret"))
+    if rotated:
+        s.secret = new_secret()
+
+    db.session.commit()
+    return jsonify(_subscription_to_dict(s, secret=rotated)), 200
+
+
+@bp.route("/<int:subscription_id>", methods=["DELETE"])
+@jwt_required()
+@require_any_role("admin", "manager")
+def delete_subscription(subscription_id):
+    s = _subscription_in_scope(subscription_id)
+    if not s:
+        return jsonify({"error": "not_found"}), 404
+
+    WebhookDelivery.query.filter(WebhookDelivery.subscription_id == s.id).delete(synchronize_session=False)
+    WebhookAttempt.query.filter(WebhookAttempt.subscription_id == s.id).delete(synchronize_session=False)
+    db.session.delete(s)
+    db.session.commit()
+    return jsonify({"message": "subscription deleted"}), 200
+
+
+@bp.route("/<int:subscription_id>/attempts", methods=["GET"])
+@jwt_required()
+@require_any_role("admin", "manager")
+def list_attempts(subscription_id):
+    s = _subscription_in_scope(subscription_id)
+    if not s:
+        return jsonify({"error": "not_found"}), 404
+
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 200)
+    attempts = (
+        WebhookAttempt.query
+        .filter(WebhookAttempt.subscription_id == s.id)
+        .order_by(WebhookAttempt.attempted_at.desc(), WebhookAttempt.id.desc())
+        .limit(limit)
+        .all()
+    )
+    pending = (
+        db.session.query(db.func.count(WebhookDelivery.id))
+        .filter(WebhookDelivery.subscription_id == s.id, WebhookDelivery.delivered_at.is_(None))
+        .scalar()
+    )
+    return jsonify({
+        "subscription": _subscription_to_dict(s),
+        "pending_events": pending,
+        "attempts": [{
+            "id": a.id,
+            "attempted_at": a.attempted_at.isoformat() + "Z",
+            "event_count": a.event_count,
+            "first_event_id": a.first_event_id,
+            "last_event_id": a.last_event_id,
+            "status_code": a.status_code,
+            "error": a.error,
+            "duration_ms": a.duration_ms,
+        } for a in attempts],
+    }), 200
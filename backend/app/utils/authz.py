@@ -2,6 +2,8 @@ from functools import wraps
 from flask import jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
 
+from .scoped import get_in_scope
+
 
 def require_any_role(*roles):
     allowed = {r.lower() for r in roles}
@@ -42,11 +44,8 @@ def require_scope(model):
             if not obj_id:
                 return jsonify({"error": "scope_check_failed"}), 400
 
-            obj = (
-                model.query
-                .filter(model.id == int(obj_id), model.company_id == company_id)
-                .first()
-            )
+            # the view's own get_in_scope() for this id finds it in the session
+            obj = get_in_scope(model, obj_id, company_id, include_deleted=True)
             if not obj:
                 return jsonify({"error": "not_found"}), 404
 
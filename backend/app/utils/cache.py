@@ -0,0 +1,66 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Small thread-safe per-process cache with expiry.
+
+    Each key also has a generation counter that invalidate() bumps. Callers
+    that compute a value from the database read the generation first and pass
+    it to set(), so a result computed before an invalidation is never stored
+    after it.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._data = {}
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            expires_at, value = hit
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def generation(self, key):
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    def set(self, key, value, generation=None):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(key, 0)):
+                return
+            if len(self._data) >= self.max_entries and key not in self._data:
+                self._evict()
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._epoch += 1
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [k for k, (exp, _) in self._data.items() if exp < now]
+        for k in expired:
+            del self._data[k]
+        if len(self._data) >= self.max_entries:
+            # drop the entry closest to expiry
+            oldest = min(self._data, key=lambda k: self._data[k][0])
+            del self._data[oldest]
@@ -0,0 +1,281 @@
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import case, event, func, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..models import Company, Invoice, Lease, Payment, Property, Unit
+from .cache import TTLCache
+
+# Replaced with the configured TTL by init_dashboard_cache(). Entries are
+# (company.dashboard_version, payload): a write commits in one worker, bumps
+# the version, and every other worker rebuilds on its next read.
+dashboard_cache = TTLCache(ttl_seconds=60)
+
+_WATCHED = (Unit, Lease, Payment, Invoice, Property)
+
+
+def _month_bounds(today: date):
+    start = date(today.year, today.month, 1)
+    if today.month == 12:
+        end = date(today.year + 1, 1, 1)
+    else:
+        end = date(today.year, today.month + 1, 1)
+    return start, end
+
+
+def compute_portfolio(company_id: int, today: date | None = None) -> dict:
+    """
+    Per-property occupancy, rent roll, billing and arrears for one company,
+    in a single round trip: each figure is a grouped subquery keyed by
+    property_id, outer-joined onto the company's properties.
+    """
+    today = today or date.today()
+    month_start, month_end = _month_bounds(today)
+
+    live_unit = (Unit.company_id == company_id) & (Unit.deleted_at.is_(None))
+
+    units_agg = (
+        db.session.query(
+            Unit.property_id.label("property_id"),
+            func.count(Unit.id).label("total_units"),
+            func.sum(case((Unit.status == "occupied", 1), else_=0)).label("occupied_units"),
+            func.sum(case((Unit.status == "occupied", Unit.rent), else_=0)).label("rent_roll"),
+        )
+        .filter(live_unit)
+        .group_by(Unit.property_id)
+        .subquery()
+    )
+
+    billed_agg = (
+        db.session.query(
+            Unit.property_id.label("property_id"),
+            func.sum(Invoice.total).label("billed"),
+        )
+        .join(Unit, Unit.id == Invoice.unit_id)
+        .filter(
+            Invoice.company_id == company_id,
+            Invoice.deleted_at.is_(None),
+            Invoice.status != "void",
+            Invoice.period_start >= month_start,
+            Invoice.period_start < month_end,
+        )
+        .group_by(Unit.property_id)
+        .subquery()
+    )
+
+    collected_agg = (
+        db.session.query(
+            Unit.property_id.label("property_id"),
+            func.sum(Payment.amount).label("collected"),
+        )
+        .join(Unit, Unit.id == Payment.unit_id)
+        .filter(live_unit, Payment.paid_for_month == month_start)
+        .group_by(Unit.property_id)
+        .subquery()
+    )
+
+    # Arrears: per unit, everything invoiced minus everything paid, counting
+    # only units that owe money (one tenant's credit doesn't hide another's debt)
+    invoiced_by_unit = (
+        db.session.query(Invoice.unit_id.label("unit_id"), func.sum(Invoice.total).label("amount"))
+        .filter(
+            Invoice.company_id == company_id,
+            Invoice.deleted_at.is_(None),
+            Invoice.status != "void",
+        )
+        .group_by(Invoice.unit_id)
+        .subquery()
+    )
+    paid_by_unit = (
+        db.session.query(Payment.unit_id.label("unit_id"), func.sum(Payment.amount).label("amount"))
+        .join(Unit, Unit.id == Payment.unit_id)
+        .filter(Unit.company_id == company_id)
+        .group_by(Payment.unit_id)
+        .subquery()
+    )
+    owed = invoiced_by_unit.c.amount - func.coalesce(paid_by_unit.c.amount, 0)
+    arrears_agg = (
+        db.session.query(
+            Unit.property_id.label("property_id"),
+            func.sum(case((owed > 0, owed), else_=0)).label("arrears"),
+        )
+        .join(invoiced_by_unit, invoiced_by_unit.c.unit_id == Unit.id)
+        .outerjoin(paid_by_unit, paid_by_unit.c.unit_id == Unit.id)
+        .filter(live_unit)
+        .group_by(Unit.property_id)
+        .subquery()
+    )
+
+    rows = (
+        db.session.query(
+            Property.id,
+            Property.name,
+            Property.location,
+            func.coalesce(units_agg.c.total_units, 0),
+            func.coalesce(units_agg.c.occupied_units, 0),
+            func.coalesce(units_agg.c.rent_roll, 0),
+            func.coalesce(billed_agg.c.billed, 0),
+            func.coalesce(collected_agg.c.collected, 0),
+            func.coalesce(arrears_agg.c.arrears, 0),
+        )
+        .outerjoin(units_agg, units_agg.c.property_id == Property.id)
+        .outerjoin(billed_agg, billed_agg.c.property_id == Property.id)
+        .outerjoin(collected_agg, collected_agg.c.property_id == Property.id)
+        .outerjoin(arrears_agg, arrears_agg.c.property_id == Property.id)
+        .filter(Property.company_id == company_id, Property.deleted_at.is_(None))
+        .order_by(Property.name.asc(), Property.id.asc())
+        .all()
+    )
+
+    properties = []
+    totals = {
+        "total_units": 0,
+        "occupied_units": 0,
+        "rent_roll": 0.0,
+        "billed": 0.0,
+        "collected": 0.0,
+        "arrears": 0.0,
+    }
+    for pid, name, location, total_units, occupied, rent_roll, billed, collected, arrears in rows:
+        item = {
+            "property_id": pid,
+            "name": name,
+            "location": location,
+            "total_units": int(total_units),
+            "occupied_units": int(occupied),
+            "vacancy_pct": round(100.0 * (total_units - occupied) / total_units, 2) if total_units else 0.0,
+            "rent_roll": float(rent_roll),
+            "billed": float(billed),
+            "collected": float(collected),
+            "arrears": float(arrears),
+        }
+        properties.append(item)
+        for k in totals:
+            totals[k] += item[k]
+
+    totals["vacancy_pct"] = (
+        round(100.0 * (totals["total_units"] - totals["occupied_units"]) / totals["total_units"], 2)
+        if totals["total_units"] else 0.0
+    )
+
+    return {
+        "company_id": company_id,
+        "month": month_start.isoformat()[:7],
+        "properties": properties,
+        "totals": totals,
+    }
+
+
+def _dashboard_version(company_id: int) -> int:
+    version = db.session.query(Company.dashboard_version).filter(Company.id == company_id).scalar()
+    return version or 0
+
+
+def portfolio_for_company(company_id: int) -> dict:
+    key = ("portfolio", company_id)
+    # read before computing: a write landing in between leaves the entry
+    # behind the new version, so it is rebuilt rather than served stale
+    version = _dashboard_version(company_id)
+    cached = dashboard_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    gen = dashboard_cache.generation(key)
+    payload = compute_portfolio(company_id)
+    dashboard_cache.set(key, (version, payload), generation=gen)
+    return payload
+
+
+def invalidate_company(company_id):
+    dashboard_cache.invalidate(("portfolio", company_id))
+
+
+def _bump_versions(company_ids=None):
+    """Tell the other workers; None bumps every company."""
+    stmt = update(Company).values(dashboard_version=Company.dashboard_version + 1)
+    if company_ids is not None:
+        stmt = stmt.where(Company.id.in_(sorted(company_ids)))
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+    except SQLAlchemyError:
+        # the caller's data is already committed; other workers catch up
+        # when their copy expires
+        current_app.logger.exception("dashboard version bump failed")
+
+
+def _company_id_for(session, obj):
+    company_id = getattr(obj, "company_id", None)
+    if company_id is None and getattr(obj, "unit_id", None):
+        # Payment has no company_id of its own
+        unit = session.get(Unit, obj.unit_id)
+        company_id = unit.company_id if unit else None
+    return company_id
+
+
+def _after_flush(session, flush_context):
+    dirty = session.info.setdefault("dashboard_dirty_companies", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _WATCHED):
+            company_id = _company_id_for(session, obj)
+            if company_id is not None:
+                dirty.add(company_id)
+
+
+def _after_commit(session):
+    dirty = session.info.pop("dashboard_dirty_companies", set())
+    everything = session.info.pop("dashboard_dirty_all", False)
+    for company_id in dirty:
+        invalidate_company(company_id)
+    if everything:
+        _bump_versions()
+    elif dirty:
+        _bump_versions(dirty)
+
+
+def _after_rollback(session):
+    session.info.pop("dashboard_dirty_companies", None)
+    session.info.pop("dashboard_dirty_all", None)
+
+
+def _do_orm_execute(orm_execute_state):
+    # session.execute(insert(Model), rows) bypasses flush as well, but the
+    # rows carry their company, so it can wait for the commit like a flush
+    if not orm_execute_state.is_insert:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in _WATCHED:
+        return
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, (list, tuple)) else [params or {}]
+    dirty = orm_execute_state.session.info.setdefault("dashboard_dirty_companies", set())
+    for row in rows:
+        company_id = row.get("company_id")
+        if company_id is None:
+            dashboard_cache.clear()
+            orm_execute_state.session.info["dashboard_dirty_all"] = True
+            return
+        dirty.add(company_id)
+
+
+def _after_bulk(update_context):
+    # Query.update()/delete() bypass flush, so we don't know the company
+    if update_context.mapper.class_ in _WATCHED:
+        dashboard_cache.clear()
+        update_context.session.info["dashboard_dirty_all"] = True
+
+
+def init_dashboard_cache(app):
+    global dashboard_cache
+    dashboard_cache = TTLCache(ttl_seconds=app.config.get("DASHBOARD_CACHE_TTL", 60))
+
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+        event.listen(Session, "after_bulk_update", _after_bulk)
+        event.listen(Session, "after_bulk_delete", _after_bulk)
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import NullPool, QueuePool
+
+# Recent checkout waits kept per worker for the percentiles
+WAIT_WINDOW = 1024
+
+
+class PoolStats:
+    """Cumulative counters for one pool in this worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.waits = deque(maxlen=WAIT_WINDOW)
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.waits.append(seconds)
+
+    def incr(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self.waits)
+            n = len(waits)
+            return {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "mean": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                    "p95_recent": round(waits[min(n - 1, int(n * 0.95))] * 1000, 3) if n else 0.0,
+                    "max": round(self.wait_max * 1000, 3),
+                },
+            }
+
+
+def stats_for(pool) -> PoolStats:
+    """The pool's own counters, so the primary and replica pools are reported apart."""
+    stats = pool.__dict__.get("_pool_stats")
+    if stats is None:
+        stats = pool.__dict__.setdefault("_pool_stats", PoolStats())
+    return stats
+
+
+class _TimedPool:
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; its counters carry on
+        pool = super().recreate()
+        pool._pool_stats = stats_for(self)
+        return pool
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            stats_for(self).record_wait(time.perf_counter() - t0, timed_out=True)
+            raise
+        stats_for(self).record_wait(time.perf_counter() - t0)
+        return conn
+
+
+class TimedNullPool(_TimedPool, NullPool):
+    def _do_get(self):
+        t0 = time.perf_counter()
+        conn = super()._do_get()
+        stats_for(self).record_wait(time.perf_counter() - t0)
+        return conn
+
+
+def engine_options(config) -> dict:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings.
+
+    DB_PGBOUNCER=1 is for PgBouncer in transaction mode: PgBouncer does the
+    pooling, so workers don't hold server connections (NullPool by default),
+    and nothing relies on per-connection session state. statement_timeout is
+    then set per transaction with SET LOCAL instead of as a startup option,
+    which PgBouncer rejects.
+    """
+    uri = config.get("SQLALCHEMY_DATABASE_URI") or ""
+    options = dict(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+
+    is_sqlite = uri.startswith("sqlite")
+    if is_sqlite and (uri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in uri):
+        # in-memory databases need Flask-SQLAlchemy's single shared connection
+        return options
+
+    pool_class = config.get("DB_POOL_CLASS") or ("null" if config.get("DB_PGBOUNCER") else "queue")
+    if pool_class == "null":
+        options["poolclass"] = TimedNullPool
+    else:
+        options["poolclass"] = TimedQueuePool
+        options["pool_size"] = config.get("DB_POOL_SIZE", 5)
+        options["max_overflow"] = config.get("DB_MAX_OVERFLOW", 10)
+        options["pool_timeout"] = config.get("DB_POOL_TIMEOUT", 30)
+        options["pool_recycle"] = config.get("DB_POOL_RECYCLE", 1800)
+        options["pool_use_lifo"] = config.get("DB_POOL_USE_LIFO", True)
+    options["pool_pre_ping"] = config.get("DB_POOL_PRE_PING", True)
+
+    if is_sqlite:
+        return options
+
+    connect_args = dict(options.get("connect_args") or {})
+    if config.get("DB_CONNECT_TIMEOUT"):
+        connect_args["connect_timeout"] = config["DB_CONNECT_TIMEOUT"]
+    if config.get("DB_STATEMENT_TIMEOUT_MS") and not config.get("DB_PGBOUNCER"):
+        connect_args["options"] = f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT_MS'])}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def max_connections_per_worker(config) -> int | None:
+    """Upper bound on connections one worker process can hold; None if unbounded/unknown."""
+    options = config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    if options.get("poolclass") is TimedQueuePool:
+        return options["pool_size"] + options["max_overflow"]
+    return None
+
+
+_instrumented = weakref.WeakSet()
+
+
+def _listen_pool_events(engine):
+    # engine.pool is looked up per event: dispose() replaces the pool object
+    def on_connect(dbapi_conn, record):
+        stats_for(engine.pool).incr("connects")
+
+    def on_checkout(dbapi_conn, record, proxy):
+        stats_for(engine.pool).incr("checkouts")
+
+    def on_invalidate(dbapi_conn, record, exc):
+        stats_for(engine.pool).incr("invalidations")
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "invalidate", on_invalidate)
+
+
+def init_db_pool(app):
+    """Call before db.init_app(): fills in engine options from config."""
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
+
+def init_pool_metrics(app, *engines):
+    """Call after db.init_app() with the app's engines."""
+    timeout_ms = app.config.get("DB_STATEMENT_TIMEOUT_MS")
+    for engine in engines:
+        if engine not in _instrumented:
+            _instrumented.add(engine)
+            _listen_pool_events(engine)
+
+        if timeout_ms and app.config.get("DB_PGBOUNCER") and engine.dialect.name == "postgresql":
+            @event.listens_for(engine, "begin")
+            def _statement_timeout(conn):
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    payload = {
+        "pid": os.getpid(),
+        "pool_class": type(pool).__name__,
+        "status": pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        size = pool.size()
+        payload.update({
+            "size": size,
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # negative until the pool has opened `size` connections
+            "overflow": pool.overflow(),
+            "utilization": round(pool.checkedout() / (size + pool._max_overflow), 3)
+            if size + pool._max_overflow else None,
+        })
+    payload.update(stats_for(pool).snapshot())
+    return payload
+
+
+def server_connections(engine) -> dict | None:
+    """Postgres-side view: max_connections and connections to this database."""
+    if engine.dialect.name != "postgresql":
+        return None
+    with engine.connect() as conn:
+        max_conn = int(conn.execute(text("SHOW max_connections")).scalar())
+        in_use = conn.execute(
+            text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()")
+        ).scalar()
+    return {"max_connections": max_conn, "connections_to_database": in_use}
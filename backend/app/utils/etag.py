@@ -0,0 +1,50 @@
+import hashlib
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt
+from sqlalchemy import func
+
+# Conditional GET for endpoints that clients poll. The validator is computed
+# with one cheap query before any rows are loaded; if it matches the
+# client's If-None-Match the view answers 304 without paginating or
+# serializing anything.
+#
+# Bump when a serializer's output changes, so cached bodies are invalidated.
+ETAG_VERSION = "1"
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the validator parts, the request URL and the caller's scope."""
+    claims = get_jwt()
+    key = "|".join(map(str, (
+        ETAG_VERSION, request.url, claims.get("company_id"), claims.get("role"), *parts,
+    )))
+    return hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+
+
+def collection_validator(query, model):
+    """
+    (count, max(updated_at), max(id)) over the filtered query, in one query.
+    Inserts, edits and soft deletes move updated_at or max(id); hard deletes
+    change the count.
+    """
+    return tuple(
+        query.order_by(None)
+        .with_entities(func.count(model.id), func.max(model.updated_at), func.max(model.id))
+        .one()
+    )
+
+
+def not_modified(etag: str):
+    """A 304 response if the client already has `etag`, else None."""
+    if request.if_none_match.contains_weak(etag):
+        return with_etag(current_app.response_class(status=304), etag)
+    return None
+
+
+def with_etag(response, etag: str):
+    response.set_etag(etag, weak=True)
+    # per-user data: browsers may keep it but must revalidate, shared caches mustn't
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Authorization")
+    return response
@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import text
+
+from ..extensions import db
+
+
+def _try_lock(conn, key) -> bool:
+    # session-level lock: survives the commit, which keeps the connection out of "idle in transaction"
+    locked = bool(conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": key}).scalar())
+    conn.commit()
+    return locked
+
+
+def _unlock(conn, key):
+    conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": key})
+    conn.commit()
+
+
+@contextmanager
+def job_lock(key: int):
+    """
+    Let one process at a time run a job across all workers: yields False if
+    another holds `key`. Uses a Postgres advisory lock on a connection of its
+    own. Elsewhere it always yields True: SQLite has no such lock, and
+    session-level advisory locks don't work through PgBouncer transaction
+    pooling, so there concurrent runs have to be tolerated by the job.
+    """
+    if db.engine.dialect.name != "postgresql" or current_app.config.get("DB_PGBOUNCER"):
+        yield True
+        return
+
+    conn = db.engine.connect()
+    try:
+        if not _try_lock(conn, key):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            _unlock(conn, key)
+    finally:
+        conn.close()
@@ -0,0 +1,84 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib fallback below produces the same output, just slower
+    orjson = None
+
+# Responses are encoded with orjson when it's installed, else with the stdlib,
+# and both paths produce the same bytes. Compared with Flask's default
+# provider the documents parse the same (sorted keys, compact) but aren't
+# byte-identical: non-ASCII goes out as raw UTF-8 rather than \u escapes.
+# Views may also return Decimal, date and datetime values directly:
+# - Decimal -> number, or a fixed 2-dp string with JSON_DECIMAL_FORMAT = "string"
+# - date -> "YYYY-MM-DD"; datetime -> ISO 8601, naive values taken as UTC (we
+#   store UTC) and UTC written with a "Z" suffix, as orjson's OPT_UTC_Z does
+
+_TWO_PLACES = Decimal("0.01")
+
+
+def _iso_datetime(d: datetime) -> str:
+    if d.tzinfo is None:
+        return d.isoformat() + "Z"
+    out = d.isoformat()
+    return out[:-6] + "Z" if out.endswith("+00:00") else out
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    decimal_format = "float"
+
+    def __init__(self, app):
+        super().__init__(app)
+        # orjson always writes UTF-8; the stdlib path matches it
+        self.ensure_ascii = False
+        self.decimal_format = app.config.get("JSON_DECIMAL_FORMAT", "float")
+        self._orjson_options = 0
+        if orjson is not None:
+            self._orjson_options = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                self._orjson_options |= orjson.OPT_SORT_KEYS
+
+    def _default(self, o):
+        if isinstance(o, Decimal):
+            if self.decimal_format == "string":
+                return str(o.quantize(_TWO_PLACES))
+            return float(o)
+        if isinstance(o, datetime):
+            return _iso_datetime(o)
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, default=self._default, option=self._orjson_options).decode()
+            except TypeError:
+                pass  # e.g. ints beyond 64 bits; let the stdlib have a go
+        kwargs.setdefault("default", self._default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        if kwargs.get("indent") is None:
+            # orjson never pads; without this, bodies signed from dumps()
+            # (webhook events) would differ by whether orjson is installed
+            kwargs.setdefault("separators", (",", ":"))
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        compact = self.compact or (self.compact is None and not self._app.debug)
+        if orjson is not None and compact:
+            try:
+                body = orjson.dumps(obj, default=self._default, option=self._orjson_options)
+            except TypeError:
+                body = self.dumps(obj).encode()
+            return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
+
+
+def init_json(app):
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+from ..extensions import db
+from ..models import Company, Lease, LeaseNotice
+
+EXPIRY_RECIPIENTS = ("tenant", "landlord")
+
+
+def leases_ending_between(company_id: int, start: date, end: date):
+    # Range scan on ix_lease_company_end_date
+    return (
+        db.session.query(Lease.id, Lease.end_date)
+        .filter(
+            Lease.company_id == company_id,
+            Lease.end_date >= start,
+            Lease.end_date <= end,
+            Lease.is_active == True,
+            Lease.deleted_at.is_(None),
+        )
+        .order_by(Lease.end_date.asc(), Lease.id.asc())
+        .all()
+    )
+
+
+def queue_expiry_notices(days: int, today: date | None = None) -> dict:
+    """
+    Queue one tenant and one landlord notice for every active lease ending
+    in the next `days` days. Safe to run more than once a day: notices that
+    already exist for a lease/end_date are skipped.
+    """
+    today = today or date.today()
+    until = today + timedelta(days=days)
+
+    scanned = 0
+    queued = 0
+
+    company_ids = [cid for (cid,) in db.session.query(Company.id).all()]
+    for company_id in company_ids:
+        rows = leases_ending_between(company_id, today, until)
+        if not rows:
+            continue
+        scanned += len(rows)
+
+        lease_ids = [r.id for r in rows]
+        existing = {
+            (n.lease_id, n.recipient, n.lease_end_date)
+            for n in (
+                db.session.query(LeaseNotice.lease_id, LeaseNotice.recipient, LeaseNotice.lease_end_date)
+                .filter(
+                    LeaseNotice.lease_id.in_(lease_ids),
+                    LeaseNotice.kind == "lease_expiry",
+                )
+                .all()
+            )
+        }
+
+        new_rows = []
+        for r in rows:
+            for recipient in EXPIRY_RECIPIENTS:
+                if (r.id, recipient, r.end_date) in existing:
+                    continue
+                new_rows.append({
+                    "company_id": company_id,
+                    "lease_id": r.id,
+                    "kind": "lease_expiry",
+                    "recipient": recipient,
+                    "lease_end_date": r.end_date,
+                    "status": "queued",
+                })
+
+        if new_rows:
+            db.session.bulk_insert_mappings(LeaseNotice, new_rows)
+            queued += len(new_rows)
+
+        db.session.commit()
+
+    return {"scanned": scanned, "queued": queued}
@@ -0,0 +1,273 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Per-request wall time, DB time and SQL statement count, aggregated per
+# endpoint into Prometheus histograms and served at /metrics.
+#
+# Each worker aggregates in memory. With METRICS_DIR set (gunicorn), workers
+# also write a snapshot to METRICS_DIR/worker-<pid>.json at most every
+# METRICS_FLUSH_SECONDS, and /metrics sums every snapshot, so any worker can
+# answer a scrape for all of them. Snapshots of dead workers are folded into
+# archive.json so counters never go backwards when workers are recycled.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Wall time per request", LATENCY_BUCKETS),
+    "http_request_db_seconds": ("Time spent in SQL per request", LATENCY_BUCKETS),
+    "http_request_queries": ("SQL statements per request", QUERY_BUCKETS),
+}
+COUNTERS = {
+    "http_requests_total": "Requests by endpoint, method and status",
+}
+
+ARCHIVE = "archive.json"
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (name, labels) -> [bucket counts..., sum, count] / counter value
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        idx = bisect_left(buckets, value)
+        with self._lock:
+            h = self.histograms.get((name, labels))
+            if h is None:
+                h = self.histograms[(name, labels)] = [0] * (len(buckets) + 1) + [0.0, 0]
+            # per-bucket (not cumulative) counts; the last slot is +Inf
+            h[idx] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + amount
+
+    def dump(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": [[n, list(l), list(v)] for (n, l), v in self.histograms.items()],
+                "counters": [[n, list(l), v] for (n, l), v in self.counters.items()],
+            }
+
+
+def _merge(into: Registry, data: dict):
+    for name, labels, values in data.get("histograms", []):
+        if name not in HISTOGRAMS:
+            continue
+        key = (name, tuple(tuple(x) for x in labels))
+        h = into.histograms.get(key)
+        if h is None:
+            into.histograms[key] = list(values)
+        else:
+            for i, v in enumerate(values):
+                h[i] += v
+    for name, labels, value in data.get("counters", []):
+        key = (name, tuple(tuple(x) for x in labels))
+        into.counters[key] = into.counters.get(key, 0) + value
+
+
+registry = Registry()
+_last_flush = 0.0
+# one snapshot writer at a time per worker: request threads and scrapes all flush
+_flush_lock = threading.Lock()
+
+
+def _write_json(path, data):
+    # unique per thread as well as per process, so concurrent writers never share a temp file
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _flush_locked(directory: str):
+    global _last_flush
+    _write_json(os.path.join(directory, f"worker-{os.getpid()}.json"), registry.dump())
+    _last_flush = time.monotonic()
+
+
+def flush(directory: str):
+    with _flush_lock:
+        _flush_locked(directory)
+
+
+def flush_if_due(directory: str, interval: float):
+    """Flush unless this worker flushed less than `interval` seconds ago."""
+    if time.monotonic() - _last_flush < interval:
+        return
+    with _flush_lock:
+        # another thread may have flushed while this one waited
+        if time.monotonic() - _last_flush >= interval:
+            _flush_locked(directory)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def mark_process_dead(directory: str, pid: int):
+    """Fold a dead worker's snapshot into the archive (gunicorn child_exit hook)."""
+    path = os.path.join(directory, f"worker-{pid}.json")
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            return
+        archive = Registry()
+        _merge(archive, _read(os.path.join(directory, ARCHIVE)))
+        _merge(archive, _read(path))
+        _write_json(os.path.join(directory, ARCHIVE), archive.dump())
+        os.remove(path)
+
+
+def collect(directory: str | None) -> Registry:
+    if not directory:
+        return registry
+    flush(directory)
+    total = Registry()
+    for name in os.listdir(directory):
+        if name.startswith("worker-") and name.endswith(".json"):
+            pid = int(name[len("worker-"):-len(".json")])
+            if not _pid_alive(pid):
+                mark_process_dead(directory, pid)
+                continue
+            _merge(total, _read(os.path.join(directory, name)))
+    # read after any folding above, under the same lock as writers
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        _merge(total, _read(os.path.join(directory, ARCHIVE)))
+    return total
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs, extra=()) -> str:
+    items = list(pairs) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _fmt(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def render(reg: Registry) -> str:
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (n, labels), values in sorted(reg.histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], values[:-2]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _fmt(bound)
+                lines.append(f"{name}_bucket{_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_fmt(float(values[-2]))}")
+            lines.append(f"{name}_count{_labels(labels)} {values[-1]}")
+    for name, help_text in COUNTERS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (n, labels), value in sorted(reg.counters.items()):
+            if n == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "metrics_start" in g:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if starts and has_request_context() and "metrics_start" in g:
+        g.metrics_db_time += time.perf_counter() - starts.pop()
+        g.metrics_queries += 1
+
+
+def _handle_error(context):
+    starts = context.connection.info.get("metrics_query_start") if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_db_time = 0.0
+    g.metrics_queries = 0
+
+
+def _record_request(response):
+    start = g.pop("metrics_start", None)
+    if start is None or request.endpoint == "metrics":
+        return response
+
+    endpoint = request.endpoint or "unmatched"
+    labels = (("endpoint", endpoint), ("method", request.method))
+    registry.observe("http_request_duration_seconds", labels, time.perf_counter() - start)
+    registry.observe("http_request_db_seconds", labels, g.metrics_db_time)
+    registry.observe("http_request_queries", labels, g.metrics_queries)
+    registry.inc("http_requests_total", labels + (("status", str(response.status_code)),))
+
+    directory = current_app.config.get("METRICS_DIR")
+    if directory:
+        flush_if_due(directory, current_app.config.get("METRICS_FLUSH_SECONDS", 5))
+    return response
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    body = render(collect(current_app.config.get("METRICS_DIR")))
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app, *engines):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    directory = app.config.get("METRICS_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(engine, "handle_error", _handle_error)
+
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
@@ -0,0 +1,90 @@
+from datetime import date
+
+from sqlalchemy import bindparam, text
+
+from ..extensions import db
+from ..models import Lease, Unit
+
+
+# Unit occupancy transitions (lease start, lease end, move-out) all follow the
+# same shape so concurrent staff actions serialize on the unit row:
+#
+#   1. validate the request without holding any lock
+#   2. lock_unit()            -> row lock held until commit/rollback
+#   3. re-check leases under the lock and write
+#   4. refresh_unit_status() + commit (or rollback on error)
+#
+# Locks are always taken on the unit first, so two transitions can never
+# deadlock on each other.
+
+
+def lock_unit(unit_id: int, company_id=None):
+    """
+    Lock the unit row for the rest of the current transaction and return it,
+    freshly loaded. Returns None when the unit is missing, deleted or out of scope.
+    """
+    return lock_units([unit_id], company_id).get(int(unit_id))
+
+
+def lock_units(unit_ids, company_id=None) -> dict:
+    """
+    Lock many unit rows in id order and return {unit_id: Unit}.
+
+    Postgres uses SELECT ... FOR UPDATE. SQLite ignores FOR UPDATE, so we first
+    touch the rows with a no-op UPDATE, which takes the database write lock
+    (the closest SQLite has to a row lock) before anything is read.
+    """
+    unit_ids = sorted({int(x) for x in unit_ids})
+    if not unit_ids:
+        return {}
+
+    if db.session.get_bind().dialect.name == "sqlite":
+        db.session.execute(
+            text("UPDATE unit SET status = status WHERE id IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            ),
+            {"ids": unit_ids},
+        )
+
+    q = Unit.query.filter(Unit.id.in_(unit_ids), Unit.deleted_at.is_(None))
+    if company_id is not None:
+        q = q.filter(Unit.company_id == company_id)
+    units = q.order_by(Unit.id.asc()).populate_existing().with_for_update().all()
+    return {u.id: u for u in units}
+
+
+def active_lease_for_unit(unit_id: int, exclude_id=None):
+    q = Lease.query.filter(
+        Lease.unit_id == unit_id,
+        Lease.is_active == True,
+        Lease.deleted_at.is_(None),
+    )
+    if exclude_id is not None:
+        q = q.filter(Lease.id != exclude_id)
+    return q.order_by(Lease.id.desc()).first()
+
+
+def find_overlapping_lease(unit_id: int, start: date, end: date | None, exclude_id=None):
+    # Served by ix_lease_unit_dates
+    q = Lease.query.filter(
+        Lease.unit_id == unit_id,
+        Lease.deleted_at.is_(None),
+        (Lease.end_date.is_(None)) | (Lease.end_date >= start),
+    )
+    if end is not None:
+        q = q.filter(Lease.start_date <= end)
+    if exclude_id is not None:
+        q = q.filter(Lease.id != exclude_id)
+    return q.order_by(Lease.id.desc()).first()
+
+
+def refresh_unit_status(unit: Unit):
+    """
+    Derive unit.status and the current lease/tenant pointers from the unit's
+    active leases. Call with the unit locked, before commit.
+    """
+    lease = active_lease_for_unit(unit.id)
+    unit.status = "occupied" if lease else "vacant"
+    unit.current_lease_id = lease.id if lease else None
+    unit.current_tenant_id = lease.tenant_id if lease else None
+    return unit.status
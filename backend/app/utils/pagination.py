@@ -24,10 +24,12 @@ def _link(page, per_page):
     args["per_page"] = per_page
     return f"{request.base_url}?{urlencode(args)}"
 
-def paginate(query):
+def paginate(query, total_items=None):
+    """`total_items` skips the COUNT when the caller already has it."""
     page, per_page = _page_params()
 
-    total_items = query.order_by(None).count()
+    if total_items is None:
+        total_items = query.order_by(None).count()
     total_pages = max(1, math.ceil(total_items / per_page))
     if page > total_pages:
         page = total_pages
@@ -51,3 +53,49 @@ def paginate(query):
         "total_items": total_items,
         "total_pages": total_pages,
     }, links
+
+
+def _cursor_params():
+    cursor = request.args.get("cursor", type=int)
+    limit = request.args.get("limit", type=int) or DEFAULT_PER_PAGE
+    if limit < 1:
+        limit = DEFAULT_PER_PAGE
+    if limit > MAX_PER_PAGE:
+        limit = MAX_PER_PAGE
+    return cursor, limit
+
+
+def _cursor_link(cursor, limit):
+    args = dict(request.args)
+    args.pop("cursor", None)
+    if cursor is not None:
+        args["cursor"] = cursor
+    args["limit"] = limit
+    return f"{request.base_url}?{urlencode(args)}"
+
+
+def paginate_cursor(query, key_column):
+    """
+    Keyset pagination on an ascending integer key. No COUNT, and the cost of
+    a page doesn't grow with how deep the client has scrolled.
+    Rows must expose the key as `.id`.
+    """
+    cursor, limit = _cursor_params()
+
+    if cursor is not None:
+        query = query.filter(key_column > cursor)
+
+    rows = query.order_by(key_column.asc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = rows[-1].id if has_more and rows else None
+
+    links = {"self": _cursor_link(cursor, limit)}
+    if next_cursor is not None:
+        links["next"] = _cursor_link(next_cursor, limit)
+
+    return rows, {
+        "limit": limit,
+        "cursor": cursor,
+        "next_cursor": next_cursor,
+    }, links
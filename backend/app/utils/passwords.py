@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class VerifierBusy(Exception):
+    """Raised when a password check couldn't start within PASSWORD_VERIFY_TIMEOUT."""
+
+
+def _method() -> str:
+    if has_app_context():
+        return current_app.config.get("PASSWORD_HASH_METHOD") or DEFAULT_METHOD
+    return DEFAULT_METHOD
+
+
+def hash_password(password: str) -> str:
+    return generate_password_hash(password, method=_method())
+
+
+def _stored_method(password_hash: str) -> str:
+    return (password_hash or "").split("$", 1)[0]
+
+
+_normalized = {}
+
+
+def _normalized_method(method: str) -> str:
+    # "scrypt" and "scrypt:32768:8:1" hash the same; compare what werkzeug writes
+    if method not in _normalized:
+        _normalized[method] = _stored_method(generate_password_hash("", method=method))
+    return _normalized[method]
+
+
+def warm_up():
+    """Work out the configured method's stored form now rather than on the first login."""
+    _normalized_method(_method())
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return _stored_method(password_hash) != _normalized_method(_method())
+
+
+# Throwaway hash checked when the account doesn't exist, so a miss costs the
+# same as a wrong password and doesn't reveal which emails are registered
+_dummy_hashes = {}
+
+
+def _dummy_hash(method: str) -> str:
+    if method not in _dummy_hashes:
+        _dummy_hashes[method] = generate_password_hash("dummy-password", method=method)
+    return _dummy_hashes[method]
+
+
+_executor = None
+_executor_slots = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int):
+    """The shared pool and a semaphore with one slot per pool thread."""
+    global _executor, _executor_slots
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor_slots = threading.BoundedSemaphore(workers)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwverify")
+    return _executor, _executor_slots
+
+
+def verify_password(password_hash, password: str) -> bool:
+    """
+    Check `password` on a small shared pool instead of the request thread.
+
+    scrypt and pbkdf2 release the GIL, so while a login burst is hashing the
+    worker's other threads keep serving requests, and the pool size caps how
+    many cores logins can take. A missing hash (unknown account) checks a
+    dummy hash of the same cost. Raises VerifierBusy if no pool thread came
+    free within PASSWORD_VERIFY_TIMEOUT seconds; the hash itself isn't timed.
+    """
+    config = current_app.config
+    workers = config.get("PASSWORD_VERIFY_WORKERS", 2)
+    timeout = config.get("PASSWORD_VERIFY_TIMEOUT", 10)
+
+    target = password_hash or _dummy_hash(_normalized_method(_method()))
+    if workers <= 0:
+        ok = check_password_hash(target, password)
+    else:
+        executor, slots = _get_executor(workers)
+        # A slot means a pool thread is idle, so the check starts as soon as
+        # it's submitted and only the wait for a slot counts against the timeout
+        if not slots.acquire(timeout=timeout):
+            raise VerifierBusy()
+        try:
+            future = executor.submit(check_password_hash, target, password)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        ok = future.result()
+    return ok and password_hash is not None
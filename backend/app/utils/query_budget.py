@@ -0,0 +1,96 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+# Debug/test aid, off by default (QUERY_DEBUG = "off" | "log" | "raise").
+#
+# When on, every SQL statement a request runs is recorded. After the view:
+# - statements whose text repeats N_PLUS_ONE_THRESHOLD+ times (same shape,
+#   different parameters) are reported as a likely N+1;
+# - views decorated with @query_budget(n) that ran more than n statements
+#   are reported too.
+# "log" writes a warning; "raise" replaces the response with a 500 so tests
+# fail loudly. Either way the response carries X-Query-Count.
+
+
+def query_budget(max_queries: int):
+    """Declare the most SQL statements the view may run per request."""
+    def deco(fn):
+        fn._query_budget = max_queries
+        return fn
+    return deco
+
+
+@contextmanager
+def untracked():
+    """Statements run inside this block aren't charged to the view (e.g. cache refreshes)."""
+    if not has_request_context():
+        yield
+        return
+    depth = g.get("query_untracked", 0)
+    g.query_untracked = depth + 1
+    try:
+        yield
+    finally:
+        g.query_untracked = depth
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "query_log" in g and not g.get("query_untracked"):
+        g.query_log.append(statement)
+
+
+def _start():
+    g.query_log = []
+
+
+def _repeated_shapes(statements, threshold):
+    counts = Counter(s for s in statements if s.lstrip().upper().startswith("SELECT"))
+    return [{"count": n, "statement": s[:300]} for s, n in counts.most_common() if n >= threshold]
+
+
+def _budget_for_endpoint():
+    view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(view, "_query_budget", None)
+
+
+def _check(response):
+    statements = g.pop("query_log", None)
+    if statements is None:
+        return response
+
+    config = current_app.config
+    budget = _budget_for_endpoint()
+    repeated = _repeated_shapes(statements, config.get("N_PLUS_ONE_THRESHOLD", 3))
+    over_budget = budget is not None and len(statements) > budget
+
+    response.headers["X-Query-Count"] = str(len(statements))
+    if not over_budget and not repeated:
+        return response
+
+    report = {
+        "endpoint": request.endpoint,
+        "queries": len(statements),
+        "budget": budget,
+        "repeated": repeated,
+    }
+    current_app.logger.warning("query check failed: %s", report)
+    if config.get("QUERY_DEBUG") == "raise":
+        failed = jsonify({"error": "query_budget_exceeded" if over_budget else "n_plus_one_detected", **report})
+        failed.status_code = 500
+        failed.headers["X-Query-Count"] = str(len(statements))
+        return failed
+    return response
+
+
+def init_query_budget(app, *engines):
+    if app.config.get("QUERY_DEBUG", "off") not in ("log", "raise"):
+        return
+
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    app.before_request(_start)
+    app.after_request(_check)
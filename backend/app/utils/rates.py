@@ -0,0 +1,112 @@
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+
+from ..extensions import db
+from ..models import UnitRate
+
+# Rates recorded at unit creation (and backfilled by migration) apply from here,
+# so leases onboarded with historical start dates still find a rate.
+BASELINE_DATE = date(1900, 1, 1)
+
+RATE_FIELDS = ("rent", "garbage_fee", "water_rate")
+
+
+def _current_rates(unit) -> dict:
+    return {k: Decimal(str(getattr(unit, k) or 0)) for k in RATE_FIELDS}
+
+
+def record_unit_rates(unit, effective_from: date | None = None, user_id=None, previous: dict | None = None):
+    """
+    Record the unit's current rates as applying from `effective_from`
+    (default today). Call after setting unit.rent/garbage_fee/water_rate and
+    before commit. `previous` holds the rates before the change: it becomes
+    the unit's baseline if the unit has no history yet, so older periods keep
+    pricing at the old rates.
+    """
+    effective_from = effective_from or date.today()
+
+    if unit.id is None:
+        db.session.flush()
+
+    has_history = db.session.query(
+        UnitRate.query.filter(UnitRate.unit_id == unit.id).exists()
+    ).scalar()
+    if not has_history:
+        baseline = previous or _current_rates(unit)
+        if effective_from > BASELINE_DATE:
+            db.session.add(UnitRate(unit_id=unit.id, effective_from=BASELINE_DATE, created_by_id=user_id, **baseline))
+        else:
+            effective_from = BASELINE_DATE
+
+    row = (
+        UnitRate.query
+        .filter(UnitRate.unit_id == unit.id, UnitRate.effective_from == effective_from)
+        .first()
+    )
+    if row is None:
+        row = UnitRate(unit_id=unit.id, effective_from=effective_from, created_by_id=user_id)
+        db.session.add(row)
+    for k, v in _current_rates(unit).items():
+        setattr(row, k, v)
+    return row
+
+
+def rate_timelines(unit_ids, until: date | None = None) -> dict:
+    """
+    {unit_id: ([effective_from, ...], [rates, ...])} sorted by date, for many
+    units in one query on uq_unit_rate_unit_effective_from.
+    """
+    unit_ids = list({int(x) for x in unit_ids})
+    if not unit_ids:
+        return {}
+
+    q = UnitRate.query.filter(UnitRate.unit_id.in_(unit_ids))
+    if until is not None:
+        q = q.filter(UnitRate.effective_from <= until)
+    rows = q.order_by(UnitRate.unit_id.asc(), UnitRate.effective_from.asc()).all()
+
+    timelines = {}
+    for r in rows:
+        dates, rates = timelines.setdefault(r.unit_id, ([], []))
+        dates.append(r.effective_from)
+        rates.append({k: Decimal(str(getattr(r, k))) for k in RATE_FIELDS})
+    return timelines
+
+
+def rates_on(timeline, unit, d: date) -> dict:
+    """Rates in force on `d`; falls back to the unit's current columns."""
+    if timeline:
+        dates, rates = timeline
+        idx = bisect_right(dates, d)
+        if idx:
+            return rates[idx - 1]
+    return _current_rates(unit)
+
+
+def rate_segments(timeline, unit, start: date, end: date):
+    """Split [start, end] at rate changes: [(seg_start, seg_end, rates), ...]."""
+    segments = []
+    cursor = start
+    if timeline:
+        dates, _ = timeline
+        for change in dates[bisect_right(dates, start):]:
+            if change > end:
+                break
+            segments.append((cursor, date.fromordinal(change.toordinal() - 1), rates_on(timeline, unit, cursor)))
+            cursor = change
+    segments.append((cursor, end, rates_on(timeline, unit, cursor)))
+    return segments
+
+
+def resolve_unit_rates(pairs) -> dict:
+    """
+    Bulk point-in-time lookup: pairs of (unit, date) -> {(unit_id, date): rates}
+    with a single query, for batch billing and corrections.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+    until = max(d for _, d in pairs)
+    timelines = rate_timelines([u.id for u, _ in pairs], until)
+    return {(u.id, d): rates_on(timelines.get(u.id), u, d) for u, d in pairs}
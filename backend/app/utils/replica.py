@@ -0,0 +1,124 @@
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+from .cache import TTLCache
+
+# Optional read replica (REPLICA_DATABASE_URL), registered as the "replica"
+# bind so it shares the primary's engine options and fork handling.
+#
+# Reads in GET/HEAD requests go to the replica; everything else, flushes,
+# DML and SELECT ... FOR UPDATE stay on the primary. A client that just
+# made a successful write reads from the primary for REPLICA_STICKY_SECONDS
+# so it sees its own change despite replication lag. That is tracked two
+# ways: a cookie (any worker) and, for clients that don't keep cookies, a
+# per-worker note keyed on the Authorization header.
+#
+# Jobs and CLI commands opt in with `with replica_reads(): ...`. Reads that
+# must not lag, such as the token blocklist, opt out with `primary_reads()`.
+
+REPLICA_BIND = "replica"
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+STICKY_COOKIE = "read_primary_until"
+
+_forced = ContextVar("replica_reads", default=False)
+_primary_only = ContextVar("primary_reads", default=False)
+_recent_writers = TTLCache(ttl_seconds=5, max_entries=10_000)
+
+
+@contextmanager
+def replica_reads():
+    """Send this block's reads to the replica (outside requests: report jobs, CLI)."""
+    token = _forced.set(True)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary in this block, even in a GET or inside replica_reads()."""
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+def _client_key():
+    auth = request.headers.get("Authorization")
+    if not auth:
+        return None
+    return hashlib.blake2b(auth.encode(), digest_size=16).hexdigest()
+
+
+def _request_wants_replica() -> bool:
+    if request.method not in READ_METHODS:
+        return False
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+            return False
+    except ValueError:
+        pass
+    key = _client_key()
+    return key is None or _recent_writers.get(key) is None
+
+
+def _wants_replica() -> bool:
+    if _primary_only.get():
+        return False
+    if _forced.get():
+        return True
+    if not has_request_context():
+        return False
+    decided = g.get("use_replica")
+    if decided is None:
+        decided = g.use_replica = _request_wants_replica()
+    return decided
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends plain reads to the replica when one applies."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and REPLICA_BIND in self._db.engines
+            and not getattr(clause, "is_dml", False)
+            and getattr(clause, "_for_update_arg", None) is None
+            and _wants_replica()
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _mark_writer(response):
+    if request.method in READ_METHODS or response.status_code >= 400:
+        return response
+    sticky = current_app.config.get("REPLICA_STICKY_SECONDS", 5)
+    key = _client_key()
+    if key is not None:
+        _recent_writers.set(key, True)
+    response.set_cookie(
+        STICKY_COOKIE, str(int(time.time() + sticky) + 1), max_age=int(sticky) + 1,
+        httponly=True, samesite="Lax",
+    )
+    return response
+
+
+def init_replica(app):
+    """Call before db.init_app(): registers the replica bind when configured."""
+    url = app.config.get("REPLICA_DATABASE_URL")
+    if not url:
+        return
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    binds[REPLICA_BIND] = url
+    app.config["SQLALCHEMY_BINDS"] = binds
+    _recent_writers.ttl = app.config.get("REPLICA_STICKY_SECONDS", 5)
+    app.after_request(_mark_writer)
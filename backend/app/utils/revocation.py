@@ -0,0 +1,168 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from ..extensions import db
+from ..models import RevokedToken
+from .cache import TTLCache
+from .query_budget import untracked
+from .replica import primary_reads
+
+# created_at is stamped by the app before commit, so a row can become visible
+# a little after rows with later timestamps. Each refresh re-reads this much
+# history so such rows aren't skipped; re-adding to the filter is harmless.
+# Every read here goes to the primary (primary_reads()): a lagging replica
+# would accept revoked tokens and could move the watermark past rows it
+# hasn't received yet.
+COMMIT_SLACK = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings. No false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for p in self._positions(item):
+            self._bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class RevocationCache:
+    """
+    Per-worker view of revoked_token.
+
+    A bloom filter of revoked JTIs answers "not revoked" for almost every
+    token without touching the database. Filter hits (real revocations and
+    the rare false positive) are settled by one indexed query and kept in a
+    TTL cache. The filter is topped up from created_at at most every
+    `refresh_seconds`, which bounds how long a revocation made by another
+    worker can go unnoticed here; revocations made by this worker apply at
+    once. It's rebuilt from scratch every `rebuild_seconds` to shed expired
+    JTIs and to grow if more tokens were revoked than it was sized for.
+    """
+
+    def __init__(self, refresh_seconds: float, rebuild_seconds: float = 3600,
+                 capacity: int = 100_000, error_rate: float = 0.001):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.results = TTLCache(ttl_seconds=max(refresh_seconds, 1), max_entries=4096)
+        self._bloom = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = threading.Lock()
+
+    def _rebuild(self, now: datetime):
+        rows = (
+            db.session.query(RevokedToken.jti, RevokedToken.created_at)
+            .filter(RevokedToken.expires_at > now)
+            .all()
+        )
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        watermark = None
+        for jti, created_at in rows:
+            bloom.add(jti)
+            if watermark is None or created_at > watermark:
+                watermark = created_at
+        self._bloom = bloom
+        self._watermark = watermark
+        self._rebuilt_at = time.monotonic()
+
+    def _top_up(self):
+        q = db.session.query(RevokedToken.jti, RevokedToken.created_at)
+        if self._watermark is not None:
+            q = q.filter(RevokedToken.created_at >= self._watermark - COMMIT_SLACK)
+        for jti, created_at in q.all():
+            if jti not in self._bloom:
+                self._bloom.add(jti)
+            self.results.set(jti, True)
+            if self._watermark is None or created_at > self._watermark:
+                self._watermark = created_at
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if self._bloom is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        # periodic upkeep, not the cost of whichever request happens to trigger it
+        with self._lock, untracked(), primary_reads():
+            if self._bloom is not None and now - self._refreshed_at < self.refresh_seconds:
+                return
+            if self._bloom is None or now - self._rebuilt_at >= self.rebuild_seconds:
+                self._rebuild(datetime.utcnow())
+            else:
+                self._top_up()
+            self._refreshed_at = now
+
+    def is_revoked(self, jti: str) -> bool:
+        self._maybe_refresh()
+        if jti not in self._bloom:
+            return False
+
+        cached = self.results.get(jti)
+        if cached is not None:
+            return cached
+        with primary_reads():
+            revoked = db.session.query(
+                db.session.query(RevokedToken.id).filter_by(jti=jti).exists()
+            ).scalar()
+        self.results.set(jti, revoked)
+        return revoked
+
+    def note_revoked(self, jti: str):
+        """Call after committing a revocation so this worker honours it at once."""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+        self.results.set(jti, True)
+
+
+# Replaced with the configured settings by init_revocation_cache()
+revocation_cache = None
+
+
+def is_token_revoked(jti: str) -> bool:
+    if revocation_cache is None:
+        with primary_reads():
+            return db.session.query(
+                db.session.query(RevokedToken.id).filter_by(jti=jti).exists()
+            ).scalar()
+    return revocation_cache.is_revoked(jti)
+
+
+def note_revoked(jti: str):
+    if revocation_cache is not None:
+        revocation_cache.note_revoked(jti)
+
+
+def init_revocation_cache(app):
+    """REVOCATION_REFRESH_SECONDS = 0 turns the cache off: one query per request."""
+    global revocation_cache
+    refresh = app.config.get("REVOCATION_REFRESH_SECONDS", 5)
+    if refresh <= 0:
+        revocation_cache = None
+        return
+    revocation_cache = RevocationCache(
+        refresh_seconds=refresh,
+        rebuild_seconds=app.config.get("REVOCATION_REBUILD_SECONDS", 3600),
+        capacity=app.config.get("REVOCATION_BLOOM_CAPACITY", 100_000),
+    )
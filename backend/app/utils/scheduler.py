@@ -0,0 +1,53 @@
+import random
+import threading
+
+# Minimal in-process scheduler for housekeeping jobs. Each job runs on its own
+# daemon thread inside an app context. Threads are started on the first
+# request rather than in create_app, so they exist in every gunicorn worker
+# (threads don't survive the fork after --preload) and never in CLI commands.
+# Jobs that must not run concurrently across workers take their own lock.
+
+
+def register_job(app, name: str, interval_seconds: float, fn):
+    """Run fn() every interval_seconds once the app serves requests; <= 0 disables."""
+    if interval_seconds > 0:
+        app.extensions.setdefault("scheduled_jobs", []).append((name, interval_seconds, fn))
+
+
+def _run_forever(app, name, interval, fn, stop):
+    # spread workers out so they don't all wake at once
+    delay = random.uniform(0, interval)
+    while not stop.wait(delay):
+        with app.app_context():
+            try:
+                result = fn()
+                app.logger.info("scheduled job %s: %s", name, result)
+            except Exception:
+                app.logger.exception("scheduled job %s failed", name)
+        delay = interval
+
+
+def init_scheduler(app):
+    if not app.config.get("SCHEDULER_ENABLED", True):
+        return
+
+    state = {"started": False}
+    start_lock = threading.Lock()
+    stop = threading.Event()
+    app.extensions["scheduler_stop"] = stop
+
+    @app.before_request
+    def _start_scheduler():
+        if state["started"]:
+            return
+        with start_lock:
+            if state["started"]:
+                return
+            state["started"] = True
+            for name, interval, fn in app.extensions.get("scheduled_jobs", []):
+                threading.Thread(
+                    target=_run_forever,
+                    args=(app, name, interval, fn, stop),
+                    name=f"job-{name}",
+                    daemon=True,
+                ).start()
@@ -0,0 +1,27 @@
+from ..extensions import db
+
+# Scope checks by primary key. db.session.get() answers from the session's
+# identity map when the row is already loaded, so a decorator, a helper and
+# the view can each call get_in_scope() for the same id and only the first
+# one runs SQL.
+
+
+def get_in_scope(model, obj_id, company_id=None, include_deleted: bool = False):
+    """
+    Load `model` by id. Returns None when it's missing, soft-deleted (unless
+    include_deleted) or, when company_id is given, owned by another company.
+    Pass company_id=None for admins.
+    """
+    try:
+        obj_id = int(obj_id)
+    except (TypeError, ValueError):
+        return None
+
+    obj = db.session.get(model, obj_id)
+    if obj is None:
+        return None
+    if company_id is not None and obj.company_id != company_id:
+        return None
+    if not include_deleted and getattr(obj, "deleted_at", None) is not None:
+        return None
+    return obj
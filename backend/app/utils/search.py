@@ -0,0 +1,162 @@
+from sqlalchemy import func, text
+
+from ..extensions import db
+from ..models import Property, Tenant, Unit
+
+SEARCH_TYPES = ("tenant", "unit", "property")
+
+# SQLite: one external-content FTS5 table per entity, kept in sync by triggers.
+# The trigram tokenizer gives substring matching, like pg_trgm on Postgres.
+SQLITE_FTS = {
+    "tenant": ("tenant", ("full_name", "phone", "email")),
+    "unit": ("unit", ("house_number",)),
+    "property": ("property", ("name", "location")),
+}
+
+
+def sqlite_fts_ddl():
+    stmts = []
+    for _, (table, cols) in SQLITE_FTS.items():
+        fts = f"{table}_fts"
+        col_list = ", ".join(cols)
+        new_vals = ", ".join(f"new.{c}" for c in cols)
+        old_vals = ", ".join(f"old.{c}" for c in cols)
+        stmts += [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{col_list}, content='{table}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals}); "
+            f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals}); END",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+    return stmts
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+# Engines whose FTS tables are known to exist; they are never dropped at runtime
+_fts_ready = set()
+
+
+def _sqlite_fts_ready():
+    bind = db.session.get_bind()
+    if bind.url in _fts_ready:
+        return True
+    ready = db.session.execute(
+        text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'tenant_fts'")
+    ).scalar() > 0
+    if ready:
+        _fts_ready.add(bind.url)
+    return ready
+
+
+def _entity_queries():
+    return {
+        "tenant": (Tenant, (Tenant.full_name, Tenant.phone, Tenant.email), (Tenant.id, Tenant.full_name, Tenant.phone, Tenant.email)),
+        "unit": (Unit, (Unit.house_number,), (Unit.id, Unit.house_number, Unit.property_id, Unit.status)),
+        "property": (Property, (Property.name, Property.location), (Property.id, Property.name, Property.location)),
+    }
+
+
+def _to_item(kind, row, score):
+    if kind == "tenant":
+        return {"type": kind, "id": row.id, "score": score, "title": row.full_name,
+                "subtitle": row.phone, "data": {"full_name": row.full_name, "phone": row.phone, "email": row.email}}
+    if kind == "unit":
+        return {"type": kind, "id": row.id, "score": score, "title": row.house_number,
+                "subtitle": row.status, "data": {"house_number": row.house_number, "property_id": row.property_id, "status": row.status}}
+    return {"type": kind, "id": row.id, "score": score, "title": row.name,
+            "subtitle": row.location, "data": {"name": row.name, "location": row.location}}
+
+
+def _scoped(query, model, company_id):
+    query = query.filter(model.deleted_at.is_(None))
+    if company_id is not None:
+        query = query.filter(model.company_id == company_id)
+    return query
+
+
+def _like_pattern(q):
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _prefix_score(q, values):
+    # Share of the best prefix-matched value the query covers: "A1" scores
+    # 1.0 on "A1" and 0.5 on "A101"
+    q = q.lower()
+    return max((len(q) / len(v) for v in values if v and v.lower().startswith(q)), default=0.0)
+
+
+def _search_postgres(kind, q, company_id, limit, fts=False):
+    model, cols, fields = _entity_queries()[kind]
+    like = _like_pattern(q)
+    # ILIKE '%q%' is served by the gin_trgm_ops indexes; similarity() ranks
+    score = func.greatest(*[func.similarity(func.coalesce(c, ""), q) for c in cols])
+    match = cols[0].ilike(like, escape="\\")
+    for c in cols[1:]:
+        match = match | c.ilike(like, escape="\\")
+    query = _scoped(db.session.query(*fields, score.label("score")).filter(match), model, company_id)
+    rows = query.order_by(score.desc(), model.id.desc()).limit(limit).all()
+    return [_to_item(kind, r, float(r.score)) for r in rows]
+
+
+def _search_sqlite(kind, q, company_id, limit, fts=False):
+    model, cols, fields = _entity_queries()[kind]
+    if fts:
+        fts = f"{SQLITE_FTS[kind][0]}_fts"
+        ranked = (
+            text(f"SELECT rowid AS id, bm25({fts}) AS rank FROM {fts} WHERE {fts} MATCH :match")
+            .columns(id=db.Integer, rank=db.Float)
+            .subquery()
+        )
+        query = (
+            db.session.query(*fields, ranked.c.rank)
+            .join(ranked, ranked.c.id == model.id)
+            .params(match='"' + q.replace('"', '""') + '"')
+        )
+        rows = _scoped(query, model, company_id).order_by(ranked.c.rank.asc()).limit(limit).all()
+        # bm25: lower is better
+        return [_to_item(kind, r, -float(r.rank)) for r in rows]
+
+    # Trigrams need 3+ characters; short queries fall back to a prefix match
+    pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    match = cols[0].like(pattern, escape="\\")
+    for c in cols[1:]:
+        match = match | c.like(pattern, escape="\\")
+    rows = _scoped(db.session.query(*fields).filter(match), model, company_id).order_by(model.id.desc()).limit(limit).all()
+    items = [_to_item(kind, r, _prefix_score(q, [getattr(r, c.key) for c in cols])) for r in rows]
+    items.sort(key=lambda i: i["score"], reverse=True)
+    return items
+
+
+def search(q: str, company_id, types=SEARCH_TYPES, limit: int = 20):
+    """
+    Relevance-ranked matches across tenants, units and properties.
+
+    Scores from different tables aren't comparable (bm25 depends on each
+    table's size and term statistics), so each type is ranked on its own,
+    its scores scaled so its best match is 1.0, and the lists interleaved
+    rank by rank.
+    """
+    if _dialect() == "postgresql":
+        runner, fts = _search_postgres, False
+    else:
+        # probed once per search, not once per type
+        runner, fts = _search_sqlite, len(q) >= 3 and _sqlite_fts_ready()
+
+    ranked = []
+    for kind in types:
+        items = runner(kind, q, company_id, limit, fts=fts)
+        top = items[0]["score"] if items else 0
+        for pos, item in enumerate(items):
+            item["score"] = round(item["score"] / top, 4) if top > 0 else 0.0
+            ranked.append((pos, -item["score"], item))
+    ranked.sort(key=lambda r: (r[0], r[1]))
+    return [item for _, _, item in ranked[:limit]]
@@ -0,0 +1,206 @@
+import json
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, update
+
+from ..extensions import db
+from ..models import Company, Invoice, Lease, Payment, Property, Tenant, Unit, UnitRate, User, WaterReading
+from .billing import _allocate_monthly
+from .passwords import hash_password
+from .rates import BASELINE_DATE
+
+# Everything the app reads comes from these rows, so the generator writes
+# them with bulk INSERTs instead of going through the routes. The output
+# depends only on the arguments: the same seed, sizes and `until` month
+# give the same rows on SQLite and Postgres.
+
+SEED_PASSWORD = "seed-password"
+
+FIRST_NAMES = ("Amina", "Brian", "Cynthia", "David", "Esther", "Faith", "George", "Hassan", "Irene", "James",
+               "Kevin", "Lucy", "Mercy", "Njeri", "Otieno", "Peter", "Rose", "Samuel", "Wanjiru", "Zawadi")
+LAST_NAMES = ("Achieng", "Kamau", "Kariuki", "Kiptoo", "Mutua", "Mwangi", "Njoroge", "Odhiambo", "Omondi",
+              "Wafula", "Wambui", "Wekesa")
+LOCATIONS = ("Kilimani", "Westlands", "Kasarani", "Ruaka", "Rongai", "Embakasi", "Syokimau", "Kitengela")
+
+CHUNK = 2000
+
+
+def _money(x) -> str:
+    return str(Decimal(x).quantize(Decimal("0.01")))
+
+
+def _months_back(until: date, months: int):
+    y, m = until.year, until.month
+    out = []
+    for _ in range(months):
+        out.append(date(y, m, 1))
+        y, m = (y, m - 1) if m > 1 else (y - 1, 12)
+    return out[::-1]
+
+
+def _month_end(d0: date) -> date:
+    nxt = date(d0.year + (d0.month == 12), d0.month % 12 + 1, 1)
+    return nxt - timedelta(days=1)
+
+
+def _insert(model, rows, returning=None):
+    if not rows:
+        return []
+    if returning is None:
+        for i in range(0, len(rows), CHUNK):
+            db.session.execute(insert(model), rows[i:i + CHUNK])
+        return []
+    # sort_by_parameter_order keeps ids lined up with `rows`
+    return [
+        r[0] for r in db.session.execute(
+            insert(model).returning(returning, sort_by_parameter_order=True), rows
+        )
+    ]
+
+
+def generate(companies: int = 1, properties: int = 5, units: int = 20, years: int = 1,
+             occupancy: float = 0.9, seed: int = 1, until: date | None = None, log=None) -> dict:
+    """
+    Build `companies` x `properties` x `units` units with tenants, one lease per
+    occupied unit, and a month of water reading, invoice and payment per lease
+    for `years` years up to `until` (default: this month). Each company gets a
+    manager login, manager@seed<seed>-<n>.local / SEED_PASSWORD.
+    """
+    rnd = random.Random(seed)
+    until = (until or date.today()).replace(day=1)
+    months = _months_back(until, max(1, years * 12))
+    # fixed audit stamp so reruns match row for row
+    now = datetime(months[0].year, months[0].month, 1)
+    password_hash = hash_password(SEED_PASSWORD)  # once: hashing is deliberately slow
+    totals = dict.fromkeys(("companies", "properties", "units", "tenants", "leases",
+                            "water_readings", "invoices", "payments"), 0)
+
+    for c in range(companies):
+        name = f"Seed {seed}-{c + 1:03d}"
+        if db.session.query(Company.query.filter_by(name=name).exists()).scalar():
+            raise ValueError(f"company {name!r} already exists; use another --seed")
+        company = Company(name=name)
+        db.session.add(company)
+        db.session.flush()
+        company_id = company.id
+
+        user_id = _insert(User, [{
+            "company_id": company_id, "email": f"manager@seed{seed}-{c + 1}.local",
+            "password_hash": password_hash, "role": "manager", "created_at": now, "updated_at": now,
+        }], User.id)[0]
+        audit = {"company_id": company_id, "created_by_id": user_id, "created_at": now, "updated_at": now}
+
+        property_ids = _insert(Property, [{
+            **audit, "name": f"{rnd.choice(LOCATIONS)} Court {p + 1}", "location": rnd.choice(LOCATIONS),
+            "house_count": units, "water_rate_per_unit": 0,
+        } for p in range(properties)], Property.id)
+
+        unit_rows = []
+        for property_id in property_ids:
+            for u in range(units):
+                rent = Decimal(rnd.randrange(8000, 45000, 500))
+                unit_rows.append({
+                    **audit, "property_id": property_id, "house_number": f"{chr(65 + u // 100)}{u % 100 + 1:02d}",
+                    "rent": rent, "garbage_fee": Decimal(rnd.choice((200, 300, 500))),
+                    "water_rate": Decimal(rnd.choice((100, 120, 150))), "deposit": rent, "status": "vacant",
+                })
+        unit_ids = _insert(Unit, unit_rows, Unit.id)
+        _insert(UnitRate, [{
+            "unit_id": unit_id, "effective_from": BASELINE_DATE, "created_by_id": user_id, "created_at": now,
+            "rent": row["rent"], "garbage_fee": row["garbage_fee"], "water_rate": row["water_rate"],
+        } for unit_id, row in zip(unit_ids, unit_rows)])
+
+        occupied = [i for i in range(len(unit_ids)) if rnd.random() < occupancy]
+        tenant_ids = _insert(Tenant, [{
+            **audit, "full_name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+            "phone": f"07{rnd.randrange(10_000_000, 99_999_999)}", "email": f"tenant{seed}-{c + 1}-{i}@seed.local",
+        } for i in occupied], Tenant.id)
+
+        # most leases span the whole window; the rest started part way through
+        start_months = [months[0] if rnd.random() < 0.7 else rnd.choice(months) for _ in occupied]
+        lease_ids = _insert(Lease, [{
+            **audit, "tenant_id": tenant_id, "unit_id": unit_ids[i], "start_date": start,
+            "is_active": True, "deposit_amount": unit_rows[i]["deposit"], "deposit_held": unit_rows[i]["deposit"],
+        } for i, tenant_id, start in zip(occupied, tenant_ids, start_months)], Lease.id)
+
+        if lease_ids:
+            db.session.execute(update(Unit), [
+                {"id": unit_ids[i], "status": "occupied", "current_lease_id": lease_id, "current_tenant_id": tenant_id,
+                 "updated_at": now}
+                for i, lease_id, tenant_id in zip(occupied, lease_ids, tenant_ids)
+            ])
+
+        readings, invoices, payments = [], [], []
+        invoice_seq = {}
+        for i, lease_id, tenant_id, start in zip(occupied, lease_ids, tenant_ids, start_months):
+            row, unit_id = unit_rows[i], unit_ids[i]
+            meter = Decimal(rnd.randrange(0, 500))
+            prev = None
+            for month in months:
+                if month < start:
+                    continue
+                meter += Decimal(rnd.randrange(3, 25))
+                period = f"{month.year:04d}-{month.month:02d}"
+                readings.append({
+                    "unit_id": unit_id, "company_id": company_id, "period": period, "reading_value": meter,
+                    "reading_at": datetime(month.year, month.month, 25), "created_by_id": user_id, "created_at": now,
+                })
+
+                items = [
+                    {"code": "RENT", "name": "Rent", "qty": "1", "unit_price": _money(row["rent"]), "amount": _money(row["rent"])},
+                    {"code": "GARBAGE", "name": "Garbage", "qty": "1", "unit_price": _money(row["garbage_fee"]), "amount": _money(row["garbage_fee"])},
+                ]
+                if prev is not None:
+                    usage = meter - prev
+                    items.append({
+                        "code": "WATER", "name": "Water", "qty": _money(usage),
+                        "unit_price": _money(row["water_rate"]), "amount": _money(usage * row["water_rate"]),
+                    })
+                prev = meter
+                total = sum(Decimal(li["amount"]) for li in items)
+
+                key = f"{month.year:04d}{month.month:02d}"
+                invoice_seq[key] = invoice_seq.get(key, 0) + 1
+                issued_at = datetime(month.year, month.month, 1, 8)
+                invoices.append({
+                    **audit, "lease_id": lease_id, "tenant_id": tenant_id, "unit_id": unit_id,
+                    "invoice_number": f"INV-{key}-{invoice_seq[key]:04d}", "status": "issued",
+                    "period_start": month, "period_end": _month_end(month), "issued_at": issued_at,
+                    "due_date": month + timedelta(days=7), "currency": "KES",
+                    "subtotal": total, "total": total, "line_items_json": json.dumps(items),
+                })
+
+                # ~85% pay in full, the rest pay part of the rent; split the way
+                # create_payment does, against the invoice's own water line
+                water_due = sum((Decimal(li["amount"]) for li in items if li["code"] == "WATER"), Decimal("0"))
+                paid = total if rnd.random() < 0.85 else (total * Decimal(rnd.choice(("0.5", "0.75")))).quantize(Decimal("0.01"))
+                water_paid, garbage_paid, rent_paid, balance_after, credit_after = _allocate_monthly(
+                    paid, row["rent"], water_due, row["garbage_fee"],
+                )
+                payments.append({
+                    "tenant_id": tenant_id, "unit_id": unit_id, "amount": paid, "currency": "KES",
+                    "paid_for_month": month, "paid_at": issued_at + timedelta(days=rnd.randrange(0, 10)),
+                    "water_paid": water_paid, "garbage_paid": garbage_paid, "rent_paid": rent_paid,
+                    "balance_after": balance_after, "credit_after": credit_after,
+                    "method": rnd.choice(("mpesa", "mpesa", "bank", "cash")),
+                    "reference": f"S{seed}C{c + 1}L{lease_id}M{key}", "created_at": now,
+                })
+
+        _insert(WaterReading, readings)
+        _insert(Invoice, invoices)
+        _insert(Payment, payments)
+        db.session.commit()
+
+        counts = {
+            "companies": 1, "properties": len(property_ids), "units": len(unit_ids), "tenants": len(tenant_ids),
+            "leases": len(lease_ids), "water_readings": len(readings), "invoices": len(invoices),
+            "payments": len(payments),
+        }
+        for k, v in counts.items():
+            totals[k] += v
+        if log:
+            log(f"{name}: " + " ".join(f"{k}={v}" for k, v in counts.items() if k != "companies"))
+
+    return totals
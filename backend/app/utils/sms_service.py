@@ -0,0 +1,388 @@
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from ..extensions import db
+from ..models import SmsMessage
+from .job_lock import job_lock
+from .scheduler import register_job
+
+# Tenant text messages through an outbox.
+#
+# Write paths call notify_*() before their commit: that only adds an
+# sms_outbox row to the session, so the message exists exactly when the
+# payment/invoice does and the request never talks to the provider.
+#
+# drain_outbox() (a scheduled job, or `flask sms-drain`) claims due rows in
+# batches, sends them on a small thread pool under the provider's rate
+# limit, and records the outcome: sent, retried later with exponential
+# backoff, or failed after SMS_MAX_ATTEMPTS. One process drains at a time on
+# Postgres, so the rate limit holds for the whole deployment.
+
+ADVISORY_LOCK_KEY = 0x534D5331  # "SMS1"
+
+
+class SmsError(Exception):
+    """A send that didn't go through. retryable=False for errors a retry can't fix (bad number)."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class RateLimiter:
+    """Token bucket shared by the sender threads; acquire() blocks until a send is allowed."""
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# ---------- Providers ----------
+
+class SmsProvider:
+    name = "base"
+
+    def send(self, to_number: str, body: str) -> str:
+        """Send one message; return the provider's message id or raise SmsError."""
+        raise NotImplementedError
+
+
+class FakeGateway(SmsProvider):
+    """
+    In-memory gateway for local runs and checks. Keeps what it "sent" in
+    .sent; can be made slow (latency seconds per send) or flaky (fail_rate).
+    """
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.sent = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, to_number, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self._random.random() < self.fail_rate:
+                raise SmsError("fake gateway: temporary failure")
+            message_id = f"fake-{len(self.sent) + 1}"
+            self.sent.append({"id": message_id, "to": to_number, "body": body, "at": time.time()})
+        return message_id
+
+
+class AfricasTalkingGateway(SmsProvider):
+    name = "africastalking"
+    URL = "https://api.africastalking.com/version1/messaging"
+    SANDBOX_URL = "https://api.sandbox.africastalking.com/version1/messaging"
+    # per-recipient statusCode values worth retrying: insufficient balance, gateway trouble
+    RETRYABLE_CODES = {405, 500, 501, 502}
+
+    def __init__(self, username: str, api_key: str, sender_id: str | None = None, timeout: float = 10):
+        self.username = username
+        self.api_key = api_key
+        self.sender_id = sender_id
+        self.timeout = timeout
+        self.url = self.SANDBOX_URL if username == "sandbox" else self.URL
+
+    def send(self, to_number, body):
+        form = {"username": self.username, "to": to_number, "message": body}
+        if self.sender_id:
+            form["from"] = self.sender_id
+        req = urllib.request.Request(
+            self.url,
+            data=urllib.parse.urlencode(form).encode(),
+            headers={"apiKey": self.api_key, "Accept": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                payload = json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            raise SmsError(f"http {e.code}", retryable=e.code == 429 or e.code >= 500)
+        except (urllib.error.URLError, TimeoutError) as e:
+            raise SmsError(f"network: {e}")
+        except ValueError:
+            raise SmsError("unreadable response")
+
+        recipients = (payload.get("SMSMessageData") or {}).get("Recipients") or []
+        if not recipients:
+            raise SmsError((payload.get("SMSMessageData") or {}).get("Message") or "no recipients", retryable=False)
+        result = recipients[0]
+        code = int(result.get("statusCode") or 0)
+        if code in (100, 101, 102):  # processed, sent, queued
+            return result.get("messageId")
+        raise SmsError(f"{code} {result.get('status')}", retryable=code in self.RETRYABLE_CODES)
+
+
+PROVIDERS = {
+    "fake": lambda config: FakeGateway(
+        latency=config.get("SMS_FAKE_LATENCY", 0.0),
+        fail_rate=config.get("SMS_FAKE_FAIL_RATE", 0.0),
+    ),
+    "africastalking": lambda config: AfricasTalkingGateway(
+        username=config["AFRICASTALKING_USERNAME"],
+        api_key=config["AFRICASTALKING_API_KEY"],
+        sender_id=config.get("SMS_SENDER_ID"),
+    ),
+}
+
+
+def register_provider(name: str, factory):
+    """factory(config) -> SmsProvider; select it with SMS_PROVIDER=name."""
+    PROVIDERS[name] = factory
+
+
+def sms_enabled(app=None) -> bool:
+    return bool((app or current_app).config.get("SMS_PROVIDER"))
+
+
+def get_provider(app=None) -> SmsProvider:
+    """The configured provider, built once per process."""
+    app = app or current_app
+    state = app.extensions.setdefault("sms", {})
+    if "provider" not in state:
+        name = app.config["SMS_PROVIDER"]
+        if name not in PROVIDERS:
+            raise RuntimeError(f"unknown SMS_PROVIDER {name!r}")
+        state["provider"] = PROVIDERS[name](app.config)
+        state["limiter"] = RateLimiter(app.config.get("SMS_RATE_PER_SECOND", 10))
+    return state["provider"]
+
+
+def _limiter(app=None) -> RateLimiter:
+    get_provider(app)
+    return (app or current_app).extensions["sms"]["limiter"]
+
+
+# ---------- Queueing (request side) ----------
+
+def normalize_msisdn(phone: str, country_code: str = "254") -> str | None:
+    """'0712 345 678' -> '+254712345678'. None if it can't be a phone number."""
+    if not phone:
+        return None
+    digits = re.sub(r"\D", "", phone)
+    if phone.strip().startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith("0"):
+        digits = country_code + digits[1:]
+    elif len(digits) <= 9:
+        digits = country_code + digits
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+def queue_sms(company_id: int, phone: str, body: str, kind: str, source_key: str):
+    """
+    Add a message to the outbox in the caller's transaction; it is sent
+    after the caller commits. Returns the row, or None if SMS is off or the
+    number is unusable.
+    """
+    if not sms_enabled():
+        return None
+    to_number = normalize_msisdn(phone, current_app.config.get("SMS_DEFAULT_COUNTRY_CODE", "254"))
+    if to_number is None:
+        current_app.logger.warning("sms %s: unusable phone number, not queued", source_key)
+        return None
+    msg = SmsMessage(company_id=company_id, kind=kind, source_key=source_key, to_number=to_number, body=body[:480])
+    db.session.add(msg)
+    return msg
+
+
+def _money(currency, value) -> str:
+    return f"{currency} {value:,.2f}"
+
+
+def _first_name(tenant) -> str:
+    return (tenant.full_name or "").split(" ")[0] or "there"
+
+
+def notify_payment_received(payment, tenant, unit):
+    if not sms_enabled():
+        return None
+    if payment.id is None:
+        db.session.flush()
+    body = (
+        f"Hi {_first_name(tenant)}, we received {_money(payment.currency, payment.amount)} "
+        f"for house {unit.house_number}, {payment.paid_for_month:%b %Y}. "
+        f"Balance: {_money(payment.currency, payment.balance_after or 0)}."
+    )
+    if payment.credit_after:
+        body += f" Credit: {_money(payment.currency, payment.credit_after)}."
+    return queue_sms(tenant.company_id, tenant.phone, body, "payment_received", f"payment:{payment.id}")
+
+
+def notify_invoice_issued(invoice, tenant, unit):
+    if not sms_enabled():
+        return None
+    if invoice.id is None:
+        db.session.flush()
+    body = f"Hi {_first_name(tenant)}, invoice {invoice.invoice_number} for house {unit.house_number}: " \
+           f"{_money(invoice.currency, invoice.total)}"
+    if invoice.due_date:
+        body += f", due {invoice.due_date:%d %b %Y}"
+    return queue_sms(invoice.company_id, tenant.phone, body + ".", "invoice_issued", f"invoice:{invoice.id}")
+
+
+# ---------- Sending (background side) ----------
+
+def backoff_seconds(attempts: int, base: float, cap: float) -> float:
+    """Exponential backoff with jitter: about base, 2*base, 4*base ... up to cap."""
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    return random.uniform(delay / 2, delay)
+
+
+def _claim(batch_size: int, claim_seconds: float, now: datetime, max_attempts: int):
+    """
+    Mark up to batch_size due rows as sending and commit, so the rows aren't
+    locked while the provider is called. Counts the attempt up front: a row
+    whose sender dies mid-send is retried when its claim lapses, but not
+    forever: once it has used max_attempts it's marked failed instead.
+    Returns (claimed rows, rows given up on).
+    """
+    lapsed = and_(SmsMessage.status == "sending", SmsMessage.claimed_until < now)
+    expired = (
+        db.session.query(SmsMessage)
+        .filter(lapsed, SmsMessage.attempts >= max_attempts)
+        .update({
+            SmsMessage.status: "failed",
+            SmsMessage.claimed_until: None,
+            SmsMessage.last_error: "claim lapsed on the last attempt",
+        }, synchronize_session=False)
+    )
+    rows = (
+        db.session.query(SmsMessage)
+        .filter(or_(
+            and_(SmsMessage.status == "queued", SmsMessage.next_attempt_at <= now),
+            and_(lapsed, SmsMessage.attempts < max_attempts),
+        ))
+        .order_by(SmsMessage.next_attempt_at.asc(), SmsMessage.id.asc())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = []
+    for m in rows:
+        m.status = "sending"
+        m.claimed_until = now + timedelta(seconds=claim_seconds)
+        m.attempts += 1
+        claimed.append((m.id, m.to_number, m.body))
+    db.session.commit()
+    return claimed, expired
+
+
+def _send_one(provider, limiter, to_number, body):
+    limiter.acquire()
+    try:
+        return provider.send(to_number, body), None
+    except SmsError as e:
+        return None, e
+    except Exception as e:  # a provider bug shouldn't stop the batch; retried like a network error
+        return None, SmsError(f"{type(e).__name__}: {e}")
+
+
+def drain_outbox(batch_size: int = 100, concurrency: int = 4, max_attempts: int = 6,
+                 backoff_base: float = 30, backoff_max: float = 3600, claim_seconds: float = 300,
+                 time_budget: float = 30, provider: SmsProvider | None = None) -> dict:
+    """
+    Send due messages batch by batch until none are due or time_budget
+    seconds have passed. Returns counts for the run.
+    """
+    result = {"skipped": False, "sent": 0, "retry": 0, "failed": 0}
+    if provider is None and not sms_enabled():
+        return result
+    provider = provider or get_provider()
+    limiter = _limiter()
+
+    with job_lock(ADVISORY_LOCK_KEY) as acquired:
+        if not acquired:
+            result["skipped"] = True
+            return result
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="sms-send") as pool:
+            while time.monotonic() - started < time_budget:
+                claimed, expired = _claim(batch_size, claim_seconds, datetime.utcnow(), max_attempts)
+                result["failed"] += expired
+                if not claimed:
+                    break
+                futures = {
+                    msg_id: pool.submit(_send_one, provider, limiter, to_number, body)
+                    for msg_id, to_number, body in claimed
+                }
+
+                now = datetime.utcnow()
+                rows = db.session.query(SmsMessage).filter(SmsMessage.id.in_(list(futures))).all()
+                for m in rows:
+                    message_id, error = futures[m.id].result()
+                    m.provider = provider.name
+                    m.claimed_until = None
+                    if error is None:
+                        m.status = "sent"
+                        m.provider_message_id = message_id
+                        m.sent_at = now
+                        m.last_error = None
+                        result["sent"] += 1
+                    elif error.retryable and m.attempts < max_attempts:
+                        m.status = "queued"
+                        m.next_attempt_at = now + timedelta(seconds=backoff_seconds(m.attempts, backoff_base, backoff_max))
+                        m.last_error = str(error)[:255]
+                        result["retry"] += 1
+                    else:
+                        m.status = "failed"
+                        m.last_error = str(error)[:255]
+                        result["failed"] += 1
+                db.session.commit()
+
+                if len(claimed) < batch_size:
+                    break
+    return result
+
+
+def drain_from_config(app=None) -> dict:
+    config = (app or current_app).config
+    return drain_outbox(
+        batch_size=config.get("SMS_BATCH_SIZE", 100),
+        concurrency=config.get("SMS_CONCURRENCY", 4),
+        max_attempts=config.get("SMS_MAX_ATTEMPTS", 6),
+        backoff_base=config.get("SMS_BACKOFF_SECONDS", 30),
+        backoff_max=config.get("SMS_BACKOFF_MAX_SECONDS", 3600),
+    )
+
+
+def init_sms(app):
+    if not sms_enabled(app):
+        return
+    register_job(app, "sms-sender", app.config.get("SMS_SEND_INTERVAL", 5), drain_from_config)
@@ -0,0 +1,192 @@
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from ..extensions import db
+from ..models import RevokedToken
+from .job_lock import job_lock
+from .scheduler import register_job
+
+# Day partitions on Postgres are named revoked_token_pYYYYMMDD and hold the
+# rows whose expires_at falls on that (UTC) day. Rows outside every day
+# partition land in revoked_token_default and are purged by the batched delete.
+PARTITION_PREFIX = "revoked_token_p"
+ADVISORY_LOCK_KEY = 0x52564B54  # "RVKT": one purge at a time across workers
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def purge_expired_batched(batch_size: int = 5000, pause: float = 0.2, now: datetime | None = None,
+                          max_batches: int | None = None) -> int:
+    """
+    Delete expired rows `batch_size` at a time, committing and sleeping
+    `pause` seconds between batches so locks stay short and replicas/WAL
+    keep up. Returns the number of rows deleted.
+    """
+    now = now or datetime.utcnow()
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = (
+            db.session.query(RevokedToken.id)
+            .filter(RevokedToken.expires_at < now)
+            .limit(batch_size)
+            .subquery()
+        )
+        deleted = (
+            db.session.query(RevokedToken)
+            .filter(RevokedToken.id.in_(db.session.query(ids.c.id)))
+            .delete(synchronize_session=False)
+        )
+        db.session.commit()
+        total += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def is_partitioned() -> bool:
+    if _dialect() != "postgresql":
+        return False
+    kind = db.session.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = 'revoked_token' AND relkind IN ('r', 'p')")
+    ).scalar()
+    return kind == "p"
+
+
+def _partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _create_day_partition(day: date):
+    db.session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {_partition_name(day)} PARTITION OF revoked_token "
+        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+    ))
+
+
+def ensure_partitions(days_ahead: int, today: date | None = None) -> int:
+    """Create day partitions from today through today + days_ahead."""
+    today = today or datetime.utcnow().date()
+    for i in range(days_ahead + 1):
+        _create_day_partition(today + timedelta(days=i))
+    db.session.commit()
+    return days_ahead + 1
+
+
+def drop_expired_partitions(now: datetime | None = None) -> list:
+    """Drop day partitions whose whole day is in the past. Returns their names."""
+    now = now or datetime.utcnow()
+    rows = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'revoked_token' AND c.relname LIKE :prefix"
+    ), {"prefix": PARTITION_PREFIX + "%"}).scalars().all()
+
+    dropped = []
+    for name in sorted(rows):
+        try:
+            day = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+        except ValueError:
+            continue
+        if datetime.combine(day + timedelta(days=1), datetime.min.time()) <= now:
+            db.session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    db.session.commit()
+    return dropped
+
+
+def partition_revoked_tokens(days_ahead: int):
+    """
+    One-off Postgres conversion of revoked_token into a table partitioned by
+    expires_at day. Unexpired rows are copied; expired ones are left behind.
+    The jti unique index has to include the partition key, so it becomes
+    (jti, expires_at); lookups by jti still use it.
+    """
+    if _dialect() != "postgresql":
+        raise RuntimeError("partitioning is only supported on postgresql")
+    if is_partitioned():
+        return False
+
+    today = datetime.utcnow().date()
+    stmts = [
+        "LOCK TABLE revoked_token IN ACCESS EXCLUSIVE MODE",
+        "CREATE TABLE revoked_token_new ("
+        " id integer NOT NULL DEFAULT nextval('revoked_token_id_seq'),"
+        " jti varchar(36) NOT NULL,"
+        " token_type varchar(10) NOT NULL,"
+        " user_id integer NOT NULL,"
+        " expires_at timestamp without time zone NOT NULL,"
+        " created_at timestamp without time zone NOT NULL,"
+        " PRIMARY KEY (id, expires_at)"
+        ") PARTITION BY RANGE (expires_at)",
+        "CREATE TABLE revoked_token_default PARTITION OF revoked_token_new DEFAULT",
+    ]
+    for i in range(days_ahead + 1):
+        day = today + timedelta(days=i)
+        stmts.append(
+            f"CREATE TABLE {_partition_name(day)} PARTITION OF revoked_token_new "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        )
+    stmts += [
+        "INSERT INTO revoked_token_new (id, jti, token_type, user_id, expires_at, created_at) "
+        "SELECT id, jti, token_type, user_id, expires_at, created_at FROM revoked_token "
+        "WHERE expires_at >= now() AT TIME ZONE 'utc'",
+        "ALTER SEQUENCE revoked_token_id_seq OWNED BY NONE",
+        "DROP TABLE revoked_token",
+        "ALTER TABLE revoked_token_new RENAME TO revoked_token",
+        "ALTER SEQUENCE revoked_token_id_seq OWNED BY revoked_token.id",
+        "CREATE UNIQUE INDEX ix_revoked_token_jti ON revoked_token (jti, expires_at)",
+        "CREATE INDEX ix_revoked_token_created_at ON revoked_token (created_at)",
+    ]
+    for stmt in stmts:
+        db.session.execute(text(stmt))
+    db.session.commit()
+    return True
+
+
+def purge_revoked_tokens(batch_size: int = 5000, pause: float = 0.2, days_ahead: int = 35) -> dict:
+    """
+    The scheduled job. On a partitioned table, keeps day partitions created
+    ahead and drops whole expired days; then batch-deletes whatever expired
+    rows remain (all of them on an unpartitioned table). On Postgres only one
+    worker runs it at a time.
+    """
+    result = {"skipped": False, "dropped_partitions": [], "deleted": 0}
+
+    # without the lock (SQLite, PgBouncer) concurrent purges are tolerated: each batch is idempotent
+    with job_lock(ADVISORY_LOCK_KEY) as acquired:
+        if not acquired:
+            result["skipped"] = True
+            return result
+        if is_partitioned():
+            ensure_partitions(days_ahead)
+            result["dropped_partitions"] = drop_expired_partitions()
+        result["deleted"] = purge_expired_batched(batch_size=batch_size, pause=pause)
+    return result
+
+
+def init_token_purge(app):
+    config = app.config
+    register_job(
+        app,
+        "purge-revoked-tokens",
+        config.get("REVOKED_TOKEN_PURGE_INTERVAL", 3600),
+        lambda: purge_revoked_tokens(
+            batch_size=config.get("REVOKED_TOKEN_PURGE_BATCH", 5000),
+            pause=config.get("REVOKED_TOKEN_PURGE_PAUSE", 0.2),
+            days_ahead=partition_days_ahead(config),
+        ),
+    )
+
+
+def partition_days_ahead(config) -> int:
+    # cover the longest-lived token so new revocations never land in the default partition
+    return config["JWT_REFRESH_TOKEN_EXPIRES"].days + 5
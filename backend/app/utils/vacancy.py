@@ -0,0 +1,101 @@
+from sqlalchemy import case, func
+
+from ..extensions import db
+from ..models import Property, Unit
+from .cache import TTLCache
+
+# Lower bounds of the rent bands reported as facets; the last band is open-ended
+RENT_BANDS = (0, 5000, 10000, 20000, 50000, 100000)
+
+# Replaced with the configured TTL by init_vacancy_cache()
+vacancy_cache = TTLCache(ttl_seconds=15)
+
+
+def _band_labels():
+    labels = []
+    for lo, hi in zip(RENT_BANDS, RENT_BANDS[1:] + (None,)):
+        labels.append(f"{lo}-{hi}" if hi is not None else f"{lo}+")
+    return labels
+
+
+def vacant_units_query(company_id, min_rent=None, max_rent=None, property_id=None, location=None):
+    """
+    Vacant, live units with their property, narrowed by the given filters.
+    The company/status/rent part is served by ix_unit_company_status_rent.
+    """
+    q = (
+        db.session.query(
+            Unit.id,
+            Unit.property_id,
+            Unit.house_number,
+            Unit.rent,
+            Unit.garbage_fee,
+            Unit.water_rate,
+            Unit.deposit,
+            Property.name.label("property_name"),
+            Property.location,
+        )
+        .join(Property, Property.id == Unit.property_id)
+        .filter(
+            Unit.status == "vacant",
+            Unit.deleted_at.is_(None),
+            Property.deleted_at.is_(None),
+        )
+    )
+    if company_id is not None:
+        q = q.filter(Unit.company_id == company_id)
+    if min_rent is not None:
+        q = q.filter(Unit.rent >= min_rent)
+    if max_rent is not None:
+        q = q.filter(Unit.rent <= max_rent)
+    if property_id is not None:
+        q = q.filter(Unit.property_id == property_id)
+    if location:
+        escaped = location.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        q = q.filter(Property.location.ilike(f"%{escaped}%", escape="\\"))
+    return q
+
+
+def vacancy_facets(query) -> dict:
+    """
+    Counts per property and per rent band over the filtered units, from one
+    GROUP BY (property, band) query folded into both facets here.
+    """
+    sub = query.subquery()
+    band = case(
+        *[(sub.c.rent >= lo, i) for i, lo in reversed(list(enumerate(RENT_BANDS)))],
+        else_=0,
+    )
+    rows = (
+        db.session.query(sub.c.property_id, sub.c.property_name, band.label("band"), func.count())
+        .group_by(sub.c.property_id, sub.c.property_name, band)
+        .all()
+    )
+
+    labels = _band_labels()
+    by_property = {}
+    by_band = [0] * len(RENT_BANDS)
+    for pid, name, band_idx, n in rows:
+        entry = by_property.setdefault(pid, {"property_id": pid, "name": name, "count": 0})
+        entry["count"] += n
+        by_band[band_idx] += n
+
+    return {
+        "total": sum(by_band),
+        "properties": sorted(by_property.values(), key=lambda p: (-p["count"], p["property_id"])),
+        "rent_bands": [{"band": labels[i], "min": RENT_BANDS[i], "count": n} for i, n in enumerate(by_band)],
+    }
+
+
+def cached_vacancy(key, compute):
+    hit = vacancy_cache.get(key)
+    if hit is not None:
+        return hit
+    payload = compute()
+    vacancy_cache.set(key, payload)
+    return payload
+
+
+def init_vacancy_cache(app):
+    global vacancy_cache
+    vacancy_cache = TTLCache(ttl_seconds=app.config.get("VACANCY_CACHE_TTL", 15))
@@ -0,0 +1,41 @@
+import importlib
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from ..extensions import db
+from . import passwords, revocation
+
+
+def warm_up_master(app):
+    """
+    Work that is the same in every worker: done once before forking, the
+    result is shared copy-on-write instead of being repeated per worker.
+    """
+    configure_mappers()
+    # modules the app imports lazily, loaded here so workers inherit them
+    for name in app.config.get("PRELOAD_MODULES", ()):
+        importlib.import_module(name)
+    with app.app_context():
+        # one round trip runs the dialect's first-connect setup (server
+        # version, isolation level), which stays on the engine after dispose()
+        db.session.execute(text("SELECT 1"))
+        db.session.remove()
+        # connections must not cross the fork; workers open their own
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def warm_up_worker(app):
+    """
+    Per-worker warmup, before the worker accepts traffic: open a pooled
+    connection, load the revocation filter and work out the password method,
+    so the first real requests don't pay for any of it.
+    """
+    with app.app_context():
+        db.session.execute(text("SELECT 1"))
+        if revocation.revocation_cache is not None:
+            revocation.revocation_cache.is_revoked("warmup")
+        # hashes one empty password with the configured cost
+        passwords.warm_up()
+        db.session.remove()
@@ -4,7 +4,7 @@ from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 
 from ..extensions import db
-from ..models import WaterReading, Lease
+from ..models import WaterReading, Unit
 
 
 def _to_decimal(value, name: str) -> Decimal:
@@ -58,17 +58,11 @@ def compute_usage_and_amount(previous: Decimal, current: Decimal, rate: Decimal)
 
 
 def active_tenant_id_for_unit(unit_id: int):
-    lease = (
-        Lease.query
-        .filter(
-            Lease.unit_id == unit_id,
-            Lease.is_active == True,
-            Lease.deleted_at.is_(None),
-        )
-        .order_by(Lease.id.desc())
-        .first()
+    return (
+        db.session.query(Unit.current_tenant_id)
+        .filter(Unit.id == unit_id)
+        .scalar()
     )
-    return lease.tenant_id if lease else None
 
 
 def get_water_reading_for_month(unit_id: int, month_start: date):
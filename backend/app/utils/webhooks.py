@@ -0,0 +1,442 @@
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import random
+import secrets
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from flask import current_app
+from sqlalchemy import and_, exists, insert
+
+from ..extensions import db
+from ..models import WebhookAttempt, WebhookDelivery, WebhookEvent, WebhookSubscription
+from .job_lock import job_lock
+from .scheduler import register_job
+
+# Outbound webhooks through an outbox.
+#
+# Write paths call emit_event() before their commit: it only adds a
+# webhook_events row, so an event exists exactly when the change does and
+# the request never waits on a receiver.
+#
+# dispatch() (a scheduled job, or `flask webhooks-dispatch`):
+# 1. fans new events out into webhook_deliveries, one row per matching
+#    subscription of the event's company. Paused ones get their rows too
+#    and are sent them once re-enabled; only deleting a subscription drops
+#    its events;
+# 2. for every subscription that is due, POSTs its oldest pending
+#    deliveries as one signed batch, WEBHOOK_CONCURRENCY subscriptions at a
+#    time. A 2xx marks the whole batch delivered; anything else leaves it
+#    pending and backs the subscription off exponentially, and after
+#    WEBHOOK_MAX_FAILURES failures in a row the subscription is paused.
+# Every POST is logged in webhook_attempts.
+#
+# Receivers must be public: a URL whose host resolves to a loopback,
+# private, link-local or otherwise non-global address is refused when the
+# subscription is saved and again before each POST (DNS can change in
+# between). The POST then connects to the very address that was checked,
+# so a second lookup can't swap in an internal one, and redirects aren't
+# followed. WEBHOOK_ALLOWED_HOSTS exempts named hosts, e.g. a receiver on
+# the same network.
+#
+# Delivery is at least once: receivers dedupe on the event "id".
+
+ADVISORY_LOCK_KEY = 0x57484B31  # "WHK1"
+SIGNATURE_HEADER = "X-Webhook-Signature"
+USER_AGENT = "SmartHome-Webhooks/1"
+FAN_OUT_BATCH = 1000
+
+EVENT_TYPES = (
+    "payment.created",
+    "invoice.issued",
+    "lease.created",
+    "lease.ended",
+    "lease.moved_out",
+    "water_reading.recorded",
+    "water_reading.updated",
+    "water_reading.deleted",
+)
+
+
+def webhooks_enabled(app=None) -> bool:
+    return bool((app or current_app).config.get("WEBHOOKS_ENABLED", True))
+
+
+def allowed_hosts(app=None) -> frozenset:
+    return frozenset((app or current_app).config.get("WEBHOOK_ALLOWED_HOSTS", ()))
+
+
+def _checked_address(url: str, allowed=frozenset()):
+    """
+    Resolve `url`'s host once. Returns (address, None) with the address to
+    connect to, (None, None) for an allowed host (connect by name), or
+    (None, reason) when any address it resolves to isn't public.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if not host:
+        return None, "no host"
+    if host in allowed:
+        return None, None
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError, ValueError):
+        return None, f"can't resolve {host}"
+    for *_, sockaddr in infos:
+        ip = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            return None, f"{host} resolves to non-public address {ip}"
+    return infos[0][4][0], None
+
+
+def url_block_reason(url: str, allowed=frozenset()) -> str | None:
+    """Why `url` mustn't be posted to, or None when every address its host resolves to is public."""
+    return _checked_address(url, allowed)[1]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """Connects to a given address; Host still names the URL's host."""
+
+    def __init__(self, host, port, address, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.address = address
+
+    def connect(self):
+        if self.address is None:
+            return super().connect()
+        self.sock = socket.create_connection((self.address, self.port), self.timeout, self.source_address)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """As above, with the certificate and SNI checked against the URL's host."""
+
+    def __init__(self, host, port, address, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.address = address
+
+    def connect(self):
+        if self.address is None:
+            return super().connect()
+        sock = socket.create_connection((self.address, self.port), self.timeout, self.source_address)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def new_secret() -> str:
+    return secrets.token_hex(32)
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """Header value: t=<unix time>,v1=<hex HMAC-SHA256 of "<t>." + body>."""
+    mac = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={mac}"
+
+
+def verify(secret: str, header: str, body: bytes, tolerance: float = 300, now: float | None = None) -> bool:
+    """Receiver side of sign(): checks the MAC and that the timestamp is recent."""
+    try:
+        parts = dict(p.split("=", 1) for p in header.split(","))
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    if abs((now or time.time()) - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), f"t={timestamp},v1={parts.get('v1', '')}")
+
+
+def parse_event_types(value) -> str | None:
+    """Normalize a list or comma string of event types to the stored form; None if any is unknown."""
+    if value in (None, "", "*", ["*"]):
+        return "*"
+    items = value.split(",") if isinstance(value, str) else value
+    if not isinstance(items, list):
+        return None
+    types = sorted({str(t).strip() for t in items if str(t).strip()})
+    if not types or any(t not in EVENT_TYPES for t in types):
+        return None
+    return ",".join(types)
+
+
+def _matches(subscription_types: str, event_type: str) -> bool:
+    return subscription_types == "*" or event_type in subscription_types.split(",")
+
+
+# ---------- Emitting (request side) ----------
+
+def emit_event(company_id: int, event_type: str, data: dict):
+    """Add an event to the outbox in the caller's transaction."""
+    if not webhooks_enabled():
+        return None
+    event = WebhookEvent(company_id=company_id, event_type=event_type, payload=current_app.json.dumps(data))
+    db.session.add(event)
+    return event
+
+
+def emit_events(event_type: str, items):
+    """Bulk emit_event for [(company_id, data), ...], one INSERT (bulk write paths)."""
+    if not webhooks_enabled() or not items:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(WebhookEvent), [
+        {"company_id": company_id, "event_type": event_type, "payload": current_app.json.dumps(data),
+         "created_at": now}
+        for company_id, data in items
+    ])
+
+
+# ---------- Dispatching (background side) ----------
+
+def backoff_seconds(failures: int, base: float, cap: float) -> float:
+    """Exponential backoff with jitter: about base, 2*base, 4*base ... up to cap."""
+    delay = min(cap, base * (2 ** max(0, failures - 1)))
+    return random.uniform(delay / 2, delay)
+
+
+def fan_out(limit: int = FAN_OUT_BATCH) -> int:
+    """Turn up to `limit` new events into per-subscription delivery rows. Returns events processed."""
+    now = datetime.utcnow()
+    events = (
+        db.session.query(WebhookEvent.id, WebhookEvent.company_id, WebhookEvent.event_type)
+        .filter(WebhookEvent.fanned_out_at.is_(None))
+        .order_by(WebhookEvent.id.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not events:
+        db.session.commit()
+        return 0
+
+    subscriptions = {}
+    for sub_id, company_id, types in (
+        db.session.query(WebhookSubscription.id, WebhookSubscription.company_id, WebhookSubscription.event_types)
+        .filter(WebhookSubscription.company_id.in_({e.company_id for e in events}))
+        .all()
+    ):
+        subscriptions.setdefault(company_id, []).append((sub_id, types))
+
+    rows = [
+        {"subscription_id": sub_id, "event_id": e.id, "created_at": now}
+        for e in events
+        for sub_id, types in subscriptions.get(e.company_id, ())
+        if _matches(types, e.event_type)
+    ]
+    if rows:
+        db.session.execute(insert(WebhookDelivery), rows)
+    db.session.query(WebhookEvent).filter(WebhookEvent.id.in_([e.id for e in events])).update(
+        {WebhookEvent.fanned_out_at: now}, synchronize_session=False
+    )
+    db.session.commit()
+    return len(events)
+
+
+def _due_subscriptions(now: datetime, limit: int):
+    # paused subscriptions keep their pending rows until they're re-enabled
+    pending = exists().where(and_(
+        WebhookDelivery.subscription_id == WebhookSubscription.id,
+        WebhookDelivery.delivered_at.is_(None),
+    ))
+    return (
+        db.session.query(WebhookSubscription)
+        .filter(
+            WebhookSubscription.is_active == True,
+            WebhookSubscription.next_attempt_at <= now,
+            pending,
+        )
+        .order_by(WebhookSubscription.next_attempt_at.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def _pending_batch(subscription_id: int, batch_size: int):
+    return (
+        db.session.query(WebhookDelivery.id, WebhookEvent.id, WebhookEvent.event_type,
+                         WebhookEvent.created_at, WebhookEvent.payload)
+        .join(WebhookEvent, WebhookEvent.id == WebhookDelivery.event_id)
+        .filter(WebhookDelivery.subscription_id == subscription_id, WebhookDelivery.delivered_at.is_(None))
+        .order_by(WebhookDelivery.event_id.asc())
+        .limit(batch_size)
+        .all()
+    )
+
+
+def _batch_body(subscription_id: int, rows) -> bytes:
+    # payloads are stored as JSON text: splice them in rather than decoding and re-encoding
+    events = ",".join(
+        '{"id":%d,"type":%s,"created_at":%s,"data":%s}' % (
+            event_id, json.dumps(event_type), json.dumps(created_at.isoformat() + "Z"), payload,
+        )
+        for _, event_id, event_type, created_at, payload in rows
+    )
+    return ('{"subscription_id":%d,"events":[%s]}' % (subscription_id, events)).encode()
+
+
+def _post(url: str, secret: str, body: bytes, timeout: float, allowed=frozenset()):
+    """POST one batch. Returns (status_code or None, error or None, duration_ms)."""
+    address, blocked = _checked_address(url, allowed)
+    if blocked:
+        return None, f"blocked: {blocked}", 0
+    parsed = urlparse(url)
+    connection_class = _PinnedHTTPSConnection if parsed.scheme == "https" else _PinnedHTTPConnection
+    conn = connection_class(parsed.hostname, parsed.port, address, timeout=timeout)
+    path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+    started = time.perf_counter()
+    status, error = None, None
+    try:
+        conn.request("POST", path, body=body, headers={
+            "Content-Type": "application/json",
+            "User-Agent": USER_AGENT,
+            SIGNATURE_HEADER: sign(secret, int(time.time()), body),
+        })
+        resp = conn.getresponse()
+        status = resp.status
+        resp.read(1024)
+        if not 200 <= status < 300:
+            # redirects included: following one would skip the address check
+            error = f"http {status}"
+    except Exception as e:  # refused, TLS, timeout: all retried the same way
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        conn.close()
+    return status, error, int((time.perf_counter() - started) * 1000)
+
+
+def dispatch(batch_size: int = 100, concurrency: int = 4, timeout: float = 10, backoff_base: float = 30,
+             backoff_max: float = 3600, max_failures: int = 20, time_budget: float = 30,
+             allowed=None) -> dict:
+    """
+    Fan out new events, then deliver pending ones until nothing is due or
+    time_budget seconds have passed. Returns counts for the run. `allowed`
+    defaults to WEBHOOK_ALLOWED_HOSTS.
+    """
+    result = {"skipped": False, "fanned_out": 0, "posts": 0, "delivered": 0, "failed_posts": 0, "paused": 0}
+    if not webhooks_enabled():
+        return result
+    if allowed is None:
+        allowed = allowed_hosts()
+
+    with job_lock(ADVISORY_LOCK_KEY) as acquired:
+        if not acquired:
+            result["skipped"] = True
+            return result
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="webhook-post") as pool:
+            while time.monotonic() - started < time_budget:
+                fanned = fan_out()
+                result["fanned_out"] += fanned
+
+                due_limit = max(1, concurrency) * 4
+                subscriptions = _due_subscriptions(datetime.utcnow(), limit=due_limit)
+                batches = {s.id: _pending_batch(s.id, batch_size) for s in subscriptions}
+                # plain values for the threads; the session stays on this one
+                jobs = {
+                    s.id: pool.submit(_post, s.url, s.secret, _batch_body(s.id, batches[s.id]), timeout, allowed)
+                    for s in subscriptions if batches[s.id]
+                }
+                if not jobs and not fanned:
+                    break
+
+                now = datetime.utcnow()
+                full_batch = False
+                for s in subscriptions:
+                    if s.id not in jobs:
+                        continue
+                    rows = batches[s.id]
+                    status, error, duration_ms = jobs[s.id].result()
+                    db.session.add(WebhookAttempt(
+                        subscription_id=s.id, event_count=len(rows),
+                        first_event_id=rows[0][1], last_event_id=rows[-1][1],
+                        status_code=status, error=error[:255] if error else None,
+                        duration_ms=duration_ms, attempted_at=now,
+                    ))
+                    result["posts"] += 1
+                    if status is not None and 200 <= status < 300:
+                        db.session.query(WebhookDelivery).filter(
+                            WebhookDelivery.id.in_([r[0] for r in rows])
+                        ).update({WebhookDelivery.delivered_at: now}, synchronize_session=False)
+                        s.failure_count = 0
+                        s.next_attempt_at = now
+                        s.last_delivered_at = now
+                        result["delivered"] += len(rows)
+                        full_batch = full_batch or len(rows) == batch_size
+                    else:
+                        s.failure_count += 1
+                        s.next_attempt_at = now + timedelta(
+                            seconds=backoff_seconds(s.failure_count, backoff_base, backoff_max)
+                        )
+                        result["failed_posts"] += 1
+                        if s.failure_count >= max_failures:
+                            s.is_active = False
+                            s.paused_reason = f"{s.failure_count} failed deliveries in a row, last: {error}"[:255]
+                            result["paused"] += 1
+                db.session.commit()
+
+                # go round again only if there is more: a full batch, more due subscriptions or events
+                if not full_batch and len(subscriptions) < due_limit and fanned < FAN_OUT_BATCH:
+                    break
+    return result
+
+
+def purge_delivered(retention_days: float, batch_size: int = 5000) -> dict:
+    """Drop delivered deliveries, fully delivered events and attempt logs older than retention_days."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = {"deliveries": 0, "events": 0, "attempts": 0}
+
+    def _batched(model, *criteria):
+        total = 0
+        while True:
+            ids = db.session.query(model.id).filter(*criteria).limit(batch_size).subquery()
+            n = (
+                db.session.query(model)
+                .filter(model.id.in_(db.session.query(ids.c.id)))
+                .delete(synchronize_session=False)
+            )
+            db.session.commit()
+            total += n
+            if n < batch_size:
+                return total
+
+    deleted["deliveries"] = _batched(
+        WebhookDelivery, WebhookDelivery.delivered_at.isnot(None), WebhookDelivery.delivered_at < cutoff,
+    )
+    deleted["events"] = _batched(
+        WebhookEvent,
+        WebhookEvent.fanned_out_at.isnot(None),
+        WebhookEvent.fanned_out_at < cutoff,
+        ~exists().where(WebhookDelivery.event_id == WebhookEvent.id),
+    )
+    deleted["attempts"] = _batched(WebhookAttempt, WebhookAttempt.attempted_at < cutoff)
+    return deleted
+
+
+def dispatch_from_config(app=None) -> dict:
+    config = (app or current_app).config
+    return dispatch(
+        batch_size=config.get("WEBHOOK_BATCH_SIZE", 100),
+        concurrency=config.get("WEBHOOK_CONCURRENCY", 4),
+        timeout=config.get("WEBHOOK_TIMEOUT", 10),
+        backoff_base=config.get("WEBHOOK_BACKOFF_SECONDS", 30),
+        backoff_max=config.get("WEBHOOK_BACKOFF_MAX_SECONDS", 3600),
+        max_failures=config.get("WEBHOOK_MAX_FAILURES", 20),
+    )
+
+
+def init_webhooks(app):
+    if not webhooks_enabled(app):
+        return
+    config = app.config
+    register_job(app, "webhook-dispatch", config.get("WEBHOOK_DISPATCH_INTERVAL", 5), dispatch_from_config)
+    register_job(
+        app, "webhook-purge", config.get("WEBHOOK_PURGE_INTERVAL", 3600),
+        lambda: purge_delivered(config.get("WEBHOOK_RETENTION_DAYS", 14)),
+    )
@@ -0,0 +1,46 @@
+import statistics
+import time
+
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.models import Company, User
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(pct / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def summarize_ms(values):
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean_ms": round(statistics.mean(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2),
+    }
+
+
+def bench_company(name_prefix: str, role: str = "manager"):
+    """Create a throwaway company + user and return (company, user, auth headers)."""
+    company = Company(name=f"{name_prefix}-{int(time.time() * 1000)}")
+    db.session.add(company)
+    db.session.flush()
+
+    user = User(email=f"{company.name}@bench.local", company_id=company.id, role=role)
+    user.set_password("bench-password")
+    db.session.add(user)
+    db.session.commit()
+
+    token = create_access_token(
+        identity=str(user.id),
+        additional_claims={"role": role, "company_id": company.id},
+    )
+    return company, user, {"Authorization": f"Bearer {token}"}
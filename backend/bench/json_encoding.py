@@ -0,0 +1,86 @@
+"""
+Response encoding: Flask's stdlib provider vs FastJSONProvider (orjson).
+
+Seeds one company with generated data, then for a few list endpoints:
+- checks both providers return the same JSON document;
+- times encoding the endpoint's payload alone (jsonify only);
+- times the whole GET through the test client.
+
+    DATABASE_URL=sqlite:///bench.sqlite python -m bench.json_encoding --units 100 --rounds 200
+"""
+import argparse
+import json
+import time
+
+from flask import json as flask_json
+from flask.json.provider import DefaultJSONProvider
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.extensions import db
+from app.models import Company, User
+from app.utils.json_provider import FastJSONProvider, orjson
+from app.utils.seed_data import generate
+from bench.common import summarize_ms
+
+PATHS = (
+    "/api/units?per_page=500",
+    "/api/tenants?per_page=500",
+    "/api/leases?per_page=500",
+    "/api/invoices?limit=500",
+    "/api/payments?per_page=500",
+)
+
+
+def _time(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize_ms(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=100, help="per property, 5 properties")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=45)
+    args = parser.parse_args()
+
+    app = create_app()
+    providers = {"stdlib": DefaultJSONProvider(app), "orjson": FastJSONProvider(app)}
+    with app.app_context():
+        db.create_all()
+        try:
+            generate(properties=5, units=args.units, years=1, seed=args.seed)
+        except ValueError:
+            pass  # already seeded
+        company = Company.query.filter_by(name=f"Seed {args.seed}-001").first()
+        user = User.query.filter_by(company_id=company.id).first()
+        headers = {"Authorization": "Bearer " + create_access_token(
+            identity=str(user.id), additional_claims={"role": user.role, "company_id": company.id},
+        )}
+
+    client = app.test_client()
+    results = []
+    for path in PATHS:
+        row = {"path": path}
+        bodies = {}
+        for name, provider in providers.items():
+            app.json = provider
+            r = client.get(path, headers=headers)
+            bodies[name] = r.get_data()
+            row["bytes_" + name] = len(bodies[name])
+            payload = json.loads(bodies[name])
+            with app.test_request_context():
+                row["encode_" + name] = _time(lambda: flask_json.jsonify(payload), args.rounds)
+            row["request_" + name] = _time(lambda: client.get(path, headers=headers).get_data(), args.rounds // 4 or 1)
+        row["same_document"] = json.loads(bodies["stdlib"]) == json.loads(bodies["orjson"])
+        results.append(row)
+
+    print(json.dumps({"orjson_installed": orjson is not None, "rounds": args.rounds, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+End-to-end load benchmark over generated data.
+
+Seeds the database with `flask seed-data`'s generator (skipped when that
+seed is already there), then drives the app through scripted scenarios from
+concurrent clients for a fixed duration and reports throughput and latency
+percentiles per scenario and overall.
+
+    # in-process, through the Flask test client
+    DATABASE_URL=sqlite:///bench.sqlite python -m bench.load --companies 3 --years 2
+
+    # a local gunicorn started with gunicorn.conf.py
+    DATABASE_URL=postgresql://localhost/smarthome_bench python -m bench.load --target gunicorn --clients 32
+
+    # a server that's already running
+    python -m bench.load --target http://127.0.0.1:8000
+
+Scenarios (weights via --mix, e.g. "lists=10,preview=3,payment=2"):
+  login    POST /api/auth/login with a seeded manager's password
+  lists    one of the list pages (units, tenants, leases, invoices, payments, properties)
+  preview  GET /api/invoices/preview for a random lease and seeded month
+  invoice  POST /api/invoices for a month after the seeded range
+  payment  POST /api/payments for a random lease
+  pdf      GET /api/invoices/<id>/pdf for a seeded invoice
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy.engine import make_url
+
+from app import create_app
+from app.extensions import db
+from app.models import Company, Invoice, Lease, User
+from app.utils.seed_data import SEED_PASSWORD, generate
+from bench.common import summarize_ms
+from bench.serving import MODES, _free_port, _wait_ready
+
+DEFAULT_MIX = "login=1,lists=10,preview=4,invoice=1,payment=2,pdf=1"
+LIST_PATHS = (
+    "/api/units?per_page=50",
+    "/api/tenants?per_page=50",
+    "/api/leases?per_page=50",
+    "/api/invoices?limit=50",
+    "/api/payments?per_page=50",
+    "/api/properties",
+)
+
+
+def _next_month(d0: date) -> date:
+    return (d0.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _fixtures(args):
+    """Seed if needed, then collect what the scenarios pick from, per company."""
+    until = date(int(args.until[:4]), int(args.until[5:7]), 1) if args.until else date.today().replace(day=1)
+    try:
+        generate(
+            companies=args.companies, properties=args.properties, units=args.units, years=args.years,
+            seed=args.seed, until=until, log=print,
+        )
+    except ValueError:
+        print(f"seed {args.seed} already loaded; reusing it")
+
+    companies = []
+    for c in range(args.companies):
+        company = Company.query.filter_by(name=f"Seed {args.seed}-{c + 1:03d}").first()
+        user = User.query.filter_by(company_id=company.id, role="manager").first()
+        token = create_access_token(
+            identity=str(user.id), additional_claims={"role": user.role, "company_id": company.id},
+        )
+        leases = (
+            db.session.query(Lease.id, Lease.tenant_id, Lease.unit_id)
+            .filter(Lease.company_id == company.id, Lease.is_active.is_(True))
+            .all()
+        )
+        invoices = [i for (i,) in db.session.query(Invoice.id).filter(Invoice.company_id == company.id).limit(500)]
+        last = db.session.query(db.func.max(Invoice.period_start)).filter(Invoice.company_id == company.id).scalar()
+        companies.append({
+            "email": user.email,
+            "headers": {"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            "leases": [tuple(r) for r in leases],
+            "invoices": invoices,
+            "seeded_until": last or until,
+        })
+    return companies
+
+
+class Scenarios:
+    """Each scenario returns (method, path, json body or None, expected statuses)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._invoice_slot = 0
+
+    def login(self, rnd, co):
+        return "POST", "/api/auth/login", {"email": co["email"], "password": SEED_PASSWORD}, (200,)
+
+    def lists(self, rnd, co):
+        return "GET", rnd.choice(LIST_PATHS), None, (200,)
+
+    def preview(self, rnd, co):
+        lease_id, _, _ = rnd.choice(co["leases"])
+        month = co["seeded_until"]
+        return "GET", (
+            f"/api/invoices/preview?lease_id={lease_id}"
+            f"&period_start={month.isoformat()}&period_end={(_next_month(month) - timedelta(days=1)).isoformat()}"
+        ), None, (200,)
+
+    def invoice(self, rnd, co):
+        # walk (lease, month) pairs past the seeded range so each POST is new
+        with self._lock:
+            slot = self._invoice_slot
+            self._invoice_slot += 1
+        lease_id, _, _ = co["leases"][slot % len(co["leases"])]
+        month = co["seeded_until"]
+        for _ in range(1 + slot // len(co["leases"])):
+            month = _next_month(month)
+        body = {
+            "lease_id": lease_id,
+            "period_start": month.isoformat(),
+            "period_end": (_next_month(month) - timedelta(days=1)).isoformat(),
+        }
+        # 409 when another client (or an earlier run) got this slot first
+        return "POST", "/api/invoices", body, (201, 409)
+
+    def payment(self, rnd, co):
+        _, tenant_id, unit_id = rnd.choice(co["leases"])
+        body = {
+            "tenant_id": tenant_id, "unit_id": unit_id, "amount": rnd.randrange(1000, 30000),
+            "paid_for_month": co["seeded_until"].strftime("%Y-%m"), "method": "mpesa",
+        }
+        return "POST", "/api/payments", body, (201,)
+
+    def pdf(self, rnd, co):
+        return "GET", f"/api/invoices/{rnd.choice(co['invoices'])}/pdf", None, (200,)
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def send(method, path, body, headers):
+            r = client.open(path, method=method, json=body, headers=headers)
+            r.get_data()
+            return r.status_code
+
+        return send, lambda: None
+
+
+class HTTPTransport:
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+
+    def session(self):
+        state = {"conn": http.client.HTTPConnection(self.host, self.port, timeout=60)}
+
+        def send(method, path, body, headers):
+            payload = json.dumps(body) if body is not None else None
+            try:
+                state["conn"].request(method, path, body=payload, headers=headers)
+                r = state["conn"].getresponse()
+                r.read()
+            except (OSError, http.client.HTTPException):
+                state["conn"].close()
+                state["conn"] = http.client.HTTPConnection(self.host, self.port, timeout=60)
+                raise
+            if r.getheader("Connection", "").lower() == "close":
+                state["conn"].close()
+                state["conn"] = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            return r.status
+
+        return send, lambda: state["conn"].close()
+
+
+def _run(transport, scenarios, mix, companies, clients, duration, seed):
+    names, weights = zip(*mix)
+    latencies = {n: [] for n in names}
+    errors = {n: {} for n in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(n):
+        rnd = random.Random(seed * 1000 + n)
+        send, close = transport.session()
+        local = {name: [] for name in names}
+        local_errors = {name: {} for name in names}
+        while time.perf_counter() < deadline:
+            name = rnd.choices(names, weights)[0]
+            co = rnd.choice(companies)
+            method, path, body, expected = getattr(scenarios, name)(rnd, co)
+            t0 = time.perf_counter()
+            try:
+                status = send(method, path, body, co["headers"])
+            except Exception as e:
+                local_errors[name][type(e).__name__] = local_errors[name].get(type(e).__name__, 0) + 1
+                continue
+            local[name].append(time.perf_counter() - t0)
+            if status not in expected:
+                local_errors[name][str(status)] = local_errors[name].get(str(status), 0) + 1
+        close()
+        with lock:
+            for name in names:
+                latencies[name].extend(local[name])
+                for k, v in local_errors[name].items():
+                    errors[name][k] = errors[name].get(k, 0) + v
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    everything = [x for values in latencies.values() for x in values]
+    return {
+        "wall_s": round(wall, 2),
+        "requests_per_s": round(len(everything) / wall, 1) if wall else None,
+        "overall": summarize_ms(everything),
+        "scenarios": {
+            name: {
+                "requests_per_s": round(len(latencies[name]) / wall, 1) if wall else None,
+                "errors": errors[name],
+                "latency": summarize_ms(latencies[name]),
+            }
+            for name in names
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="testclient", help='"testclient", "gunicorn" or a base URL')
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--companies", type=int, default=2)
+    parser.add_argument("--properties", type=int, default=5)
+    parser.add_argument("--units", type=int, default=40)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--until", default=None, help="last seeded month, YYYY-MM (default: this month)")
+    args = parser.parse_args()
+
+    mix = []
+    for part in args.mix.split(","):
+        name, _, weight = part.strip().partition("=")
+        if not hasattr(Scenarios, name):
+            parser.error(f"unknown scenario {name!r}")
+        mix.append((name, float(weight or 1)))
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        companies = _fixtures(args)
+
+    proc = None
+    if args.target == "testclient":
+        transport = TestClientTransport(app)
+    elif args.target == "gunicorn":
+        port = _free_port()
+        env = dict(os.environ, SCHEDULER_ENABLED="0")
+        proc = subprocess.Popen(
+            MODES["gunicorn"](port), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        _wait_ready(port, companies[0]["headers"])
+        transport = HTTPTransport(f"http://127.0.0.1:{port}")
+    else:
+        transport = HTTPTransport(args.target)
+
+    try:
+        result = _run(transport, Scenarios(), mix, companies, args.clients, args.duration, args.seed)
+    finally:
+        if proc is not None:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(timeout=30)
+
+    print(json.dumps({
+        "target": args.target,
+        "database": make_url(app.config["SQLALCHEMY_DATABASE_URI"]).render_as_string(hide_password=True),
+        "clients": args.clients,
+        "duration_s": args.duration,
+        "mix": dict(mix),
+        **result,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
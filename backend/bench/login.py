@@ -0,0 +1,115 @@
+"""
+Login throughput benchmark for choosing PASSWORD_HASH_METHOD and
+PASSWORD_VERIFY_WORKERS on the target hardware.
+
+For each hash method, a batch of users is created and then logged in from
+many threads at once (the shift-start burst), through the real
+/api/auth/login. A cheap authenticated GET runs alongside to show how
+much the burst slows other requests in the same worker.
+
+Run from the backend directory against a scratch database:
+
+    DATABASE_URL=sqlite:///bench.sqlite python -m bench.login \\
+        --methods scrypt:32768:8:1,scrypt:16384:8:1,pbkdf2:sha256:600000 \\
+        --threads 16 --logins 200 --verify-workers 2
+"""
+import argparse
+import json
+import threading
+import time
+
+from app import create_app
+from app.extensions import db
+from app.models import User
+from app.utils import passwords
+from bench.common import bench_company, summarize_ms
+
+PASSWORD = "bench-password"
+
+
+def _run(app, method, args):
+    app.config["PASSWORD_HASH_METHOD"] = method
+    app.config["PASSWORD_VERIFY_WORKERS"] = args.verify_workers
+    passwords._executor = None
+
+    with app.app_context():
+        company, _, headers = bench_company("bench-login")
+        t0 = time.perf_counter()
+        emails = []
+        for i in range(args.users):
+            u = User(email=f"{company.name}-{i}@bench.local", company_id=company.id, role="staff")
+            u.set_password(PASSWORD)
+            db.session.add(u)
+            emails.append(u.email)
+        db.session.commit()
+        hash_s = (time.perf_counter() - t0) / args.users
+
+    logins, other = [], []
+    statuses = {}
+    lock = threading.Lock()
+    done = threading.Event()
+    per_thread = args.logins // args.threads
+
+    def login_worker(n):
+        client = app.test_client()
+        for i in range(per_thread):
+            email = emails[(n * per_thread + i) % len(emails)]
+            t0 = time.perf_counter()
+            r = client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+            elapsed = time.perf_counter() - t0
+            with lock:
+                logins.append(elapsed)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+    def other_worker():
+        client = app.test_client()
+        while not done.is_set():
+            t0 = time.perf_counter()
+            client.get("/api/properties", headers=headers)
+            other.append(time.perf_counter() - t0)
+
+    side = threading.Thread(target=other_worker)
+    side.start()
+    threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    done.set()
+    side.join()
+
+    return {
+        "method": method,
+        "hash_ms": round(hash_s * 1000, 2),
+        "logins_per_s": round(len(logins) / wall, 1) if wall else None,
+        "responses": {str(k): v for k, v in sorted(statuses.items())},
+        "login_latency": summarize_ms(logins),
+        "concurrent_get_latency": summarize_ms(other),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--methods", default=passwords.DEFAULT_METHOD, help="comma-separated werkzeug methods")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=200, help="total logins per method")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--verify-workers", type=int, default=2)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    results = [_run(app, m.strip(), args) for m in args.methods.split(",") if m.strip()]
+    print(json.dumps({
+        "threads": args.threads,
+        "verify_workers": args.verify_workers,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
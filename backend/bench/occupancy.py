@@ -0,0 +1,235 @@
+"""
+Concurrency stress benchmark for unit occupancy transitions.
+
+Many threads hammer a handful of units with lease creation and move-outs
+through the real API, then the database is checked for anomalies:
+
+- a unit with more than one active lease
+- unit.status or unit.current_lease_id disagreeing with its active leases
+- overlapping leases on the same unit
+- a lease settled by more than one move-out
+
+--mode baseline runs the same workload with the unit read without a lock,
+which is how the handlers behaved before the unit row lock; --mode both
+runs the two one after the other (each on its own company) and prints
+them side by side. "db_wait" is time spent inside SQL statements, which is
+where a request waits on another transaction's lock in either mode;
+"lock_wait" is the time to take the unit lock itself.
+
+Run from the backend directory against a scratch database:
+
+    DATABASE_URL=sqlite:///bench.sqlite python -m bench.occupancy --threads 8 --iterations 200 --mode both
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import event, func
+
+from app import create_app
+from app.extensions import db
+from app.models import Lease, MoveOutSettlement, Property, Tenant, Unit
+from app.routes import leases as lease_routes
+from bench.common import bench_company, summarize_ms
+
+
+def _setup(units: int, tenants: int):
+    company, user, headers = bench_company("bench-occupancy")
+
+    prop = Property(name="Bench Court", location="Bench", house_count=units, company_id=company.id)
+    db.session.add(prop)
+    db.session.flush()
+
+    unit_rows = [
+        Unit(
+            property_id=prop.id,
+            company_id=company.id,
+            house_number=f"B-{i + 1:03d}",
+            rent=10000,
+            garbage_fee=200,
+            water_rate=100,
+            deposit=10000,
+        )
+        for i in range(units)
+    ]
+    tenant_rows = [
+        Tenant(full_name=f"Bench Tenant {i + 1}", phone="0700000000", company_id=company.id)
+        for i in range(tenants)
+    ]
+    db.session.add_all(unit_rows + tenant_rows)
+    db.session.commit()
+    return company.id, headers, [u.id for u in unit_rows], [t.id for t in tenant_rows]
+
+
+def _check_anomalies(company_id: int, unit_ids):
+    anomalies = []
+
+    multi_active = (
+        db.session.query(Lease.unit_id, func.count(Lease.id))
+        .filter(Lease.unit_id.in_(unit_ids), Lease.is_active == True, Lease.deleted_at.is_(None))
+        .group_by(Lease.unit_id)
+        .having(func.count(Lease.id) > 1)
+        .all()
+    )
+    for unit_id, n in multi_active:
+        anomalies.append({"type": "multiple_active_leases", "unit_id": unit_id, "count": n})
+
+    for u in Unit.query.filter(Unit.id.in_(unit_ids)).all():
+        active = [l for l in u.leases if l.is_active and l.deleted_at is None]
+        if (u.status == "occupied") != bool(active):
+            anomalies.append({"type": "status_mismatch", "unit_id": u.id, "status": u.status})
+        if active and u.current_lease_id != max(l.id for l in active) or not active and u.current_lease_id:
+            anomalies.append({"type": "current_lease_mismatch", "unit_id": u.id, "current_lease_id": u.current_lease_id})
+
+        leases = sorted(
+            (l for l in u.leases if l.deleted_at is None),
+            key=lambda l: (l.start_date, l.id),
+        )
+        for a, b in zip(leases, leases[1:]):
+            if lease_routes._overlaps(a.start_date, a.end_date, b.start_date, b.end_date):
+                anomalies.append({"type": "overlapping_leases", "unit_id": u.id, "lease_ids": [a.id, b.id]})
+
+    double_settled = (
+        db.session.query(MoveOutSettlement.lease_id, func.count(MoveOutSettlement.id))
+        .join(Lease, Lease.id == MoveOutSettlement.lease_id)
+        .filter(Lease.company_id == company_id)
+        .group_by(MoveOutSettlement.lease_id)
+        .having(func.count(MoveOutSettlement.id) > 1)
+        .all()
+    )
+    for lease_id, n in double_settled:
+        anomalies.append({"type": "multiple_move_outs", "lease_id": lease_id, "count": n})
+
+    return anomalies
+
+
+def _unlocked_unit(unit_id, company_id=None):
+    # the pre-lock behaviour: a plain read, nothing stops a concurrent transition
+    q = Unit.query.filter(Unit.id == int(unit_id), Unit.deleted_at.is_(None))
+    if company_id is not None:
+        q = q.filter(Unit.company_id == company_id)
+    return q.first()
+
+
+def _run(app, args, baseline: bool):
+    # Time spent waiting for the unit lock, measured around the helper in use
+    lock_waits = []
+    db_waits = []
+    waits_lock = threading.Lock()
+    real_lock_unit = lease_routes.lock_unit
+    acquire = _unlocked_unit if baseline else real_lock_unit
+
+    def timed_lock_unit(*a, **kw):
+        t0 = time.perf_counter()
+        try:
+            return acquire(*a, **kw)
+        finally:
+            with waits_lock:
+                lock_waits.append(time.perf_counter() - t0)
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        context._bench_t0 = time.perf_counter()
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        with waits_lock:
+            db_waits.append(time.perf_counter() - context._bench_t0)
+
+    with app.app_context():
+        db.create_all()
+        company_id, headers, unit_ids, tenant_ids = _setup(args.units, args.threads * 2)
+        engine = db.engine
+
+    lease_routes.lock_unit = timed_lock_unit
+    event.listen(engine, "before_cursor_execute", before_execute)
+    event.listen(engine, "after_cursor_execute", after_execute)
+
+    day_counter = itertools.count()
+    base_day = date(2000, 1, 1)
+    statuses = {}
+    latencies = []
+    stats_lock = threading.Lock()
+
+    def worker(n):
+        rnd = random.Random(args.seed + n)
+        client = app.test_client()
+        for _ in range(args.iterations):
+            unit_id = rnd.choice(unit_ids)
+            t0 = time.perf_counter()
+            if rnd.random() < 0.5:
+                start = base_day + timedelta(days=next(day_counter) * 2)
+                r = client.post("/api/leases", headers=headers, json={
+                    "tenant_id": rnd.choice(tenant_ids),
+                    "unit_id": unit_id,
+                    "start_date": start.isoformat(),
+                    "deposit_amount": 1000,
+                })
+                key = f"create:{r.status_code}"
+            else:
+                cur = client.get(f"/api/leases/unit/{unit_id}/current", headers=headers).get_json()
+                lease = (cur or {}).get("current_lease")
+                if not lease:
+                    continue
+                r = client.post(f"/api/leases/{lease['id']}/move-out", headers=headers, json={
+                    "end_date": lease["start_date"],
+                })
+                key = f"move_out:{r.status_code}"
+            elapsed = time.perf_counter() - t0
+            with stats_lock:
+                statuses[key] = statuses.get(key, 0) + 1
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    try:
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        lease_routes.lock_unit = real_lock_unit
+        event.remove(engine, "before_cursor_execute", before_execute)
+        event.remove(engine, "after_cursor_execute", after_execute)
+    wall = time.perf_counter() - started
+
+    with app.app_context():
+        anomalies = _check_anomalies(company_id, unit_ids)
+
+    return {
+        "mode": "baseline" if baseline else "locked",
+        "wall_s": round(wall, 2),
+        "ops_per_s": round(len(latencies) / wall, 1) if wall else None,
+        "responses": dict(sorted(statuses.items())),
+        "request_latency": summarize_ms(latencies),
+        "db_wait": summarize_ms(db_waits),
+        "lock_wait": summarize_ms(lock_waits),
+        "anomalies": anomalies[:20],
+        "anomaly_count": len(anomalies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=200, help="operations per thread")
+    parser.add_argument("--units", type=int, default=4, help="fewer units means more contention")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mode", choices=("locked", "baseline", "both"), default="locked")
+    args = parser.parse_args()
+
+    app = create_app()
+    modes = {"locked": [False], "baseline": [True], "both": [True, False]}[args.mode]
+    runs = [_run(app, args, baseline) for baseline in modes]
+
+    print(json.dumps({
+        "threads": args.threads,
+        "units": args.units,
+        "runs": runs,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
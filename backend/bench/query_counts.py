@@ -0,0 +1,90 @@
+"""
+SQL statements per request for endpoints that do scope checks.
+
+Each endpoint is called once against freshly seeded data and the statements
+it runs are counted. The script exits non-zero when an endpoint goes over
+its budget, so it can run in CI as a regression check.
+
+    DATABASE_URL=sqlite:///bench.sqlite python -m bench.query_counts
+"""
+import json
+import sys
+from datetime import date
+
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import Property, Tenant, Unit
+from bench.common import bench_company
+
+# Statements per request, including the JWT blocklist refresh when it's due
+BUDGETS = {
+    "GET /api/leases/unit/<id>/current (occupied)": 3,
+    "GET /api/leases/unit/<id>/current (vacant)": 1,
+    "POST /api/leases": 11,  # includes the lease.created webhook outbox row and the dashboard version bump
+}
+
+
+def _seed():
+    company, _, headers = bench_company("bench-queries")
+    prop = Property(name="Query Court", location="Bench", house_count=2, company_id=company.id)
+    db.session.add(prop)
+    db.session.flush()
+    units = [
+        Unit(property_id=prop.id, company_id=company.id, house_number=f"Q-{i}",
+             rent=1000, garbage_fee=100, water_rate=50, deposit=1000)
+        for i in range(3)
+    ]
+    tenant = Tenant(full_name="Query Tenant", phone="0700000000", company_id=company.id)
+    db.session.add_all(units + [tenant])
+    db.session.commit()
+    return headers, [u.id for u in units], tenant.id
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        headers, unit_ids, tenant_id = _seed()
+        engine = db.engine
+
+    counter = {"n": 0}
+
+    def count(*_):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    client = app.test_client()
+
+    # warm the per-worker blocklist filter so it isn't charged to the first endpoint
+    client.get(f"/api/leases/unit/{unit_ids[2]}/current", headers=headers)
+
+    def measure(label, method, url, **kw):
+        counter["n"] = 0
+        r = getattr(client, method)(url, headers=headers, **kw)
+        return label, r.status_code, counter["n"]
+
+    results = [
+        measure("POST /api/leases", "post", "/api/leases", json={
+            "tenant_id": tenant_id,
+            "unit_id": unit_ids[0],
+            "start_date": date.today().isoformat(),
+            "deposit_amount": 1000,
+        }),
+        measure("GET /api/leases/unit/<id>/current (occupied)", "get", f"/api/leases/unit/{unit_ids[0]}/current"),
+        measure("GET /api/leases/unit/<id>/current (vacant)", "get", f"/api/leases/unit/{unit_ids[1]}/current"),
+    ]
+    event.remove(engine, "before_cursor_execute", count)
+
+    report, over = [], False
+    for label, status, n in results:
+        budget = BUDGETS[label]
+        over = over or n > budget
+        report.append({"endpoint": label, "status": status, "queries": n, "budget": budget})
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
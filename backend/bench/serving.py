@@ -0,0 +1,171 @@
+"""
+Throughput of the Flask development server vs the production gunicorn setup.
+
+Each mode is started as a real server process on a free port against the
+same database. Concurrent keep-alive clients then hit a mix of typical
+authenticated reads for a fixed duration. Reported per mode: requests/s,
+latency percentiles, errors, and time until the first successful response
+(startup plus warmup).
+
+    DATABASE_URL=sqlite:///bench.sqlite python -m bench.serving --clients 32 --duration 20
+
+Modes: "dev" runs `python manage.py run` (the old Dockerfile CMD); "gunicorn"
+runs `gunicorn wsgi:app` with gunicorn.conf.py. Extra gunicorn settings come
+from the usual environment variables (WEB_CONCURRENCY, GUNICORN_THREADS, ...).
+Use a Postgres DATABASE_URL for numbers that mean anything: SQLite
+serializes writers and caps every mode.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from app import create_app
+from app.extensions import db
+from app.models import Property, Tenant, Unit
+from bench.common import bench_company, summarize_ms
+
+MODES = {
+    "dev": lambda port: [sys.executable, "manage.py", "run", "--host=127.0.0.1", f"--port={port}"],
+    "gunicorn": lambda port: ["gunicorn", "wsgi:app", "--bind", f"127.0.0.1:{port}"],
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _seed(units: int):
+    company, _, headers = bench_company("bench-serving")
+    prop = Property(name="Serving Court", location="Bench", house_count=units, company_id=company.id)
+    db.session.add(prop)
+    db.session.flush()
+    unit_rows = [
+        Unit(property_id=prop.id, company_id=company.id, house_number=f"S-{i:04d}",
+             rent=1000 + i, garbage_fee=100, water_rate=50, deposit=1000)
+        for i in range(units)
+    ]
+    tenants = [Tenant(full_name=f"Serving Tenant {i}", phone="0700000000", company_id=company.id) for i in range(50)]
+    db.session.add_all(unit_rows + tenants)
+    db.session.commit()
+    return headers, prop.id
+
+
+def _wait_ready(port, headers, timeout=60):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/properties", headers=headers)
+            if conn.getresponse().status == 200:
+                return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not become ready")
+
+
+def _load(port, headers, paths, clients, duration):
+    latencies, errors = [], {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(n):
+        rnd = random.Random(n)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local, local_errors = [], {}
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                conn.request("GET", rnd.choice(paths), headers=headers)
+                r = conn.getresponse()
+                r.read()
+                if r.status != 200:
+                    local_errors[str(r.status)] = local_errors.get(str(r.status), 0) + 1
+                if r.getheader("Connection", "").lower() == "close":
+                    conn.close()
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            except (OSError, http.client.HTTPException) as e:
+                local_errors[type(e).__name__] = local_errors.get(type(e).__name__, 0) + 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            local.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            for k, v in local_errors.items():
+                errors[k] = errors.get(k, 0) + v
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return latencies, errors, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="dev,gunicorn")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per mode")
+    parser.add_argument("--units", type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        headers, property_id = _seed(args.units)
+
+    paths = [
+        "/api/properties",
+        "/api/units?per_page=50",
+        "/api/tenants?per_page=50",
+        f"/api/properties/{property_id}/units?limit=50",
+        "/api/dashboard",
+    ]
+
+    env = dict(os.environ, FLASK_APP="manage.py", SCHEDULER_ENABLED="0")
+    results = []
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        port = _free_port()
+        proc = subprocess.Popen(
+            MODES[mode](port), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        try:
+            ready_s = _wait_ready(port, headers)
+            latencies, errors, wall = _load(port, headers, paths, args.clients, args.duration)
+        finally:
+            os.killpg(proc.pid, signal.SIGTERM)
+            proc.wait(timeout=30)
+        results.append({
+            "mode": mode,
+            "ready_s": round(ready_s, 2),
+            "requests_per_s": round(len(latencies) / wall, 1) if wall else None,
+            "errors": errors,
+            "latency": summarize_ms(latencies),
+        })
+
+    print(json.dumps({
+        "clients": args.clients,
+        "duration_s": args.duration,
+        "cpus": os.cpu_count(),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Check the SMS outbox and sender locally against the fake gateway.
+
+The gateway is made slow (--latency seconds per send) to show that posting
+a payment or an invoice doesn't wait for it. The script then checks that:
+- the payment and invoice each queued one message, in their own transaction;
+- a rejected request queues nothing;
+- a flaky gateway (--fail-rate) ends with every message sent exactly once;
+- sends stay under SMS_RATE_PER_SECOND and a rejected number isn't retried;
+- a message whose sender died mid-send is retried, up to its attempt limit.
+
+    python -m bench.sms --messages 200 --rate 50 --concurrency 8
+
+Exits 1 on the first failed check.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def _check(label, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50, help="SMS_RATE_PER_SECOND for the check")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per send at the fake gateway")
+    parser.add_argument("--fail-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(prefix="smarthome-sms-"), "sms.sqlite")
+    os.environ.update({
+        "DATABASE_URL": os.getenv("DATABASE_URL", f"sqlite:///{db_file}"),
+        "SCHEDULER_ENABLED": "0",
+        "SMS_PROVIDER": "fake",
+        "SMS_FAKE_LATENCY": str(args.latency),
+        "SMS_RATE_PER_SECOND": str(args.rate),
+    })
+
+    # imported after the environment is set: Config reads it at import time
+    from app import create_app
+    from app.extensions import db
+    from app.models import SmsMessage
+    from app.utils.sms_service import FakeGateway, SmsError, drain_outbox, get_provider, queue_sms
+    from bench.common import bench_company
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        company, _, headers = bench_company("bench-sms")
+
+    def post(path, body):
+        r = client.post(path, json=body, headers=headers)
+        return r.status_code, r.get_json()
+
+    _, prop = post("/api/properties", {"name": "SMS", "location": "Bench", "house_count": 1})
+    _, unit = post("/api/units", {"property_id": prop["id"], "house_number": "S1", "rent": 10000,
+                                  "garbage_fee": 200, "water_rate": 100, "deposit": 10000})
+    _, tenant = post("/api/tenants", {"full_name": "Wanjiku Bench", "phone": "0712 345 678"})
+    post("/api/leases", {"tenant_id": tenant["id"], "unit_id": unit["id"], "start_date": "2026-01-01",
+                         "deposit_amount": 10000})
+
+    t0 = time.perf_counter()
+    status, _ = post("/api/payments", {"tenant_id": tenant["id"], "unit_id": unit["id"], "amount": 10300,
+                                       "paid_for_month": "2026-02"})
+    status2, _ = post("/api/invoices", {"lease_id": 1, "period_start": "2026-03-01", "period_end": "2026-03-31"})
+    elapsed = time.perf_counter() - t0
+    _check("payment and invoice created", (status, status2) == (201, 201))
+    _check(f"requests didn't wait for the gateway ({elapsed * 1000:.0f} ms for two)", elapsed < args.latency)
+
+    status, _ = post("/api/payments", {"tenant_id": tenant["id"], "unit_id": 999999, "amount": 1,
+                                       "paid_for_month": "2026-02"})
+
+    with app.app_context():
+        queued = db.session.query(SmsMessage).order_by(SmsMessage.id).all()
+        _check("rejected payment queued nothing", status == 404 and len(queued) == 2)
+        _check("one message per event", [m.source_key.split(":")[0] for m in queued] == ["payment", "invoice"])
+        _check("number normalized to E.164", queued[0].to_number == "+254712345678")
+        print(f"     {queued[0].body}\n     {queued[1].body}")
+
+        for i in range(args.messages):
+            queue_sms(company.id, f"07{i:08d}", f"bench message {i}", "bench", f"bench:{i}")
+        db.session.commit()
+        total = args.messages + 2
+
+        gateway = get_provider()
+        gateway.fail_rate = args.fail_rate
+        # slow enough to need the thread pool, fast enough for the rate limit to be what binds
+        gateway.latency = min(args.latency, args.concurrency / args.rate / 2)
+        started = time.perf_counter()
+        runs = 0
+        while db.session.query(SmsMessage).filter(SmsMessage.status != "sent").count() and runs < 50:
+            drain_outbox(batch_size=50, concurrency=args.concurrency, max_attempts=50, backoff_base=0, backoff_max=0)
+            runs += 1
+        elapsed = time.perf_counter() - started
+
+        sent_ids = [m["to"] + m["body"] for m in gateway.sent]
+        _check(f"all {total} sent after {runs} drains despite {args.fail_rate:.0%} failures",
+               db.session.query(SmsMessage).filter(SmsMessage.status == "sent").count() == total)
+        _check("none sent twice", len(sent_ids) == len(set(sent_ids)) == total)
+        attempts = sum(m.attempts for m in db.session.query(SmsMessage).all())
+        # the bucket lets one attempt through every 1/rate seconds, failed ones included
+        _check(f"rate limit held ({attempts} attempts in {elapsed:.1f}s, limit {args.rate:g}/s)",
+               elapsed >= (attempts - 1) / args.rate * 0.95)
+
+        class Rejecting(FakeGateway):
+            def send(self, to_number, body):
+                raise SmsError("403 InvalidPhoneNumber", retryable=False)
+
+        queue_sms(company.id, "0700000000", "never delivered", "bench", "bench:rejected")
+        db.session.commit()
+        drain_outbox(provider=Rejecting(), backoff_base=0)
+        bad = db.session.query(SmsMessage).filter(SmsMessage.source_key == "bench:rejected").one()
+        _check("rejected number failed on the first attempt", (bad.status, bad.attempts) == ("failed", 1))
+
+        # two messages left "sending" by a sender that died, their claims lapsed
+        lapsed_at = datetime.utcnow() - timedelta(seconds=1)
+        for key, attempts in (("bench:lapsed-retry", 2), ("bench:lapsed-spent", 3)):
+            m = queue_sms(company.id, "0700000001", "sender died", "bench", key)
+            m.status, m.attempts, m.claimed_until = "sending", attempts, lapsed_at
+        db.session.commit()
+        drain_outbox(provider=FakeGateway(), max_attempts=3, backoff_base=0)
+        lapsed = dict(
+            db.session.query(SmsMessage.source_key, SmsMessage.status)
+            .filter(SmsMessage.source_key.like("bench:lapsed-%"))
+            .all()
+        )
+        _check(f"lapsed claims: retried under the limit, failed at it ({lapsed})",
+               lapsed == {"bench:lapsed-retry": "sent", "bench:lapsed-spent": "failed"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Startup cost of a web worker and of the CLI, with regression thresholds.
+
+Each sample runs in a fresh interpreter:
+- web: import the app, create_app(), then the first request through the
+  test client (what an autoscaled worker does before serving);
+- cli: `flask --help`, which loads the app to list its commands (every cron
+  job pays this before doing any work).
+
+It also runs one `python -X importtime` pass and reports the packages with
+the most import time, and checks that modules meant to be imported lazily
+(LAZY_MODULES) aren't loaded by create_app() any more.
+
+    DATABASE_URL=sqlite:///bench.sqlite python -m bench.startup --runs 5 \\
+        --max-web-ms 1500 --max-cli-ms 2500
+
+Exits 1 if a median is over its threshold or a lazy module got imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+LAZY_MODULES = ("reportlab", "flask_migrate", "alembic")
+
+WEB_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+app.test_client().get("/api/properties")
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "lazy_loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def _env():
+    return dict(os.environ, SCHEDULER_ENABLED="0", FLASK_APP="manage.py")
+
+
+def _web_sample():
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", WEB_PROBE], env=_env(), capture_output=True, text=True, check=True)
+    sample = json.loads(out.stdout.strip().splitlines()[-1])
+    sample["process_ms"] = (time.perf_counter() - t0) * 1000
+    return sample
+
+
+def _cli_sample():
+    t0 = time.perf_counter()
+    subprocess.run(["flask", "--help"], env=_env(), capture_output=True, check=True)
+    return (time.perf_counter() - t0) * 1000
+
+
+def _import_profile(top):
+    """Import time (self) summed per top-level package while loading the app."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "from app import create_app; create_app()"],
+        env=_env(), capture_output=True, text=True, check=True,
+    )
+    per_package = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        per_package[package] = per_package.get(package, 0) + int(self_us)
+    ranked = sorted(per_package.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return [{"package": name, "ms": round(us / 1000, 1)} for name, us in ranked]
+
+
+def _median(values):
+    return round(statistics.median(values), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages to list from -X importtime")
+    parser.add_argument("--max-web-ms", type=float, default=None, help="fail if median web process time exceeds this")
+    parser.add_argument("--max-cli-ms", type=float, default=None, help="fail if median `flask --help` time exceeds this")
+    args = parser.parse_args()
+
+    web = [_web_sample() for _ in range(args.runs)]
+    cli = [_cli_sample() for _ in range(args.runs)]
+    lazy_loaded = sorted({m for s in web for m in s["lazy_loaded"]})
+
+    result = {
+        "runs": args.runs,
+        "web": {k: _median([s[k] for s in web]) for k in ("import_ms", "create_app_ms", "first_request_ms", "process_ms")},
+        "cli_ms": _median(cli),
+        "lazy_modules_loaded_at_startup": lazy_loaded,
+        "import_time_by_package": _import_profile(args.top),
+    }
+
+    failures = []
+    if lazy_loaded:
+        failures.append(f"imported at startup: {', '.join(lazy_loaded)}")
+    if args.max_web_ms is not None and result["web"]["process_ms"] > args.max_web_ms:
+        failures.append(f"web startup {result['web']['process_ms']} ms > {args.max_web_ms} ms")
+    if args.max_cli_ms is not None and result["cli_ms"] > args.max_cli_ms:
+        failures.append(f"cli startup {result['cli_ms']} ms > {args.max_cli_ms} ms")
+    result["failures"] = failures
+
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Check outbound webhooks end to end against a local receiver.
+
+A small HTTP server on 127.0.0.1 plays the integration: it verifies every
+signature and fails the first --fail-first POSTs with a 503. The script
+makes payments, an invoice and leases through the API, then runs the
+dispatcher until everything is delivered and checks that:
+- requests didn't wait for the (slow) receiver;
+- every event arrived exactly once and in order, in batched POSTs;
+- failed POSTs were retried after a backoff and are in the delivery log;
+- a subscription only gets the event types it asked for;
+- an unreachable endpoint is paused after WEBHOOK_MAX_FAILURES and
+  catches up on its backlog once re-enabled;
+- events emitted while a subscription is paused wait for it;
+- a rejected request emits nothing, and purge drops what was delivered;
+- receivers on internal addresses are refused on save and at send time,
+  and a host that re-resolves to one after the check isn't reached.
+
+    python -m bench.webhooks --payments 250 --batch-size 50
+
+Exits 1 on the first failed check.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _check(label, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        sys.exit(1)
+
+
+class Receiver:
+    """Records batches per subscription secret; fails the first `fail_first` POSTs."""
+
+    def __init__(self, verify, fail_first=0, latency=0.0):
+        self.secrets = {}
+        self.batches = []
+        self.rejected = 0
+        self.bad_signatures = 0
+        self.hits = 0
+        self.fail_first = fail_first
+        self.latency = latency
+        self._lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                receiver.hits += 1
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if receiver.latency:
+                    time.sleep(receiver.latency)
+                payload = json.loads(body)
+                secret = receiver.secrets.get(payload["subscription_id"], "")
+                with receiver._lock:
+                    if not verify(secret, self.headers.get("X-Webhook-Signature", ""), body):
+                        receiver.bad_signatures += 1
+                        status = 401
+                    elif receiver.rejected < receiver.fail_first:
+                        receiver.rejected += 1
+                        status = 503
+                    else:
+                        receiver.batches.append((time.monotonic(), payload))
+                        status = 204
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def events(self, subscription_id):
+        return [e for _, p in self.batches if p["subscription_id"] == subscription_id for e in p["events"]]
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=250)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--fail-first", type=int, default=2, help="POSTs the receiver answers with 503")
+    parser.add_argument("--backoff", type=float, default=0.5, help="WEBHOOK_BACKOFF_SECONDS for the check")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds the receiver takes per POST")
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(prefix="smarthome-webhooks-"), "webhooks.sqlite")
+    os.environ.update({
+        "DATABASE_URL": os.getenv("DATABASE_URL", f"sqlite:///{db_file}"),
+        "SCHEDULER_ENABLED": "0",
+        # the receiver is on loopback, which webhooks otherwise refuse
+        "WEBHOOK_ALLOWED_HOSTS": "127.0.0.1",
+    })
+
+    # imported after the environment is set: Config reads it at import time
+    from app import create_app
+    from app.extensions import db
+    from app.models import WebhookAttempt, WebhookDelivery, WebhookEvent, WebhookSubscription
+    from app.utils.webhooks import _post, dispatch, purge_delivered, verify
+    from bench.common import bench_company
+
+    receiver = Receiver(verify, fail_first=args.fail_first, latency=args.latency)
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        db.create_all()
+        _, _, headers = bench_company("bench-webhooks")
+
+    def call(method, path, body=None):
+        r = getattr(client, method)(path, json=body, headers=headers)
+        return r.status_code, r.get_json()
+
+    _, everything = call("post", "/api/webhooks", {"url": receiver.url})
+    _, invoices_only = call("post", "/api/webhooks", {"url": receiver.url, "event_types": ["invoice.issued"]})
+    _, dead = call("post", "/api/webhooks", {"url": f"http://127.0.0.1:{_closed_port()}/hook"})
+    for sub in (everything, invoices_only, dead):
+        receiver.secrets[sub["id"]] = sub["secret"]
+    status, _ = call("post", "/api/webhooks", {"url": receiver.url, "event_types": ["payment.refunded"]})
+    _check("unknown event type rejected", status == 400)
+    for url in ("http://169.254.169.254/latest/meta-data", "http://localhost:8080/hook", "http://10.1.2.3/hook"):
+        status, body = call("post", "/api/webhooks", {"url": url})
+        _check(f"internal URL rejected: {url}", status == 400 and body["error"] == "url_not_allowed")
+    status, _ = call("patch", f"/api/webhooks/{everything['id']}", {"url": "http://[::1]:8080/hook"})
+    _check("internal URL rejected on update", status == 400)
+    status, error, _ = _post("http://192.168.0.1/hook", "secret", b"{}", timeout=1)
+    _check(f"and again at send time ({error})", status is None and error.startswith("blocked:"))
+
+    # DNS rebinding: a public address for the check, loopback for any later lookup
+    real_getaddrinfo = socket.getaddrinfo
+    lookups = []
+
+    def rebinding(host, *rest, **kwargs):
+        if host != "rebind.invalid":
+            return real_getaddrinfo(host, *rest, **kwargs)
+        lookups.append(host)
+        return real_getaddrinfo("93.184.216.34" if len(lookups) == 1 else "127.0.0.1", *rest, **kwargs)
+
+    hits = receiver.hits
+    socket.getaddrinfo = rebinding
+    try:
+        _post(f"http://rebind.invalid:{receiver.server.server_address[1]}/hook", "secret", b"{}", timeout=0.5)
+    finally:
+        socket.getaddrinfo = real_getaddrinfo
+    _check("POST goes to the checked address, not a rebound one", len(lookups) == 1 and receiver.hits == hits)
+
+    _, prop = call("post", "/api/properties", {"name": "Hooks", "location": "Bench", "house_count": 2})
+    _, unit = call("post", "/api/units", {"property_id": prop["id"], "house_number": "W1", "rent": 10000,
+                                          "garbage_fee": 200, "water_rate": 100, "deposit": 10000})
+    _, unit2 = call("post", "/api/units", {"property_id": prop["id"], "house_number": "W2", "rent": 9000,
+                                           "garbage_fee": 200, "water_rate": 100, "deposit": 0})
+    _, tenant = call("post", "/api/tenants", {"full_name": "Hook Tenant", "phone": "0711000000"})
+    _, tenant2 = call("post", "/api/tenants", {"full_name": "Hook Tenant Two", "phone": "0711000001"})
+    _, lease = call("post", "/api/leases", {"tenant_id": tenant["id"], "unit_id": unit["id"],
+                                            "start_date": "2026-01-01", "deposit_amount": 10000})
+    _, bulk = call("post", "/api/leases/bulk", {"rows": [{"tenant_id": tenant2["id"], "unit_id": unit2["id"],
+                                                          "start_date": "2026-01-01", "deposit_amount": 500,
+                                                          "deposit_held": 0}]})
+
+    started = time.perf_counter()
+    for i in range(args.payments):
+        call("post", "/api/payments", {"tenant_id": tenant["id"], "unit_id": unit["id"], "amount": 100 + i,
+                                       "paid_for_month": "2026-02"})
+    status, _ = call("post", "/api/invoices", {"lease_id": lease["id"], "period_start": "2026-03-01",
+                                               "period_end": "2026-03-31"})
+    per_request = (time.perf_counter() - started) / (args.payments + 1)
+    _check(f"writes didn't wait for the receiver ({per_request * 1000:.1f} ms per request)",
+           status == 201 and per_request < args.latency)
+    call("post", f"/api/leases/{bulk['created'][0]['id']}/end", {"end_date": "2026-06-30"})
+    _, reading = call("post", "/api/water-readings", {"unit_id": unit["id"], "reading_value": 10, "period": "2026-02"})
+    call("patch", f"/api/water-readings/{reading['id']}", {"reading_value": 12})
+    call("delete", f"/api/water-readings/{reading['id']}")
+    status, _ = call("post", "/api/payments", {"tenant_id": tenant["id"], "unit_id": 999999, "amount": 1,
+                                               "paid_for_month": "2026-02"})
+
+    expected = 2 + args.payments + 1 + 1 + 3  # leases, payments, invoice, lease end, water reading
+    with app.app_context():
+        _check("rejected request emitted nothing",
+               status == 404 and db.session.query(WebhookEvent).count() == expected)
+
+        deadline = time.monotonic() + 120
+        runs = 0
+        while time.monotonic() < deadline:
+            dispatch(batch_size=args.batch_size, concurrency=4, timeout=2, backoff_base=args.backoff,
+                     backoff_max=args.backoff * 4, max_failures=3)
+            runs += 1
+            pending = db.session.query(WebhookDelivery).filter(
+                WebhookDelivery.delivered_at.is_(None),
+                WebhookDelivery.subscription_id != dead["id"],
+            ).count()
+            paused = not db.session.get(WebhookSubscription, dead["id"]).is_active
+            if not pending and paused:
+                break
+            time.sleep(0.1)
+
+        got = receiver.events(everything["id"])
+        ids = [e["id"] for e in got]
+        posts = sum(1 for _, p in receiver.batches if p["subscription_id"] == everything["id"])
+        _check(f"all {expected} events delivered after {runs} dispatcher runs", len(got) == expected)
+        _check("exactly once, in order", ids == sorted(set(ids)))
+        _check(f"batched: {posts} POSTs of up to {args.batch_size}",
+               posts <= -(-expected // args.batch_size) + 1)
+        _check("every signature verified", receiver.bad_signatures == 0)
+        types = {e["type"] for e in got}
+        _check(f"event types: {', '.join(sorted(types))}",
+               types == {"lease.created", "payment.created", "invoice.issued", "lease.ended",
+                         "water_reading.recorded", "water_reading.updated", "water_reading.deleted"})
+        water = [e["data"] for e in got if e["type"].startswith("water_reading.")]
+        _check("water reading events carry the reading",
+               [(w["id"], w["reading_value"], bool(w["deleted_at"])) for w in water]
+               == [(reading["id"], 10.0, False), (reading["id"], 12.0, False), (reading["id"], 12.0, True)])
+        _check("filtered subscription got only invoices",
+               [e["type"] for e in receiver.events(invoices_only["id"])] == ["invoice.issued"])
+
+        log = (
+            db.session.query(WebhookAttempt)
+            .filter(WebhookAttempt.subscription_id.in_([everything["id"], invoices_only["id"]]))
+            .order_by(WebhookAttempt.id)
+            .all()
+        )
+        failed = [a for a in log if a.status_code == 503]
+        _check(f"{len(failed)} failed POSTs in the delivery log", len(failed) == args.fail_first)
+        retried = all(
+            any(b.subscription_id == a.subscription_id and b.status_code == 204
+                and (b.attempted_at - a.attempted_at).total_seconds() >= args.backoff / 2 for b in log)
+            for a in failed
+        )
+        _check("each failure retried after its backoff", retried)
+
+        dead_log = db.session.query(WebhookAttempt).filter(WebhookAttempt.subscription_id == dead["id"]).all()
+        _check(f"unreachable endpoint paused after {len(dead_log)} attempts",
+               len(dead_log) == 3 and all(a.status_code is None for a in dead_log))
+
+    status, body = call("get", f"/api/webhooks/{dead['id']}/attempts")
+    _check(f"delivery log API: {body['pending_events']} pending, reason: {body['subscription']['paused_reason'][:40]}...",
+           status == 200 and len(body["attempts"]) == 3 and body["pending_events"] == expected)
+
+    call("patch", f"/api/webhooks/{dead['id']}", {"url": receiver.url, "is_active": True})
+    with app.app_context():
+        for _ in range(20):
+            dispatch(batch_size=args.batch_size, backoff_base=args.backoff)
+            if len(receiver.events(dead["id"])) >= expected:
+                break
+        _check("re-enabled subscription caught up on its backlog",
+               [e["id"] for e in receiver.events(dead["id"])] == ids)
+
+    call("patch", f"/api/webhooks/{everything['id']}", {"is_active": False})
+    status, paid = call("post", "/api/payments", {"tenant_id": tenant["id"], "unit_id": unit["id"], "amount": 1,
+                                                  "paid_for_month": "2026-02"})
+    with app.app_context():
+        dispatch(batch_size=args.batch_size, backoff_base=args.backoff)
+        held = db.session.query(WebhookDelivery).filter(
+            WebhookDelivery.subscription_id == everything["id"], WebhookDelivery.delivered_at.is_(None),
+        ).count()
+        _check("event emitted while paused is held, not sent",
+               status == 201 and held == 1 and len(receiver.events(everything["id"])) == expected)
+    call("patch", f"/api/webhooks/{everything['id']}", {"is_active": True})
+    with app.app_context():
+        dispatch(batch_size=args.batch_size, backoff_base=args.backoff)
+        late = receiver.events(everything["id"])[expected:]
+        _check("and delivered once re-enabled",
+               [(e["type"], e["data"]["id"]) for e in late] == [("payment.created", paid["id"])])
+
+        result = purge_delivered(retention_days=0)
+        _check(f"purge dropped delivered rows ({result})",
+               db.session.query(WebhookDelivery).count() == 0 and db.session.query(WebhookEvent).count() == 0)
+
+    receiver.server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
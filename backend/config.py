@@ -7,8 +7,113 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Engine pool, per worker process; turned into SQLALCHEMY_ENGINE_OPTIONS
+    # by app/utils/db_pool.py. Worst case a deployment opens
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    DB_POOL_USE_LIFO = os.getenv("DB_POOL_USE_LIFO", "1") == "1"
+    DB_POOL_CLASS = os.getenv("DB_POOL_CLASS")  # "queue" or "null"; default depends on DB_PGBOUNCER
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    # Behind PgBouncer in transaction mode: no worker-side pool, no session state
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
 
+    # Seconds a worker keeps a cached dashboard; writes from any worker are
+    # picked up sooner through company.dashboard_version
+    DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "60"))
+    # Vacancy search results and facets, per company and filter set
+    VACANCY_CACHE_TTL = int(os.getenv("VACANCY_CACHE_TTL", "15"))
+
+    # Longest a token revoked in one worker stays usable in the others; 0 = check the DB every request
+    REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+    REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", "3600"))
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+
+    # Per-endpoint request metrics at /metrics (Prometheus text format).
+    # METRICS_DIR is shared by all gunicorn workers so any of them can answer a scrape.
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # if set, scrapes need "Authorization: Bearer <token>"
+
+    # Optional read replica: GET requests and replica_reads() blocks read from it, writes
+    # stay on the primary, and a client that just wrote reads from the primary this long
+    REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+    # Decimal values handed straight to jsonify: "float" (number) or "string" (fixed 2 dp)
+    JSON_DECIMAL_FORMAT = os.getenv("JSON_DECIMAL_FORMAT", "float")
+
+    # Lazily imported modules the gunicorn master loads before forking (wsgi.py);
+    # CLI commands and the dev server skip them until first use
+    PRELOAD_MODULES = [m.strip() for m in os.getenv("PRELOAD_MODULES", "reportlab.pdfgen.canvas").split(",") if m.strip()]
+
+    # Tests/staging: record SQL per request, flag N+1 patterns and @query_budget overruns.
+    # "off", "log" (warning) or "raise" (the response becomes a 500)
+    QUERY_DEBUG = os.getenv("QUERY_DEBUG", "off")
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+
+    # Background housekeeping jobs, one thread each per worker (see app/utils/scheduler.py)
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+    # Expired revoked_token rows are deleted in batches this often; 0 disables
+    REVOKED_TOKEN_PURGE_INTERVAL = float(os.getenv("REVOKED_TOKEN_PURGE_INTERVAL", "3600"))
+    REVOKED_TOKEN_PURGE_BATCH = int(os.getenv("REVOKED_TOKEN_PURGE_BATCH", "5000"))
+    REVOKED_TOKEN_PURGE_PAUSE = float(os.getenv("REVOKED_TOKEN_PURGE_PAUSE", "0.2"))
+
+    # Tenant SMS (app/utils/sms_service.py). Empty = nothing is queued or sent;
+    # "fake" keeps messages in memory (local runs), "africastalking" sends them
+    SMS_PROVIDER = os.getenv("SMS_PROVIDER", "")
+    SMS_DEFAULT_COUNTRY_CODE = os.getenv("SMS_DEFAULT_COUNTRY_CODE", "254")  # for numbers stored as 07...
+    SMS_SENDER_ID = os.getenv("SMS_SENDER_ID")
+    AFRICASTALKING_USERNAME = os.getenv("AFRICASTALKING_USERNAME", "sandbox")
+    AFRICASTALKING_API_KEY = os.getenv("AFRICASTALKING_API_KEY")
+    # The outbox is drained this often by one worker at a time (on Postgres), in batches
+    # sent SMS_CONCURRENCY at a time and at most SMS_RATE_PER_SECOND across the deployment
+    SMS_SEND_INTERVAL = float(os.getenv("SMS_SEND_INTERVAL", "5"))
+    SMS_BATCH_SIZE = int(os.getenv("SMS_BATCH_SIZE", "100"))
+    SMS_CONCURRENCY = int(os.getenv("SMS_CONCURRENCY", "4"))
+    SMS_RATE_PER_SECOND = float(os.getenv("SMS_RATE_PER_SECOND", "10"))
+    # Failed sends retry after ~SMS_BACKOFF_SECONDS, doubling up to the max, then give up
+    SMS_MAX_ATTEMPTS = int(os.getenv("SMS_MAX_ATTEMPTS", "6"))
+    SMS_BACKOFF_SECONDS = float(os.getenv("SMS_BACKOFF_SECONDS", "30"))
+    SMS_BACKOFF_MAX_SECONDS = float(os.getenv("SMS_BACKOFF_MAX_SECONDS", "3600"))
+    SMS_FAKE_LATENCY = float(os.getenv("SMS_FAKE_LATENCY", "0"))
+    SMS_FAKE_FAIL_RATE = float(os.getenv("SMS_FAKE_FAIL_RATE", "0"))
+
+    # Outbound webhooks (app/utils/webhooks.py). Write paths add events to an outbox; a job
+    # fans them out to each company's subscriptions and POSTs them in signed batches
+    WEBHOOKS_ENABLED = os.getenv("WEBHOOKS_ENABLED", "1") == "1"
+    WEBHOOK_DISPATCH_INTERVAL = float(os.getenv("WEBHOOK_DISPATCH_INTERVAL", "5"))
+    WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))  # events per POST
+    WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "4"))  # subscribers posted to at once
+    WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10"))
+    # Receivers must resolve to public addresses; hosts listed here are exempt
+    # (e.g. "127.0.0.1" for a local test receiver)
+    WEBHOOK_ALLOWED_HOSTS = [h.strip().lower() for h in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+    # A failed POST backs its subscription off ~WEBHOOK_BACKOFF_SECONDS, doubling up to the max;
+    # after WEBHOOK_MAX_FAILURES in a row the subscription is paused until re-enabled
+    WEBHOOK_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_SECONDS", "30"))
+    WEBHOOK_BACKOFF_MAX_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_MAX_SECONDS", "3600"))
+    WEBHOOK_MAX_FAILURES = int(os.getenv("WEBHOOK_MAX_FAILURES", "20"))
+    # Delivered events and the delivery log are kept this long
+    WEBHOOK_RETENTION_DAYS = float(os.getenv("WEBHOOK_RETENTION_DAYS", "14"))
+    WEBHOOK_PURGE_INTERVAL = float(os.getenv("WEBHOOK_PURGE_INTERVAL", "3600"))
+
+    # werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+    # Changing it rehashes each password at that user's next login.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    # Concurrent hash checks per worker (0 = check on the request thread)
+    PASSWORD_VERIFY_WORKERS = int(os.getenv("PASSWORD_VERIFY_WORKERS", "2"))
+    # Seconds a login waits for a free verifier thread before answering 503;
+    # the hash itself isn't bounded
+    PASSWORD_VERIFY_TIMEOUT = float(os.getenv("PASSWORD_VERIFY_TIMEOUT", "10"))
+
     if not SQLALCHEMY_DATABASE_URI:
         raise RuntimeError("DATABASE_URL is required")
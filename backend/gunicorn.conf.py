@@ -0,0 +1,77 @@
+# Production gunicorn settings. Loaded automatically when gunicorn runs from
+# this directory:  gunicorn wsgi:app
+# Every value can be overridden with the environment variables below.
+import multiprocessing
+import os
+import shutil
+
+# Workers share per-endpoint metrics through this directory (see app/utils/metrics.py)
+os.environ.setdefault("METRICS_DIR", "/tmp/smarthome-metrics")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Requests spend much of their time waiting on Postgres, so a few threads per
+# worker keep the CPU busy; workers scale with cores for the CPU-bound parts
+# (JSON, password hashing, PDF rendering).
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread" if threads > 1 else "sync"
+
+# Import the app once in the master; workers fork with it already loaded
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# Recycle workers now and then to cap slow memory growth; jitter so they don't restart together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def on_starting(server):
+    # snapshots from a previous run would be double counted
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["METRICS_DIR"], exist_ok=True)
+
+
+def worker_exit(server, worker):
+    # Runs in the exiting worker: write out what it gathered since its last
+    # flush, which child_exit below then folds into the archive
+    from app.utils.metrics import flush
+
+    flush(os.environ["METRICS_DIR"])
+
+
+def child_exit(server, worker):
+    from app.utils.metrics import mark_process_dead
+
+    mark_process_dead(os.environ["METRICS_DIR"], worker.pid)
+
+
+def _flask_app(server):
+    return server.app.wsgi()
+
+
+def post_fork(server, worker):
+    # A preloaded engine may hold connections opened in the master; sharing
+    # them between processes corrupts the protocol stream. Drop the pool
+    # without closing (close=False leaves the master's sockets alone) so this
+    # worker opens its own.
+    from app.extensions import db
+
+    app = _flask_app(server)
+    with app.app_context():
+        for engine in db.engines.values():  # primary and replica
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Runs in the worker before it starts accepting connections
+    from app.utils.warmup import warm_up_worker
+
+    warm_up_worker(worker.wsgi)
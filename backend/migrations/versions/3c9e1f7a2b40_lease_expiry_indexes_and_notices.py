@@ -0,0 +1,54 @@
+"""lease expiry indexes and notices
+
+Revision ID: 3c9e1f7a2b40
+Revises: 6088e0e6a7ed
+Create Date: 2026-10-19 09:12:41.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1f7a2b40'
+down_revision = '6088e0e6a7ed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('lease', schema=None) as batch_op:
+        batch_op.create_index('ix_lease_company_end_date', ['company_id', 'end_date'], unique=False)
+        batch_op.create_index('ix_lease_unit_dates', ['unit_id', 'start_date', 'end_date'], unique=False)
+
+    op.create_table('lease_notices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('lease_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('recipient', sa.String(length=20), nullable=False),
+    sa.Column('lease_end_date', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['company.id'], ),
+    sa.ForeignKeyConstraint(['lease_id'], ['lease.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('lease_id', 'kind', 'recipient', 'lease_end_date', name='uq_lease_notice')
+    )
+    with op.batch_alter_table('lease_notices', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_lease_notices_company_id'), ['company_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_lease_notices_lease_id'), ['lease_id'], unique=False)
+        batch_op.create_index('ix_lease_notice_status', ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('lease_notices', schema=None) as batch_op:
+        batch_op.drop_index('ix_lease_notice_status')
+        batch_op.drop_index(batch_op.f('ix_lease_notices_lease_id'))
+        batch_op.drop_index(batch_op.f('ix_lease_notices_company_id'))
+
+    op.drop_table('lease_notices')
+
+    with op.batch_alter_table('lease', schema=None) as batch_op:
+        batch_op.drop_index('ix_lease_unit_dates')
+        batch_op.drop_index('ix_lease_company_end_date')
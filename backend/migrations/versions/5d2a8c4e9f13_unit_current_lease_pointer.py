@@ -0,0 +1,47 @@
+"""unit current lease pointer
+
+Revision ID: 5d2a8c4e9f13
+Revises: 3c9e1f7a2b40
+Create Date: 2026-10-19 11:03:17.554920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a8c4e9f13'
+down_revision = '3c9e1f7a2b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('unit', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_lease_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('current_tenant_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_unit_current_lease_id'), ['current_lease_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_unit_current_tenant_id'), ['current_tenant_id'], unique=False)
+
+    # Backfill from the latest active lease per unit
+    op.execute(sa.text("""
+        UPDATE unit SET
+            current_lease_id = (
+                SELECT l.id FROM lease l
+                WHERE l.unit_id = unit.id AND l.is_active = :active AND l.deleted_at IS NULL
+                ORDER BY l.id DESC LIMIT 1
+            ),
+            current_tenant_id = (
+                SELECT l.tenant_id FROM lease l
+                WHERE l.unit_id = unit.id AND l.is_active = :active AND l.deleted_at IS NULL
+                ORDER BY l.id DESC LIMIT 1
+            )
+    """).bindparams(active=True))
+
+
+def downgrade():
+    with op.batch_alter_table('unit', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_unit_current_tenant_id'))
+        batch_op.drop_index(batch_op.f('ix_unit_current_lease_id'))
+        batch_op.drop_column('current_tenant_id')
+        batch_op.drop_column('current_lease_id')
@@ -0,0 +1,47 @@
+"""unit rate history
+
+Revision ID: 7e41b0c95d28
+Revises: 5d2a8c4e9f13
+Create Date: 2026-10-19 14:26:08.117342
+
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e41b0c95d28'
+down_revision = '5d2a8c4e9f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('unit_rates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('unit_id', sa.Integer(), nullable=False),
+    sa.Column('effective_from', sa.Date(), nullable=False),
+    sa.Column('rent', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('garbage_fee', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('water_rate', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('created_by_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['created_by_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['unit_id'], ['unit.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('unit_id', 'effective_from', name='uq_unit_rate_unit_effective_from')
+    )
+    # Baseline: today's rates have applied since forever (that is what billing assumed so far)
+    op.execute(sa.text("""
+        INSERT INTO unit_rates (unit_id, effective_from, rent, garbage_fee, water_rate, created_at)
+        SELECT id, :baseline, rent, garbage_fee, water_rate, :now FROM unit
+    """).bindparams(
+        sa.bindparam('baseline', value=date(1900, 1, 1), type_=sa.Date()),
+        sa.bindparam('now', value=datetime.utcnow(), type_=sa.DateTime()),
+    ))
+
+
+def downgrade():
+    op.drop_table('unit_rates')
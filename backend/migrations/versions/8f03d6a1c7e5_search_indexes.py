@@ -0,0 +1,85 @@
+"""search indexes: pg_trgm on postgres, fts5 on sqlite
+
+Revision ID: 8f03d6a1c7e5
+Revises: 7e41b0c95d28
+Create Date: 2026-10-19 16:40:52.903116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f03d6a1c7e5'
+down_revision = '7e41b0c95d28'
+branch_labels = None
+depends_on = None
+
+
+TRGM_INDEXES = [
+    ('ix_tenant_full_name_trgm', 'tenant', 'full_name'),
+    ('ix_tenant_phone_trgm', 'tenant', 'phone'),
+    ('ix_tenant_email_trgm', 'tenant', 'email'),
+    ('ix_unit_house_number_trgm', 'unit', 'house_number'),
+    ('ix_property_name_trgm', 'property', 'name'),
+    ('ix_property_location_trgm', 'property', 'location'),
+]
+
+SQLITE_FTS = [
+    ('tenant', ('full_name', 'phone', 'email')),
+    ('unit', ('house_number',)),
+    ('property', ('name', 'location')),
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, table, column in TRGM_INDEXES:
+            op.create_index(
+                name, table, [column], unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+            )
+
+    elif dialect == 'sqlite':
+        for table, cols in SQLITE_FTS:
+            fts = f'{table}_fts'
+            col_list = ', '.join(cols)
+            new_vals = ', '.join(f'new.{c}' for c in cols)
+            old_vals = ', '.join(f'old.{c}' for c in cols)
+            op.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                f"{col_list}, content='{table}', content_rowid='id', tokenize='trigram')"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals}); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals}); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals}); "
+                f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals}); END"
+            )
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        for name, table, _ in reversed(TRGM_INDEXES):
+            op.drop_index(name, table_name=table)
+
+    elif dialect == 'sqlite':
+        for table, _ in reversed(SQLITE_FTS):
+            fts = f'{table}_fts'
+            for suffix in ('au', 'ad', 'ai'):
+                op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {fts}')
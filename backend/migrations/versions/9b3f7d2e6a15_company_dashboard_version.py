@@ -0,0 +1,26 @@
+"""company dashboard version
+
+Revision ID: 9b3f7d2e6a15
+Revises: f204f5b357bf
+Create Date: 2026-10-19 21:14:08.412907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3f7d2e6a15'
+down_revision = 'f204f5b357bf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('company', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('dashboard_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('company', schema=None) as batch_op:
+        batch_op.drop_column('dashboard_version')
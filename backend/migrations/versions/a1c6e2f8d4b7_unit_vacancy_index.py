@@ -0,0 +1,26 @@
+"""unit (company_id, status, rent) index for vacancy search
+
+Revision ID: a1c6e2f8d4b7
+Revises: 8f03d6a1c7e5
+Create Date: 2026-10-19 17:12:31.480522
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c6e2f8d4b7'
+down_revision = '8f03d6a1c7e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('unit', schema=None) as batch_op:
+        batch_op.create_index('ix_unit_company_status_rent', ['company_id', 'status', 'rent'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('unit', schema=None) as batch_op:
+        batch_op.drop_index('ix_unit_company_status_rent')
@@ -0,0 +1,26 @@
+"""index revoked_token.created_at for incremental blocklist refresh
+
+Revision ID: b4e9d1a7c352
+Revises: a1c6e2f8d4b7
+Create Date: 2026-10-19 17:48:05.211907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e9d1a7c352'
+down_revision = 'a1c6e2f8d4b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_revoked_token_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_revoked_token_created_at'))
@@ -0,0 +1,50 @@
+"""sms outbox
+
+Revision ID: c3e8f1a9d264
+Revises: b4e9d1a7c352
+Create Date: 2026-10-19 19:02:41.530118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8f1a9d264'
+down_revision = 'b4e9d1a7c352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sms_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('source_key', sa.String(length=60), nullable=False),
+    sa.Column('to_number', sa.String(length=20), nullable=False),
+    sa.Column('body', sa.String(length=480), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claimed_until', sa.DateTime(), nullable=True),
+    sa.Column('provider', sa.String(length=30), nullable=True),
+    sa.Column('provider_message_id', sa.String(length=100), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['company.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source_key')
+    )
+    with op.batch_alter_table('sms_outbox', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sms_outbox_company_id'), ['company_id'], unique=False)
+        batch_op.create_index('ix_sms_outbox_status_next_attempt', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sms_outbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_sms_outbox_status_next_attempt')
+        batch_op.drop_index(batch_op.f('ix_sms_outbox_company_id'))
+
+    op.drop_table('sms_outbox')
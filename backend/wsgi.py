@@ -0,0 +1,6 @@
+from app import create_app
+from app.utils.warmup import warm_up_master
+
+app = create_app()
+# Runs once in the gunicorn master under preload_app, before workers fork
+warm_up_master(app)